@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+WWLD Benchmark - End-to-end latency, throughput and memory of the API
+
+Starts the backend (uvicorn, in a subprocess) against a transcript corpus and
+a stubbed model (llm_stub_server.py, in this process), then measures:
+    startup      seconds until /health answers, parsing and from the snapshot
+    ask          /ask with uncached problems (retrieval + model calls)
+    ask_cached   /ask with already cached problems
+    search       /search
+    speakers     /speakers
+at each concurrency level: p50/p95/p99 latency, throughput, errors and the
+server's RSS. Results are saved as JSON so runs can be diffed between commits.
+
+    python benchmark.py [--corpus DIR] [--concurrency 1,4,16] [--requests 60]
+    python benchmark.py --compare before.json after.json [--fail-over 10]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from llm_stub_server import StubConfig, start_stub_server
+
+BACKEND_DIR = Path(__file__).parent
+RESULTS_DIR = BACKEND_DIR / "benchmark_results"
+
+SEARCH_KEYWORDS = [
+    "product market fit", "hiring", "pricing", "roadmap", "burnout",
+    "retention", "onboarding", "growth loops", "north star metric", "positioning"
+]
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1]
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid and all its descendants (uvicorn workers), from /proc"""
+    pids = [pid]
+    for current in pids:
+        for children in Path(f"/proc/{current}/task").glob("*/children"):
+            try:
+                pids.extend(int(child) for child in children.read_text().split())
+            except OSError:
+                continue
+    return pids
+
+
+def memory_mb(pid: int) -> Optional[Dict]:
+    """Current and peak RSS of a process tree in MB (None where /proc is unavailable)"""
+    totals = {"VmRSS": 0, "VmHWM": 0}
+    found = False
+    for current in _process_tree(pid):
+        try:
+            status = Path(f"/proc/{current}/status").read_text()
+        except OSError:
+            continue
+        found = True
+        for line in status.splitlines():
+            field, _, value = line.partition(":")
+            if field in totals:
+                totals[field] += int(value.split()[0])  # kB
+    if not found:
+        return None
+    return {"rss_mb": round(totals["VmRSS"] / 1024, 1), "peak_rss_mb": round(totals["VmHWM"] / 1024, 1)}
+
+
+def call(base_url: str, method: str, path: str, body: Optional[Dict] = None, timeout: float = 120) -> int:
+    """One request; returns the HTTP status (0 on connection errors)"""
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        request.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+class BackendServer:
+    """The FastAPI app under uvicorn, in a subprocess"""
+
+    def __init__(self, env: Dict[str, str], workers: int = 1):
+        self.env = env
+        self.workers = workers
+        self.port = None
+        self.process = None
+        self.log_file = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 300) -> float:
+        """Start the server and return seconds until /health answered"""
+        # uvicorn needs the port up front; find a free one
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+
+        self.log_file = tempfile.NamedTemporaryFile(prefix="wwld-bench-", suffix=".log", delete=False)
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=self.env,
+            stdout=self.log_file,
+            stderr=subprocess.STDOUT
+        )
+
+        while time.perf_counter() - started < timeout:
+            if self.process.poll() is not None:
+                break
+            if call(self.base_url, "GET", "/health", timeout=2) == 200:
+                return time.perf_counter() - started
+            time.sleep(0.05)
+
+        log = self.log_tail()
+        self.stop()
+        raise RuntimeError(f"Backend did not become healthy; log:\n{log}")
+
+    def log_tail(self, lines: int = 30) -> str:
+        return "\n".join(Path(self.log_file.name).read_text(errors="replace").splitlines()[-lines:])
+
+    def memory(self) -> Optional[Dict]:
+        return memory_mb(self.process.pid)
+
+    def stop(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.log_file:
+            self.log_file.close()
+            os.unlink(self.log_file.name)
+            self.log_file = None
+
+
+def run_scenario(server: BackendServer, name: str, method: str, path: str, bodies: List[Optional[Dict]],
+                 concurrency: int) -> Dict:
+    """Send every body (one request each) with concurrency requests in flight"""
+    def timed(body):
+        started = time.perf_counter()
+        status = call(server.base_url, method, path, body)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, bodies))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, status in outcomes if 200 <= status < 300)
+    errors = {}
+    for _, status in outcomes:
+        if not 200 <= status < 300:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    result = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(bodies),
+        "ok": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            "max": round(latencies[-1], 1) if latencies else 0.0
+        },
+        "memory": server.memory()
+    }
+    print(f"   {name:<11} c={concurrency:<3} p50 {result['latency_ms']['p50']:>8.1f}ms  "
+          f"p95 {result['latency_ms']['p95']:>8.1f}ms  p99 {result['latency_ms']['p99']:>8.1f}ms  "
+          f"{result['throughput_rps']:>8.2f} req/s" + (f"  ⚠️  errors {errors}" if errors else ""))
+    return result
+
+
+def measure_startup(env: Dict[str, str], runs: int, workers: int) -> Dict:
+    """Startup time and memory, re-parsing the corpus and loading the snapshot"""
+    results = {}
+    for mode, snapshot in (("parse", "0"), ("snapshot", "1")):
+        mode_env = dict(env, TRANSCRIPT_SNAPSHOT=snapshot)
+        if snapshot == "1":
+            # Make sure a current snapshot exists before timing loads from it
+            server = BackendServer(mode_env, workers)
+            server.start()
+            server.stop()
+
+        samples = []
+        for _ in range(runs):
+            server = BackendServer(mode_env, workers)
+            seconds = server.start()
+            samples.append({"seconds": round(seconds, 3), "memory": server.memory()})
+            server.stop()
+
+        seconds = sorted(sample["seconds"] for sample in samples)
+        results[mode] = {"runs": samples, "median_s": seconds[len(seconds) // 2]}
+        print(f"   startup ({mode}): {results[mode]['median_s']:.2f}s median of {runs}")
+    return results
+
+
+def git_revision() -> Dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def run_benchmark(args) -> Dict:
+    corpus = Path(args.corpus).resolve()
+    cache_dir = Path(tempfile.mkdtemp(prefix="wwld-bench-cache-"))
+
+    env = dict(os.environ)
+    env.update({
+        "TRANSCRIPTS_DIR": str(corpus),
+        "CACHE_DIR": str(cache_dir),
+        # Uncached /ask requests must not be answered by paraphrase matches
+        "CACHE_SIMILARITY_THRESHOLD": "",
+        "PYTHONUNBUFFERED": "1"
+    })
+    for name in ("LLM_REQUESTS_PER_MINUTE", "LLM_TOKENS_PER_MINUTE", "LLM_RECORDINGS_DIR"):
+        env.pop(name, None)
+
+    stub = None
+    if args.model == "stub":
+        stub_config = StubConfig(
+            latency_ms=args.llm_latency_ms,
+            latency_sigma=args.llm_latency_sigma,
+            error_rate=args.llm_error_rate,
+            seed=args.seed
+        )
+        stub = start_stub_server(0, stub_config)
+        env.update({"LLM_BACKEND": "stub", "LLM_BASE_URL": f"http://127.0.0.1:{stub.server_address[1]}"})
+        print(f"🧪 Stub model on port {stub.server_address[1]} (median {args.llm_latency_ms:.0f}ms)")
+    else:
+        # Demo mode: canned insights, no model calls
+        env["LLM_BACKEND"] = "anthropic"
+        env.pop("ANTHROPIC_API_KEY", None)
+        print("📋 Demo mode model (no model calls)")
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            **git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": str(corpus),
+            "transcripts": len(list(corpus.glob("*.txt"))),
+            "model": args.model,
+            "llm_latency_ms": args.llm_latency_ms if args.model == "stub" else None,
+            "workers": args.workers,
+            "requests": args.requests,
+            "concurrency": levels
+        },
+        "startup": None,
+        "scenarios": []
+    }
+
+    try:
+        if args.startup_runs:
+            print("\n⏱️  Startup")
+            result["startup"] = measure_startup(env, args.startup_runs, args.workers)
+
+        print("\n⏱️  Endpoints")
+        server = BackendServer(dict(env, TRANSCRIPT_SNAPSHOT="1"), args.workers)
+        server.start()
+        try:
+            with urllib.request.urlopen(server.base_url + "/problems") as response:
+                problems = json.load(response)["problems"]
+
+            # Fill the cache for the cached /ask scenario
+            for problem in problems:
+                call(server.base_url, "POST", "/ask", {"problem": problem})
+
+            run_id = int(time.time())
+            for concurrency in levels:
+                scenarios = [
+                    ("ask", "POST", "/ask", [
+                        {"problem": f"{problems[i % len(problems)]} (benchmark {run_id}-{concurrency}-{i})"}
+                        for i in range(args.ask_requests or args.requests)
+                    ]),
+                    ("ask_cached", "POST", "/ask", [
+                        {"problem": problems[i % len(problems)]} for i in range(args.requests)
+                    ]),
+                    ("search", "POST", "/search", [
+                        {"keyword": SEARCH_KEYWORDS[i % len(SEARCH_KEYWORDS)], "limit": 5} for i in range(args.requests)
+                    ]),
+                    ("speakers", "GET", "/speakers", [None] * args.requests)
+                ]
+                for name, method, path, bodies in scenarios:
+                    if args.only and name not in args.only.split(","):
+                        continue
+                    result["scenarios"].append(run_scenario(server, name, method, path, bodies, concurrency))
+
+            result["memory"] = server.memory()
+        finally:
+            server.stop()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if stub:
+            result["llm_stub"] = stub.RequestHandlerClass.config.get_stats()
+            stub.shutdown()
+
+    return result
+
+
+def compare(before_path: str, after_path: str, fail_over: Optional[float]) -> int:
+    """Print per-scenario changes between two result files; 1 if p95 regressed past fail_over percent"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def change(old, new):
+        return (new - old) / old * 100 if old else 0.0
+
+    print(f"📊 {before['meta'].get('commit')} → {after['meta'].get('commit')}")
+    for setting in ("corpus", "transcripts", "model", "llm_latency_ms", "workers", "requests", "cpu_count"):
+        if before["meta"].get(setting) != after["meta"].get(setting):
+            print(f"⚠️  {setting} differs: {before['meta'].get(setting)} → {after['meta'].get(setting)}")
+    regressions = []
+    old_scenarios = {(s["scenario"], s["concurrency"]): s for s in before["scenarios"]}
+    for scenario in after["scenarios"]:
+        key = (scenario["scenario"], scenario["concurrency"])
+        old = old_scenarios.get(key)
+        if not old:
+            continue
+        line = f"   {key[0]:<11} c={key[1]:<3}"
+        if not old["ok"] or not scenario["ok"]:
+            print(f"{line}  no successful requests in {'before' if not old['ok'] else 'after'}")
+            continue
+        for metric in ("p50", "p95", "p99"):
+            delta = change(old["latency_ms"][metric], scenario["latency_ms"][metric])
+            line += f"  {metric} {scenario['latency_ms'][metric]:>8.1f}ms ({delta:+6.1f}%)"
+        rps = change(old["throughput_rps"], scenario["throughput_rps"])
+        line += f"  {scenario['throughput_rps']:>8.2f} req/s ({rps:+6.1f}%)"
+        print(line)
+        if fail_over is not None and change(old["latency_ms"]["p95"], scenario["latency_ms"]["p95"]) > fail_over:
+            regressions.append(key)
+
+    for mode in ("parse", "snapshot"):
+        old = (before.get("startup") or {}).get(mode)
+        new = (after.get("startup") or {}).get(mode)
+        if old and new:
+            print(f"   startup ({mode}): {new['median_s']:.2f}s ({change(old['median_s'], new['median_s']):+.1f}%)")
+
+    if regressions:
+        print(f"❌ p95 regressed by more than {fail_over}%: {regressions}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the WWLD backend end to end")
+    parser.add_argument("--corpus", default=os.getenv("TRANSCRIPTS_DIR", str(BACKEND_DIR.parent)),
+                        help="transcripts directory (default: TRANSCRIPTS_DIR or the repo root)")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=60, help="requests per scenario and level")
+    parser.add_argument("--ask-requests", type=int, default=None, help="requests for uncached /ask (default --requests)")
+    parser.add_argument("--only", default=None, help="comma-separated scenarios to run (ask,ask_cached,search,speakers)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--startup-runs", type=int, default=3, help="startups timed per mode (0 skips)")
+    parser.add_argument("--model", choices=("stub", "demo"), default="stub", help="stub server or demo mode")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="stub median latency")
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.3, help="stub log-normal sigma")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="stub share of 500 errors")
+    parser.add_argument("--seed", type=int, default=1, help="stub random seed")
+    parser.add_argument("--output", default=None, help="results file (default benchmark_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files and exit")
+    parser.add_argument("--fail-over", type=float, default=None, help="with --compare: exit 1 if any p95 grew more (%%)")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare, args.fail_over)
+
+    print("=" * 70)
+    print("🏁 WWLD Benchmark")
+    print("=" * 70)
+    result = run_benchmark(args)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['meta']['commit'] or 'unknown'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
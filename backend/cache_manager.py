@@ -3,19 +3,197 @@ CacheManager - Cache solutions to avoid repeated Claude API calls
 """
 
 import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
 import hashlib
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+from cache_store import CACHE_BACKENDS, WriteBehindQueue
+from semantic_cache import SemanticIndex
+
+class MemoryTier:
+    """
+    Size-bounded in-memory LRU with TTL expiry
+
+    Evicts least recently used entries once either the entry or the byte limit
+    is exceeded. Sizes are the length of each entry's JSON encoding. Request
+    handlers and the compactor thread share it, so every access holds _lock.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # {key: (expires_at, size, value)}, least recently used first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a live entry and mark it recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: dict, size: int) -> None:
+        """Insert or replace an entry, evicting as needed"""
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                evicted, _ = next(iter(self._entries.items()))
+                self._remove(evicted)
+                self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        """Drop a key if present"""
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        """Drop a key (caller holds _lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
 
 class CacheManager:
-    """Simple file-based caching for solutions"""
+    """
+    Two-tier caching for solutions
+
+    A bounded in-memory LRU (MemoryTier) serves hot keys without disk I/O;
+    a CacheStore backend under cache_dir holds everything and survives
+    restarts. With write_behind, store writes happen on a background thread.
+    With a similarity_threshold, lookup() also answers paraphrases of cached
+    problems in the same category.
+
+    The store is capped by entry count and bytes. A background compactor
+    evicts by the chosen policy ("lru" or "lfu") down to 90% of the budgets
+    whenever a set goes over, and periodically compacts the store.
+
+    With shared, several processes (uvicorn workers, or nodes mounting the
+    same cache_dir) use one store: every read first applies the store's
+    changes() from other processes to the index, budgets, semantic index and
+    memory tier, and writes go straight to the store so the others see them
+    on their next read.
+    """
+
+    EVICTION_POLICIES = ("lru", "lfu")
+    # Evict down to this fraction of the budgets so eviction runs in batches
+    LOW_WATERMARK = 0.9
+
+    def __init__(
+        self,
+        cache_dir: Path = None,
+        memory_entries: int = 256,
+        memory_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        backend: str = "file",
+        write_behind: bool = False,
+        similarity_threshold: Optional[float] = None,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        eviction: str = "lru",
+        compact_interval: Optional[float] = 600,
+        shared: bool = False
+    ):
+        if backend not in CACHE_BACKENDS:
+            raise ValueError(f"Unknown cache backend {backend!r}, expected one of {sorted(CACHE_BACKENDS)}")
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction!r}, expected one of {self.EVICTION_POLICIES}")
 
-    def __init__(self, cache_dir: Path = None):
         self.cache_dir = cache_dir or Path(__file__).parent / ".cache"
-        self.cache_dir.mkdir(exist_ok=True)
-        self.index_file = self.cache_dir / "index.json"
-        self.index = self._load_index()
+        self.backend = backend
+        self.store = CACHE_BACKENDS[backend](self.cache_dir, track_changes=shared)
+        self.shared = shared
+        if shared and write_behind:
+            print("⚠️  Shared cache writes go straight to the store; write-behind disabled")
+            write_behind = False
+        self.writer = WriteBehindQueue(self.store) if write_behind else None
+        self.synced_updates = 0
+        self.synced_removals = 0
+        self.memory = MemoryTier(memory_entries, memory_bytes, ttl_seconds)
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+        self.similarity_threshold = similarity_threshold
+        self.semantic = SemanticIndex()
+        self.semantic_hits = 0
+
+        # {key: {problem, category, timestamp, size, hits}}, least recently used first
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.compactions = 0
+
+        index = self.store.index()
+        for key in sorted(index, key=lambda key: index[key].get("timestamp") or ""):
+            meta = index[key]
+            self._entries[key] = dict(meta, hits=0)
+            self.total_bytes += meta.get("size", 0)
+            if similarity_threshold is not None:
+                self.semantic.add(key, meta.get("problem") or "", meta.get("category"))
+
+        self.compact_interval = compact_interval
+        self._compact_requested = threading.Event()
+        self._compactor = None
+        if compact_interval is not None:
+            self._compactor = threading.Thread(target=self._run_compactor, name="cache-compactor", daemon=True)
+            self._compactor.start()
+        if self._over_budget():
+            self._compact_requested.set()
+
+    @property
+    def index(self) -> dict:
+        """{key: {problem, category, timestamp, size}} for every stored solution"""
+        self._sync()
+        return self.store.index()
 
     def _get_cache_key(self, problem: str, category: str) -> str:
         """Generate cache key from problem and category"""
@@ -23,70 +201,267 @@ class CacheManager:
         return hashlib.md5(key_str).hexdigest()
 
     def get(self, problem: str, category: str) -> Optional[dict]:
-        """Retrieve cached solution"""
-        key = self._get_cache_key(problem, category)
-        cache_file = self.cache_dir / f"{key}.json"
+        """Retrieve cached solution (memory first, then disk)"""
+        return self._get_by_key(self._get_cache_key(problem, category))
 
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"⚠️  Cache read error: {str(e)}")
+    def lookup(self, problem: str, category: str) -> Tuple[Optional[dict], Optional[dict]]:
+        """
+        Retrieve a cached solution for the problem or a close paraphrase of it
+
+        Returns (solution, match) where match describes how it was found:
+        {"type": "exact"} or {"type": "semantic", "similarity", "matched_problem"}
+        """
+        solution = self.get(problem, category)
+        if solution is not None:
+            return solution, {"type": "exact"}
 
+        if self.similarity_threshold is None:
+            return None, None
+
+        nearest = self.semantic.nearest(problem, category)
+        if nearest is None:
+            return None, None
+
+        key, matched_problem, similarity = nearest
+        if similarity < self.similarity_threshold:
+            return None, None
+
+        solution = self._get_by_key(key)
+        if solution is None:
+            return None, None
+
+        self.semantic_hits += 1
+        return solution, {"type": "semantic", "similarity": similarity, "matched_problem": matched_problem}
+
+    def _sync(self) -> None:
+        """Apply writes and deletes made by other processes (shared mode only)"""
+        if not self.shared:
+            return
+        try:
+            updated, removed = self.store.changes()
+        except (json.JSONDecodeError, IOError, sqlite3.Error) as e:
+            print(f"⚠️  Cache sync error: {str(e)}")
+            return
+        if not updated and not removed:
+            return
+
+        with self._lock:
+            for key in removed:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.total_bytes -= entry["size"]
+            for key, meta in updated.items():
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.total_bytes -= previous["size"]
+                self._entries[key] = dict(meta, hits=previous["hits"] if previous else 0)
+                self.total_bytes += meta.get("size", 0)
+
+        # Memory copies of changed keys are stale; the next read loads the new payload
+        for key in removed:
+            self.memory.discard(key)
+            self.semantic.discard(key)
+        for key, meta in updated.items():
+            self.memory.discard(key)
+            if self.similarity_threshold is not None:
+                self.semantic.add(key, meta.get("problem") or "", meta.get("category"))
+
+        self.synced_updates += len(updated)
+        self.synced_removals += len(removed)
+
+    def _get_by_key(self, key: str) -> Optional[dict]:
+        """Memory tier, then pending writes, then the store"""
+        self._sync()
+        cached = self.memory.get(key)
+        if cached is not None:
+            self._touch(key)
+            return cached
+
+        try:
+            payload = self.writer.pending(key) if self.writer else None
+            if payload is None:
+                payload = self.store.get(key)
+            if payload is not None:
+                solution = json.loads(payload)
+                self.disk_hits += 1
+                self.memory.put(key, solution, len(payload))
+                self._touch(key)
+                return solution
+        except (json.JSONDecodeError, IOError, sqlite3.Error) as e:
+            print(f"⚠️  Cache read error: {str(e)}")
+
+        self.disk_misses += 1
         return None
 
+    def _touch(self, key: str) -> None:
+        """Record a hit for eviction ordering"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["hits"] += 1
+                self._entries.move_to_end(key)
+
     def set(self, problem: str, category: str, solution: dict) -> None:
         """Cache a solution"""
         key = self._get_cache_key(problem, category)
-        cache_file = self.cache_dir / f"{key}.json"
+        self._sync()
 
-        try:
-            with open(cache_file, 'w') as f:
-                json.dump(solution, f)
+        # The write and its entry land together, so compact() can't evict the key in between
+        with self._lock:
+            try:
+                payload = json.dumps(solution)
+                meta = {
+                    "problem": problem,
+                    "category": category,
+                    "timestamp": datetime.now().isoformat(),
+                    "size": len(payload)
+                }
+                self.memory.put(key, solution, len(payload))
+                if self.writer:
+                    self.writer.put(key, payload, meta)
+                else:
+                    self.store.put(key, payload, meta)
+            except Exception as e:
+                print(f"⚠️  Cache write error: {str(e)}")
+                return
 
-            self.index[key] = {
-                "problem": problem,
-                "category": category,
-                "timestamp": datetime.now().isoformat()
-            }
-            self._save_index()
-        except Exception as e:
-            print(f"⚠️  Cache write error: {str(e)}")
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous["size"]
+            self._entries[key] = dict(meta, hits=previous["hits"] if previous else 0)
+            self.total_bytes += meta["size"]
+            over_budget = self._over_budget()
+
+        if self.similarity_threshold is not None:
+            self.semantic.add(key, problem, category)
+
+        if over_budget:
+            if self._compactor is None:
+                self.compact()
+            else:
+                self._compact_requested.set()
+
+    def _over_budget(self) -> bool:
+        return len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes
+
+    def _eviction_victims(self) -> List[str]:
+        """Keys to drop to get under the low watermark, in eviction order"""
+        entry_target = int(self.max_entries * self.LOW_WATERMARK)
+        byte_target = int(self.max_bytes * self.LOW_WATERMARK)
+        if self.eviction == "lru":
+            candidates = iter(self._entries)
+        else:
+            # Fewest hits first; the LRU order breaks ties
+            order = {key: position for position, key in enumerate(self._entries)}
+            candidates = iter(sorted(self._entries, key=lambda key: (self._entries[key]["hits"], order[key])))
+
+        victims = []
+        entries, total_bytes = len(self._entries), self.total_bytes
+        for key in candidates:
+            if entries <= entry_target and total_bytes <= byte_target:
+                break
+            victims.append(key)
+            entries -= 1
+            total_bytes -= self._entries[key]["size"]
+        return victims
+
+    def compact(self) -> int:
+        """Evict down to the low watermark if over budget, then compact the store. Returns evictions"""
+        self._sync()  # budgets count what every process has written
+
+        # Victims are deleted under the lock so a concurrent set() of one of
+        # them lands either before it is evicted or after it is gone
+        with self._lock:
+            self.flush()  # queued writes must land before their keys can be deleted
+            victims = self._eviction_victims() if self._over_budget() else []
+            for key in victims:
+                self.total_bytes -= self._entries.pop(key)["size"]
 
-    def _load_index(self) -> dict:
-        """Load cache index"""
-        if self.index_file.exists():
             try:
-                with open(self.index_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"⚠️  Index load error: {str(e)}")
+                if victims:
+                    self.store.delete(victims)
+            except (IOError, sqlite3.Error) as e:
+                print(f"⚠️  Cache compaction error: {str(e)}")
 
-        return {}
+            for key in victims:
+                self.memory.discard(key)
+                self.semantic.discard(key)
 
-    def _save_index(self) -> None:
-        """Save cache index"""
         try:
-            with open(self.index_file, 'w') as f:
-                json.dump(self.index, f, indent=2)
-        except Exception as e:
-            print(f"⚠️  Index write error: {str(e)}")
+            self.store.compact()
+        except (IOError, sqlite3.Error) as e:
+            print(f"⚠️  Cache compaction error: {str(e)}")
+
+        self.evictions += len(victims)
+        self.compactions += 1
+        return len(victims)
+
+    def _run_compactor(self) -> None:
+        """Compact when a set goes over budget, and every compact_interval seconds"""
+        while True:
+            self._compact_requested.wait(self.compact_interval)
+            self._compact_requested.clear()
+            try:
+                evicted = self.compact()
+                if evicted:
+                    print(f"🧹 Evicted {evicted} cached solutions ({self.eviction})")
+            except Exception as e:
+                print(f"⚠️  Cache compaction error: {str(e)}")
+
+    def flush(self) -> None:
+        """Wait for queued write-behind writes to reach the store"""
+        if self.writer:
+            self.writer.flush()
 
     def clear(self) -> None:
         """Clear all cache"""
-        for cache_file in self.cache_dir.glob("*.json"):
-            if cache_file.name != "index.json":
-                cache_file.unlink()
+        self.flush()
+        self.store.clear()
+        self.memory.clear()
+        self.semantic.clear()
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
 
-        self.index = {}
-        self._save_index()
+    def list_entries(self, offset: int = 0, limit: int = 50) -> Dict:
+        """One page of cached solutions, most recently used first"""
+        self._sync()
+        with self._lock:
+            page = [
+                dict(entry, key=key)
+                for key, entry in islice(reversed(self._entries.items()), offset, offset + limit)
+            ]
+            total = len(self._entries)
+        return {"total": total, "offset": offset, "limit": limit, "entries": page}
 
     def get_stats(self) -> dict:
-        """Get cache statistics"""
-        cache_files = list(self.cache_dir.glob("*.json"))
+        """Get cache statistics (counters only; see list_entries for the index)"""
+        self._sync()
         return {
-            "cached_solutions": len([f for f in cache_files if f.name != "index.json"]),
+            "cached_solutions": len(self._entries),
             "cache_dir": str(self.cache_dir),
-            "index": self.index
+            "backend": self.backend,
+            "write_behind": self.writer.get_stats() if self.writer else None,
+            "shared": {
+                "synced_updates": self.synced_updates,
+                "synced_removals": self.synced_removals
+            } if self.shared else None,
+            "budget": {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "eviction": self.eviction,
+                "evictions": self.evictions,
+                "compactions": self.compactions
+            },
+            "tiers": {
+                "memory": self.memory.get_stats(),
+                "disk": {"hits": self.disk_hits, "misses": self.disk_misses}
+            },
+            "semantic": dict(
+                self.semantic.get_stats(),
+                threshold=self.similarity_threshold,
+                hits=self.semantic_hits
+            )
         }
@@ -0,0 +1,472 @@
+"""
+CacheStore - Storage backends for CacheManager's persistent tier
+
+Every backend stores a JSON payload per cache key plus a small metadata
+record (problem, category, timestamp). Inserts are O(1) and safe with
+several workers writing at once, and changes() reports what other processes
+sharing the store wrote or deleted since the last call.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so one process per cache dir
+    fcntl = None
+
+
+class CacheStore:
+    """Interface shared by the cache storage backends"""
+
+    def get(self, key: str) -> Optional[str]:
+        """JSON payload for a key (None if missing)"""
+        raise NotImplementedError
+
+    def put(self, key: str, payload: str, meta: dict) -> None:
+        """Insert or replace a key"""
+        raise NotImplementedError
+
+    def index(self) -> Dict[str, dict]:
+        """{key: meta} for every stored key; meta includes the payload size"""
+        raise NotImplementedError
+
+    def delete(self, keys: Iterable[str]) -> None:
+        """Remove keys (missing keys are ignored)"""
+        raise NotImplementedError
+
+    def changes(self) -> Tuple[Dict[str, dict], Set[str]]:
+        """
+        ({key: meta} written, {key} removed) by other processes since the last call
+
+        Stores only keep this record when opened with track_changes (shared
+        mode); otherwise nothing would ever drain it.
+        """
+        return {}, set()
+
+    def compact(self) -> None:
+        """Reclaim space left behind by replaced and deleted keys"""
+        pass
+
+    def clear(self) -> None:
+        """Remove every key"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class FileCacheStore(CacheStore):
+    """
+    One JSON file per key plus an append-only index log
+
+    Payload files are written to a temp file and renamed into place. Index
+    updates are appended to index.log as single JSON lines and replayed on
+    open, on top of any legacy index.json. Deletions are logged as
+    tombstones; compact() rewrites the log with only the live records
+    (index.json itself is never rewritten, so dropped legacy keys keep a
+    tombstone).
+
+    Several processes can share the directory. Renames and log writes happen
+    under an exclusive flock on index.lock, so a compaction never drops
+    records another process appended, and each process follows the log from
+    the byte offset it last read. A log that was replaced (compacted) or
+    removed (cleared) by another process is reloaded and diffed. Those
+    changes are queued for changes() only with track_changes.
+    """
+
+    LOG_NAME = "index.log"
+    LEGACY_INDEX_NAME = "index.json"
+    LOCK_NAME = "index.lock"
+    # Temp files older than this belong to writers that died mid-write
+    STALE_TMP_SECONDS = 3600
+
+    def __init__(self, cache_dir: Path, track_changes: bool = False):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(exist_ok=True)
+        self.track_changes = track_changes
+        self.log_file = self.cache_dir / self.LOG_NAME
+        self.legacy_index_file = self.cache_dir / self.LEGACY_INDEX_NAME
+        self.lock_file = self.cache_dir / self.LOCK_NAME
+        self._lock = threading.Lock()
+        self._legacy_keys = set()
+        self._log_records = 0
+        self._log_id = None  # (st_dev, st_ino) of the log file read so far
+        self._log_position = 0  # bytes of that file applied to _index
+        self._updated = {}  # {key: meta} written by other processes, not yet returned by changes()
+        self._removed = set()
+        self._index = self._load_index()
+
+    @contextmanager
+    def _log_locked(self):
+        """Hold the thread lock and the cross-process lock on the log"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)  # releases the flock
+
+    def _load_index(self) -> Dict[str, dict]:
+        """Legacy index.json, then every record in the log"""
+        index = {}
+        if self.legacy_index_file.exists():
+            try:
+                with open(self.legacy_index_file, 'r') as f:
+                    index.update(json.load(f))
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"⚠️  Index load error: {str(e)}")
+        self._legacy_keys = set(index)
+
+        self._log_records = 0
+        self._log_id = None
+        self._log_position = 0
+        try:
+            with open(self.log_file, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                self._log_id = (stat.st_dev, stat.st_ino)
+                for key, record in self._read_records(f, stat.st_size):
+                    if record is None:
+                        index.pop(key, None)
+                    else:
+                        index[key] = record
+        except FileNotFoundError:
+            pass
+
+        # Legacy entries predate size tracking
+        for key, meta in index.items():
+            if "size" not in meta:
+                cache_file = self._path(key)
+                meta["size"] = cache_file.stat().st_size if cache_file.exists() else 0
+
+        return index
+
+    def _read_records(self, f, size: int):
+        """(key, meta or None for a tombstone) for each complete line from _log_position to size"""
+        f.seek(self._log_position)
+        data = f.read(size - self._log_position)
+        end = data.rfind(b"\n") + 1  # a line still being written is read next time
+        self._log_position += end
+        for line in data[:end].splitlines():
+            self._log_records += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn line from a crashed writer
+            key = record.pop("key")
+            yield key, None if record.get("deleted") else record
+
+    def _catch_up(self) -> None:
+        """Apply log records written by other processes (caller holds _lock)"""
+        try:
+            stat = os.stat(self.log_file)
+        except FileNotFoundError:
+            stat = None
+        log_id = (stat.st_dev, stat.st_ino) if stat else None
+        if log_id == self._log_id and (stat is None or stat.st_size == self._log_position):
+            return
+
+        if log_id == self._log_id and stat.st_size > self._log_position:
+            try:
+                with open(self.log_file, 'rb') as f:
+                    stat = os.fstat(f.fileno())
+                    if (stat.st_dev, stat.st_ino) == self._log_id:
+                        for key, record in self._read_records(f, stat.st_size):
+                            self._note_change(key, record)
+                        return
+            except FileNotFoundError:
+                pass
+
+        # Compacted or cleared by another process
+        previous = self._index
+        self._index = self._load_index()
+        for key in previous.keys() - self._index.keys():
+            self._note_change(key, None, apply=False)
+        for key, meta in self._index.items():
+            if previous.get(key) != meta:
+                self._note_change(key, meta, apply=False)
+
+    def _note_change(self, key: str, meta: Optional[dict], apply: bool = True) -> None:
+        """Apply another process's write (meta) or delete (None), recording it for changes()"""
+        if meta is None:
+            if apply and self._index.pop(key, None) is None:
+                return
+            if self.track_changes:
+                self._updated.pop(key, None)
+                self._removed.add(key)
+        else:
+            if apply:
+                self._index[key] = meta
+            if self.track_changes:
+                self._removed.discard(key)
+                self._updated[key] = meta
+
+    def _append(self, records) -> None:
+        """Append JSON records to the log in a single write (caller holds _log_locked)"""
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            stat = os.fstat(fd)
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        # _catch_up ran under the same lock, so nothing was appended in between
+        self._log_id = (stat.st_dev, stat.st_ino)
+        self._log_position = stat.st_size + len(data)
+        self._log_records += len(records)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, payload: str, meta: dict) -> None:
+        cache_file = self._path(key)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_file, 'w') as f:
+            f.write(payload)
+
+        # Rename and log together, so the last logged meta matches the file on disk
+        with self._log_locked():
+            self._catch_up()
+            os.replace(tmp_file, cache_file)
+            self._append([dict(meta, key=key)])
+            self._index[key] = meta
+
+    def index(self) -> Dict[str, dict]:
+        with self._lock:
+            return dict(self._index)
+
+    def changes(self) -> Tuple[Dict[str, dict], Set[str]]:
+        with self._lock:
+            self._catch_up()
+            updated, removed = self._updated, self._removed
+            self._updated, self._removed = {}, set()
+        return updated, removed
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        with self._log_locked():
+            self._catch_up()
+            for key in keys:
+                self._path(key).unlink(missing_ok=True)
+            self._append([{"key": key, "deleted": True} for key in keys])
+            for key in keys:
+                self._index.pop(key, None)
+
+    def compact(self) -> None:
+        """Rewrite the log from the live index once it holds superseded records"""
+        with self._log_locked():
+            # Records appended by other processes must survive the rewrite
+            self._catch_up()
+            records = [dict(meta, key=key) for key, meta in self._index.items()]
+            records += [{"key": key, "deleted": True} for key in self._legacy_keys - set(self._index)]
+            if self._log_records > len(records):
+                tmp_file = self.log_file.with_name(f"{self.LOG_NAME}.{os.getpid()}.tmp")
+                with open(tmp_file, 'w') as f:
+                    f.writelines(json.dumps(record) + "\n" for record in records)
+                os.replace(tmp_file, self.log_file)
+                stat = os.stat(self.log_file)
+                self._log_id = (stat.st_dev, stat.st_ino)
+                self._log_position = stat.st_size
+                self._log_records = len(records)
+
+        # Temp files left by writers that died mid-write (other processes may be mid-write now)
+        cutoff = time.time() - self.STALE_TMP_SECONDS
+        for stale in self.cache_dir.glob("*.json.*.tmp"):
+            try:
+                if stale.stat().st_mtime < cutoff:
+                    stale.unlink()
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        with self._log_locked():
+            for cache_file in self.cache_dir.glob("*.json"):
+                cache_file.unlink(missing_ok=True)
+            self.log_file.unlink(missing_ok=True)
+            self._index = {}
+            self._legacy_keys = set()
+            self._log_records = 0
+            self._log_id = None
+            self._log_position = 0
+            self._updated, self._removed = {}, set()
+
+
+class SQLiteCacheStore(CacheStore):
+    """
+    Single-table SQLite store in WAL mode (readers never block the writer)
+
+    SQLite serializes writers across processes itself. PRAGMA data_version
+    moves only when another connection commits, so changes() costs one
+    pragma until then, and a key/timestamp scan (no payloads) after.
+    """
+
+    DB_NAME = "cache.sqlite3"
+    # VACUUM rewrites the whole file under an exclusive lock, so it only runs
+    # once this fraction of the pages is free
+    VACUUM_FREE_FRACTION = 0.25
+
+    def __init__(self, cache_dir: Path, track_changes: bool = False):
+        cache_dir.mkdir(exist_ok=True)
+        self.db_file = cache_dir / self.DB_NAME
+        self.track_changes = track_changes
+        self._lock = threading.Lock()
+        # Shared by the request thread and the write-behind thread, guarded by _lock
+        self._conn = sqlite3.connect(self.db_file, timeout=10.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, problem TEXT, category TEXT, timestamp TEXT, payload TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        # {key: timestamp} as of the last changes(), kept current with this connection's writes
+        self._known = dict(self._conn.execute("SELECT key, timestamp FROM entries").fetchall())
+        self.vacuums = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, payload: str, meta: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, problem, category, timestamp, payload) VALUES (?, ?, ?, ?, ?)",
+                (key, meta.get("problem"), meta.get("category"), meta.get("timestamp"), payload)
+            )
+            self._known[key] = meta.get("timestamp")
+
+    def index(self) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, problem, category, timestamp, length(payload) FROM entries"
+            ).fetchall()
+        return {key: {"problem": problem, "category": category, "timestamp": timestamp, "size": size}
+                for key, problem, category, timestamp, size in rows}
+
+    def changes(self) -> Tuple[Dict[str, dict], Set[str]]:
+        if not self.track_changes:
+            return {}, set()
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return {}, set()
+            self._data_version = data_version
+
+            current = dict(self._conn.execute("SELECT key, timestamp FROM entries").fetchall())
+            changed = [key for key, timestamp in current.items()
+                       if key not in self._known or self._known[key] != timestamp]
+            removed = self._known.keys() - current.keys()
+            self._known = current
+
+            updated = {}
+            for key in changed:
+                row = self._conn.execute(
+                    "SELECT problem, category, timestamp, length(payload) FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    problem, category, timestamp, size = row
+                    updated[key] = {"problem": problem, "category": category, "timestamp": timestamp, "size": size}
+        return updated, set(removed)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+            for key in keys:
+                self._known.pop(key, None)
+
+    def compact(self) -> None:
+        """Checkpoint the WAL, and return free pages to the filesystem once enough are free"""
+        with self._lock:
+            free = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            pages = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            if pages and free / pages >= self.VACUUM_FREE_FRACTION:
+                self._conn.execute("VACUUM")
+                self.vacuums += 1
+            # In WAL mode the database file only shrinks once the vacuum is checkpointed
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._known = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+CACHE_BACKENDS = {
+    "file": FileCacheStore,
+    "sqlite": SQLiteCacheStore
+}
+
+
+class WriteBehindQueue:
+    """
+    Apply store writes on a background thread
+
+    Writes still queued are visible through pending(), so a read that lands
+    between put and flush does not miss.
+    """
+
+    def __init__(self, store: CacheStore):
+        self.store = store
+        self._queue = queue.Queue()
+        self._pending = {}  # {key: payload} queued but not yet written
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="cache-write-behind", daemon=True)
+        self._thread.start()
+
+    def put(self, key: str, payload: str, meta: dict) -> None:
+        with self._lock:
+            self._pending[key] = payload
+        self._queue.put((key, payload, meta))
+
+    def pending(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._pending.get(key)
+
+    def _run(self) -> None:
+        while True:
+            key, payload, meta = self._queue.get()
+            try:
+                self.store.put(key, payload, meta)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️  Cache write error: {str(e)}")
+            finally:
+                with self._lock:
+                    if self._pending.get(key) is payload:
+                        del self._pending[key]
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued write has been applied"""
+        self._queue.join()
+
+    def get_stats(self) -> Dict:
+        return {"queued": self._queue.qsize(), "written": self.written, "failed": self.failed}
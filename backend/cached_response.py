@@ -0,0 +1,89 @@
+"""
+CachedResponse - Pre-serialized bodies for read-mostly endpoints
+
+The JSON body is rendered once per version (for corpus listings, the corpus
+version), gzip-compressed once if it is large, and served with a strong
+ETag. A request whose If-None-Match carries that ETag gets 304 with no body,
+so a client revalidating an unchanged list costs a header comparison.
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Smaller bodies are sent uncompressed; gzip framing would eat most of the gain
+GZIP_MIN_BYTES = 1024
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip (q=0 refuses it)"""
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """Whether If-None-Match lists either representation of tag (weak comparison, as RFC 9110 asks)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') in (tag, f"{tag}-gzip"):
+            return True
+    return False
+
+
+class CachedResponse:
+    """A JSON body re-rendered only when version() changes, with its gzip encoding and ETag"""
+
+    def __init__(self, render: Callable[[], Any], version: Callable[[], str] = lambda: ""):
+        self.render = render
+        self.version = version
+        self._current = None  # (version, body, gzipped body or None, etag value)
+
+    def _rendered(self) -> Tuple[str, bytes, Optional[bytes], str]:
+        version = self.version()
+        if self._current is None or self._current[0] != version:
+            # Same serialization as FastAPI's JSONResponse
+            body = json.dumps(self.render(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            digest = hashlib.sha256(body).hexdigest()
+            tag = f"{version[:16]}-{digest[:16]}" if version else digest[:32]
+            gzipped = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+            self._current = (version, body, gzipped, tag)
+        return self._current
+
+    def respond(self, request: Request) -> Response:
+        """200 with the (possibly gzipped) body, or 304 if the client's copy is current"""
+        _, body, gzipped, tag = self._rendered()
+        use_gzip = gzipped is not None and accepts_gzip(request.headers.get("accept-encoding", ""))
+
+        # The gzip representation is a different byte sequence, so it gets its own strong tag
+        headers = {
+            "ETag": f'"{tag}-gzip"' if use_gzip else f'"{tag}"',
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding"
+        }
+        if etag_matches(request.headers.get("if-none-match"), tag):
+            return Response(status_code=304, headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            body = gzipped
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,112 @@
+"""
+CorpusSnapshot - Persist TranscriptProcessor's parsed state for fast cold starts
+
+File layout:
+    MAGIC (8 bytes) | format version (uint32) | header length (uint64)
+    header JSON | padding | array blobs (each aligned to 64 bytes)
+
+The JSON header carries the file manifest, speaker/role/episode metadata,
+per-episode corpus statistics and the offset, dtype and length of every
+array. Arrays are returned as read-only views over an mmap of the file, so
+loading is O(header) and index pages are only faulted in when a query
+touches them.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+SNAPSHOT_FILENAME = ".wwld_snapshot.bin"
+SNAPSHOT_MAGIC = b"WWLDSNAP"
+SNAPSHOT_VERSION = 4
+
+_PREAMBLE = struct.Struct("<8sIQ")
+_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    """Round offset up to the array alignment"""
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_snapshot(path: Path, header: dict, arrays: Dict[str, np.ndarray]) -> None:
+    """Atomically write header + arrays to path (safe with several writers booting at once)"""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "length": int(array.shape[0]),
+            "offset": offset
+        }
+        offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(dict(header, arrays=layout)).encode("utf-8")
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    # Each writer fills its own file, so the rename publishes one complete snapshot
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def read_snapshot(path: Path) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    """
+    Map a snapshot file and return (header, arrays)
+
+    Returns None if the file is missing, truncated or from another format version.
+    """
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Snapshot open error: {str(e)}")
+        return None
+
+    try:
+        magic, version, header_length = _PREAMBLE.unpack_from(mapped, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            print(f"   ℹ️  Ignoring snapshot with format version {version}")
+            return None
+
+        header_end = _PREAMBLE.size + header_length
+        header = json.loads(mapped[_PREAMBLE.size:header_end].decode("utf-8"))
+        data_start = _aligned(header_end)
+
+        arrays = {}
+        for name, spec in header.pop("arrays").items():
+            if not spec["length"]:
+                arrays[name] = np.empty(0, dtype=np.dtype(spec["dtype"]))
+                continue
+            arrays[name] = np.frombuffer(
+                mapped,
+                dtype=np.dtype(spec["dtype"]),
+                count=spec["length"],
+                offset=data_start + spec["offset"]
+            )
+    except (struct.error, ValueError, KeyError, UnicodeDecodeError) as e:
+        print(f"⚠️  Snapshot read error: {str(e)}")
+        return None
+
+    return header, arrays
@@ -0,0 +1,126 @@
+"""
+CorpusStats - Running aggregates over the loaded transcripts
+
+Totals, per-speaker token counts and sorted size columns are updated as each
+episode is added, changed or removed, so summaries and percentiles are read
+without touching the episodes. Sizes are kept as sorted lists: an update is
+a binary search plus a list insert/delete, a percentile is one index.
+
+The per-episode figures are saved in the corpus snapshot; a warm start
+rebuilds the columns with one sort and then applies only the changed episodes.
+"""
+
+import bisect
+import heapq
+import math
+from typing import Dict, List, Optional
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+
+class CorpusStats:
+    """Incrementally maintained corpus totals, largest episode and size distribution"""
+
+    def __init__(self):
+        self.episodes = {}  # {episode_name: (characters, tokens, speaker_name)}
+        self.total_characters = 0
+        self.total_tokens = 0
+        self.speaker_tokens = {}  # {speaker_name: tokens across their episodes}
+        self._speaker_episodes = {}  # {speaker_name: episodes counted}
+        self._characters = []  # sorted (characters, episode_name)
+        self._tokens = []  # sorted token counts
+
+    def __len__(self) -> int:
+        return len(self.episodes)
+
+    @classmethod
+    def from_figures(cls, figures: Dict[str, list]) -> "CorpusStats":
+        """Build from {episode_name: [characters, tokens, speaker_name]} with one sort per column"""
+        stats = cls()
+        for episode_name, (characters, tokens, speaker_name) in figures.items():
+            stats.episodes[episode_name] = (characters, tokens, speaker_name)
+            stats.total_characters += characters
+            stats.total_tokens += tokens
+            stats.speaker_tokens[speaker_name] = stats.speaker_tokens.get(speaker_name, 0) + tokens
+            stats._speaker_episodes[speaker_name] = stats._speaker_episodes.get(speaker_name, 0) + 1
+        stats._characters = sorted((characters, name) for name, (characters, _, _) in stats.episodes.items())
+        stats._tokens = sorted(tokens for _, tokens, _ in stats.episodes.values())
+        return stats
+
+    def to_figures(self) -> Dict[str, list]:
+        """{episode_name: [characters, tokens, speaker_name]}, as stored in the snapshot"""
+        return {episode_name: list(figures) for episode_name, figures in self.episodes.items()}
+
+    def add(self, episode_name: str, characters: int, tokens: int, speaker_name: str) -> None:
+        """Count an episode (replacing its previous figures if it changed)"""
+        if episode_name in self.episodes:
+            self.remove(episode_name)
+
+        self.episodes[episode_name] = (characters, tokens, speaker_name)
+        self.total_characters += characters
+        self.total_tokens += tokens
+        self.speaker_tokens[speaker_name] = self.speaker_tokens.get(speaker_name, 0) + tokens
+        self._speaker_episodes[speaker_name] = self._speaker_episodes.get(speaker_name, 0) + 1
+        bisect.insort(self._characters, (characters, episode_name))
+        bisect.insort(self._tokens, tokens)
+
+    def remove(self, episode_name: str) -> None:
+        """Stop counting an episode (no-op if it is not counted)"""
+        if episode_name not in self.episodes:
+            return
+
+        characters, tokens, speaker_name = self.episodes.pop(episode_name)
+        self.total_characters -= characters
+        self.total_tokens -= tokens
+        self.speaker_tokens[speaker_name] -= tokens
+        self._speaker_episodes[speaker_name] -= 1
+        if not self._speaker_episodes[speaker_name]:
+            del self.speaker_tokens[speaker_name]
+            del self._speaker_episodes[speaker_name]
+        del self._characters[bisect.bisect_left(self._characters, (characters, episode_name))]
+        del self._tokens[bisect.bisect_left(self._tokens, tokens)]
+
+    @property
+    def largest_episode(self) -> Optional[str]:
+        """Episode with the most characters (the last name on a tie), None when empty"""
+        return self._characters[-1][1] if self._characters else None
+
+    @staticmethod
+    def _percentile(ordered: List, p: float):
+        """Nearest-rank percentile of a sorted list"""
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    def summary(self) -> Dict:
+        """Totals and averages"""
+        count = len(self.episodes)
+        return {
+            "total_transcripts": count,
+            "total_characters": self.total_characters,
+            "total_tokens": self.total_tokens,
+            "average_transcript_length": self.total_characters / count if count else 0,
+            "average_transcript_tokens": self.total_tokens / count if count else 0,
+            "largest_episode": self.largest_episode
+        }
+
+    def distribution(self) -> Dict:
+        """Min, max and percentiles of episode size in characters and tokens"""
+        if not self.episodes:
+            return {"characters": {}, "tokens": {}}
+
+        return {
+            "characters": {
+                "min": self._characters[0][0],
+                "max": self._characters[-1][0],
+                **{f"p{p}": self._percentile(self._characters, p)[0] for p in PERCENTILES}
+            },
+            "tokens": {
+                "min": self._tokens[0],
+                "max": self._tokens[-1],
+                **{f"p{p}": self._percentile(self._tokens, p) for p in PERCENTILES}
+            }
+        }
+
+    def top_speakers(self, n: int = 10) -> List[Dict]:
+        """The n speakers with the most tokens"""
+        top = heapq.nlargest(n, self.speaker_tokens.items(), key=lambda item: (item[1], item[0]))
+        return [{"speaker": speaker, "tokens": tokens} for speaker, tokens in top]
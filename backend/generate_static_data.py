@@ -1,87 +1,304 @@
 #!/usr/bin/env python3
 """
 Generate Static Data for GitHub Pages Deployment
-Generates pre-cached responses for all popular problems and exports as data.json
+Generates pre-cached responses for all popular problems and exports them to data/
 This enables fully static GitHub Pages deployment without backend API calls
+
+The frontend loads the small data/index.json (problems, speakers, categories)
+and then only the shard of the problem it shows: data/responses/<id>.json,
+where id is a hash of the lowercased problem. Every file also gets .gz and
+(with the brotli package) .br siblings for servers that serve precompressed
+files.
+
+Builds are incremental: data/build-manifest.json records a content hash
+of every answer's inputs - the problem, its speakers, their transcripts
+and excerpts, and the prompt template. Only answers whose hash changed
+are regenerated, concurrently; the rest are reused from their shards. No
+manifest is checked in, so the first build on a fresh checkout is a full
+build; the weekly regenerate workflow commits the manifest it writes,
+and builds after that are incremental. --adopt records answers that
+predate it as current, but only those built the way this run would build
+them (same mode, plan speakers); the rest are left for the next build to
+regenerate.
 """
 
+import argparse
+import asyncio
+import gzip
+import hashlib
 import json
 import os
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from transcript_processor import TranscriptProcessor
 from solution_generator import SolutionGenerator
+from speaker_index import SpeakerIndex
+
+try:
+    import brotli
+except ImportError:  # optional: .br siblings are skipped without it
+    brotli = None
+
+MANIFEST_VERSION = 1
+
+# Hex digits of the key hash naming a response shard
+SHARD_ID_LENGTH = 16
+
+# Claude calls in flight at once while generating
+DEFAULT_WORKERS = 8
+
+
+def content_hash(value) -> str:
+    """sha256 of a string, or of any JSON-serializable value"""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def shard_id(problem_key: str) -> str:
+    """File name (without extension) of a problem's response shard"""
+    return content_hash(problem_key)[:SHARD_ID_LENGTH]
+
 
 class StaticDataGenerator:
     """Generate pre-cached responses for static site deployment"""
 
-    def __init__(self, transcripts_dir: Path = None, demo_mode: bool = False):
+    def __init__(
+        self,
+        transcripts_dir: Path = None,
+        demo_mode: bool = False,
+        workers: int = DEFAULT_WORKERS,
+        output_dir: Optional[Path] = None,
+        use_speaker_index: bool = True
+    ):
         """Initialize generator with transcript processor"""
         if transcripts_dir is None:
             transcripts_dir = Path(__file__).parent.parent
 
         self.transcripts_dir = Path(transcripts_dir)
         self.demo_mode = demo_mode
-        self.output_path = Path(__file__).parent.parent / "data.json"
+        self.output_dir = Path(output_dir) if output_dir else Path(__file__).parent.parent / "data"
+        self.index_path = self.output_dir / "index.json"
+        self.responses_dir = self.output_dir / "responses"
+        self.manifest_path = self.output_dir / "build-manifest.json"
 
         print(f"📁 Loading transcripts from: {self.transcripts_dir}")
         self.processor = TranscriptProcessor(self.transcripts_dir)
-        self.generator = SolutionGenerator(self.processor, demo_mode=demo_mode)
-
-    def generate_all_data(self) -> Dict:
-        """Generate complete static data package"""
+        speaker_index = None
+        if use_speaker_index:
+            speaker_index = SpeakerIndex.load_or_build(self.processor, SolutionGenerator.CATEGORY_KEYWORDS)
+        self.generator = SolutionGenerator(
+            self.processor,
+            demo_mode=demo_mode,
+            max_concurrency=workers,
+            speaker_index=speaker_index
+        )
+        self.manifest = None
+        self._transcript_hashes = {}
+
+    def generate_all_data(self, force: bool = False, adopt: bool = False) -> Dict:
+        """
+        Generate complete static data package, reusing answers whose inputs are unchanged
+
+        With adopt, nothing is generated: answers already in data/ that were
+        built in this run's mode from its planned speakers are recorded in
+        the manifest as current, and the others are kept but not recorded.
+        """
         print("\n🔄 Generating static data...")
 
+        problems = self.generator.POPULAR_PROBLEMS
+        previous, previous_manifest = self._load_previous()
+        previous_responses = self._load_previous_responses(previous, [problem.lower() for problem in problems])
+        previous_entries = previous_manifest.get("entries", {})
+
+        prompt_hash = self._prompt_hash()
+        problems_hash = content_hash(problems)
+        if previous_manifest and previous_manifest.get("prompt") != prompt_hash:
+            print("   📝 Prompt template changed")
+        if previous_manifest and previous_manifest.get("problems") != problems_hash:
+            print("   📝 Problem list changed")
+
+        # Retrieval is cheap and decides exactly what Claude would see, so every
+        # problem is planned and the plan itself is hashed
+        plans = self.generator.plan_solutions_batch(problems, num_solutions=3)
+        keys = [self._entry_key(plan, prompt_hash) for plan in plans]
+        if adopt:
+            stale = [
+                i for i, (problem, plan) in enumerate(zip(problems, plans))
+                if not self._adoptable(plan, previous_responses.get(problem.lower()))
+            ]
+            print(f"   📌 Adopting {len(problems) - len(stale)} existing answers, {len(stale)} missing or built otherwise")
+        else:
+            stale = [
+                i for i, (problem, key) in enumerate(zip(problems, keys))
+                if force or previous_entries.get(problem.lower()) != key or problem.lower() not in previous_responses
+            ]
+            print(f"   ♻️  {len(problems) - len(stale)} up to date, {len(stale)} to generate")
+
+        # Stale problems are generated in one batch: every extraction is queued
+        # on the scheduler at once and runs up to the worker limit concurrently
+        generated = {}
+        if stale and not adopt:
+            try:
+                results = asyncio.run(
+                    self.generator.generate_planned_async([plans[i] for i in stale], priority="background")
+                )
+                generated = dict(zip(stale, results))
+            except Exception as e:
+                print(f"   ⚠️  Error generating solutions: {str(e)}")
+
         data = {
             "metadata": {
-                "generated": datetime.now().isoformat(),
+                # Unchanged when every answer was reused, so a no-op build leaves every file as it was
+                "generated": datetime.now().isoformat() if generated
+                else previous.get("metadata", {}).get("generated", datetime.now().isoformat()),
                 "version": "1.0",
                 "source": "WWLD Backend",
-                "total_problems": len(self.generator.POPULAR_PROBLEMS),
-                "total_solutions": len(self.generator.POPULAR_PROBLEMS) * 3,
+                "total_problems": len(problems),
+                "total_solutions": len(problems) * 3,
                 "note": "Pre-generated responses for GitHub Pages static deployment"
             },
             "responses": {},
-            "speakers": self._generate_speakers_list(),
+            # Adopted answers keep the speaker list they were built with
+            "speakers": previous.get("speakers") if adopt and previous.get("speakers") else self._generate_speakers_list(),
             "categories": list(self.generator.PROBLEM_CATEGORIES.keys()),
-            "popular_problems": self.generator.POPULAR_PROBLEMS
+            "popular_problems": problems
         }
+        entries = {}
 
-        # Generate solutions for each popular problem
-        for i, problem in enumerate(self.generator.POPULAR_PROBLEMS, 1):
-            print(f"\n[{i}/{len(self.generator.POPULAR_PROBLEMS)}] Generating solutions for:")
-            print(f"   📌 {problem}")
-
-            try:
-                result = self.generator.generate_solutions(problem, num_solutions=3)
+        for i, (problem, key) in enumerate(zip(problems, keys)):
+            # Normalize problem key (lowercase, for lookups)
+            problem_key = problem.lower()
+            result = generated.get(i)
 
-                # Normalize problem key (lowercase, for lookups)
-                problem_key = problem.lower()
-                data["responses"][problem_key] = result
+            if result is None and i not in stale:
+                data["responses"][problem_key] = previous_responses[problem_key]
+                entries[problem_key] = key
+                continue
 
-                # Show what we got
-                num_solutions = len(result.get("solutions", []))
-                print(f"   ✅ Generated {num_solutions} solutions")
+            if adopt:
+                # Kept but not recorded in the manifest, so the next build regenerates it
+                if problem_key in previous_responses:
+                    data["responses"][problem_key] = previous_responses[problem_key]
+                continue
 
-                if num_solutions > 0:
-                    for sol in result["solutions"]:
-                        print(f"      • {sol['speaker']}")
+            print(f"\n[{i + 1}/{len(problems)}] Generated solutions for:")
+            print(f"   📌 {problem}")
 
-            except Exception as e:
-                print(f"   ⚠️  Error generating solutions: {str(e)}")
+            num_solutions = len(result.get("solutions", [])) if result else 0
+            if num_solutions == 0:
+                # Not recorded in the manifest, so the next build tries again
+                print("   ⚠️  No solutions generated")
+                if problem_key in previous_responses:
+                    data["responses"][problem_key] = previous_responses[problem_key]
+                    print("      Keeping the previous answer")
                 continue
 
+            data["responses"][problem_key] = result
+            entries[problem_key] = key
+
+            # Show what we got
+            print(f"   ✅ Generated {num_solutions} solutions")
+            for sol in result["solutions"]:
+                print(f"      • {sol['speaker']}")
+
+        self.manifest = {
+            "version": MANIFEST_VERSION,
+            "prompt": prompt_hash,
+            "problems": problems_hash,
+            "transcripts": dict(sorted(self._transcript_hashes.items())),
+            "entries": entries
+        }
         return data
 
+    def _load_previous(self) -> Tuple[Dict, Dict]:
+        """(index, manifest) from the last build, empty where missing or unreadable"""
+        index, manifest = (self._read_json(path) or {} for path in (self.index_path, self.manifest_path))
+        if manifest.get("version") != MANIFEST_VERSION:
+            manifest = {}
+        return index, manifest
+
+    def _load_previous_responses(self, index: Dict, problem_keys: List[str]) -> Dict[str, Dict]:
+        """{problem key: response} from the last build's shards, for the given problems"""
+        shards = index.get("problems", {})
+        responses = {}
+        for problem_key in problem_keys:
+            if problem_key in shards:
+                response = self._read_json(self.responses_dir / f"{shards[problem_key]}.json")
+                if response is not None:
+                    responses[problem_key] = response
+        return responses
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[Dict]:
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return None
+
+    def _prompt_hash(self) -> str:
+        """Hash of everything about the Claude call that is not per-problem"""
+        return content_hash([
+            self.generator.EXTRACTION_PROMPT,
+            self.generator.MODEL,
+            self.generator.PROMPT_CHAR_BUDGET
+        ])
+
+    def _transcript_hash(self, episode_name: str) -> str:
+        if episode_name not in self._transcript_hashes:
+            self._transcript_hashes[episode_name] = content_hash(self.processor.get_transcript_content(episode_name))
+        return self._transcript_hashes[episode_name]
+
+    def _entry_key(self, plan: Tuple[str, str, List[Tuple[str, str, str, str]]], prompt_hash: str) -> str:
+        """Hash of one answer's inputs: problem, category, prompt and each speaker's transcript and excerpt"""
+        problem, category, targets = plan
+        return content_hash([
+            problem,
+            category,
+            self.demo_mode,
+            prompt_hash,
+            [
+                [speaker_name, role, episode_name, self._transcript_hash(episode_name), content_hash(excerpt)]
+                for speaker_name, role, episode_name, excerpt in targets
+            ]
+        ])
+
+    def _adoptable(self, plan: Tuple[str, str, List[Tuple[str, str, str, str]]], response: Optional[Dict]) -> bool:
+        """
+        Whether an existing answer was built the way this run would build it
+
+        Its speakers must come from the plan, and it must be demo output
+        (every insight is the speaker's sample insight) exactly when this run
+        is in demo mode.
+        """
+        problem, _, targets = plan
+        solutions = (response or {}).get("solutions") or []
+        if not solutions:
+            return False
+
+        planned = {speaker_name for speaker_name, _, _, _ in targets}
+        if any(solution.get("speaker") not in planned for solution in solutions):
+            return False
+
+        demo = all(
+            solution.get("insight") == self.generator._get_demo_insight(
+                problem, solution["speaker"], solution.get("episode_name", "")
+            )["quote"]
+            for solution in solutions
+        )
+        return demo == self.demo_mode
+
     def _generate_speakers_list(self) -> List[Dict]:
         """Generate list of all speakers with metadata"""
         speakers = []
 
-        # Get all unique speakers from categories
+        # Get all unique speakers the categories draw on
         all_speakers = set()
-        for speakers_list in self.generator.PROBLEM_CATEGORIES.values():
-            all_speakers.update(speakers_list)
+        for category in self.generator.PROBLEM_CATEGORIES:
+            all_speakers.update(self.generator.speakers_for_category(category, 3))
 
         for speaker_name in sorted(all_speakers):
             role = self.processor.get_speaker_role(speaker_name)
@@ -97,26 +314,73 @@ class StaticDataGenerator:
         return speakers
 
     def save_data(self, data: Dict) -> Path:
-        """Save data to JSON file"""
-        print(f"\n💾 Saving to: {self.output_path}")
+        """Write the index, one shard per response and the build manifest"""
+        print(f"\n💾 Saving to: {self.output_dir}")
 
         try:
-            with open(self.output_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            self.responses_dir.mkdir(parents=True, exist_ok=True)
+
+            index = {key: value for key, value in data.items() if key != "responses"}
+            index["problems"] = {}
+            total_bytes = 0
+            for problem_key, response in data["responses"].items():
+                index["problems"][problem_key] = shard_id(problem_key)
+                total_bytes += self._write_shard(self.responses_dir / f"{shard_id(problem_key)}.json", response)
+
+            # Shards of problems that are no longer listed
+            shards = set(index["problems"].values())
+            for path in self.responses_dir.iterdir():
+                if path.name.split(".")[0] not in shards:
+                    path.unlink()
 
-            file_size = self.output_path.stat().st_size
-            print(f"✅ Successfully saved ({file_size:,} bytes)")
+            total_bytes += self._write_shard(self.index_path, index)
+            if self.manifest is not None:
+                self._write_file(self.manifest_path, json.dumps(self.manifest, indent=2).encode("utf-8"))
 
-            return self.output_path
+            print(f"✅ Successfully saved index and {len(shards)} shards ({total_bytes:,} bytes before compression)")
+            if brotli is None:
+                print("   ℹ️  brotli not installed, skipped .br files (pip install brotli)")
+
+            return self.index_path
 
         except Exception as e:
             print(f"❌ Error saving data: {str(e)}")
             raise
 
-    def run(self) -> bool:
+    def _write_shard(self, path: Path, value: Dict) -> int:
+        """Write compact JSON with .gz and .br siblings; returns the uncompressed size"""
+        payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        written = self._write_file(path, payload)
+        gz_path = path.with_name(path.name + ".gz")
+        br_path = path.with_name(path.name + ".br")
+        if written or not gz_path.exists():
+            # mtime=0 keeps the gzip bytes reproducible
+            self._write_file(gz_path, gzip.compress(payload, compresslevel=9, mtime=0))
+        if brotli is None:
+            if written and br_path.exists():
+                br_path.unlink()  # would be stale
+        elif written or not br_path.exists():
+            self._write_file(br_path, brotli.compress(payload, quality=11))
+        return len(payload)
+
+    @staticmethod
+    def _write_file(path: Path, payload: bytes) -> bool:
+        """Atomically replace path with payload unless it already holds it; True if written"""
+        try:
+            if path.read_bytes() == payload:
+                return False
+        except IOError:
+            pass
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        return True
+
+    def run(self, force: bool = False, adopt: bool = False) -> bool:
         """Generate and save all static data"""
         try:
-            data = self.generate_all_data()
+            started = time.perf_counter()
+            data = self.generate_all_data(force=force, adopt=adopt)
             self.save_data(data)
 
             print("\n" + "="*60)
@@ -126,8 +390,9 @@ class StaticDataGenerator:
             print(f"   • Total problems: {len(data['popular_problems'])}")
             print(f"   • Total speakers: {len(data['speakers'])}")
             print(f"   • Categories: {len(data['categories'])}")
-            print(f"   • Output file: {self.output_path}")
+            print(f"   • Output: {self.output_dir}")
             print(f"   • Generated: {data['metadata']['generated']}")
+            print(f"   • Took: {time.perf_counter() - started:.1f}s")
             print("\n🚀 Ready for GitHub Pages deployment!")
 
             return True
@@ -139,11 +404,24 @@ class StaticDataGenerator:
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Generate the static site's data/ directory")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Claude calls in flight at once")
+    parser.add_argument("--force", action="store_true", help="regenerate every answer, even if unchanged")
+    parser.add_argument("--output", default=None, help="output directory (default data/ in the repo root)")
+    parser.add_argument(
+        "--adopt", action="store_true",
+        help="record the answers already in the output as up to date, without calling Claude"
+    )
+    args = parser.parse_args()
+
     # Check for API key
     has_api_key = bool(os.getenv('ANTHROPIC_API_KEY'))
+    # Adopting makes no calls either way, but only adopts answers built in this mode
     demo_mode = not has_api_key
 
-    if demo_mode:
+    if args.adopt:
+        print(f"📌 Adopting the existing {'demo' if demo_mode else 'Claude'} answers; no Claude calls will be made.\n")
+    elif demo_mode:
         print("⚠️  No ANTHROPIC_API_KEY found. Running in demo mode with sample data.")
         print("   Set ANTHROPIC_API_KEY environment variable for real Claude responses.\n")
     else:
@@ -156,10 +434,13 @@ def main():
     # Generate data
     generator = StaticDataGenerator(
         transcripts_dir=project_root,
-        demo_mode=demo_mode
+        demo_mode=demo_mode,
+        workers=args.workers,
+        output_dir=args.output,
+        use_speaker_index=os.getenv('SPEAKER_INDEX', '1') != '0'
     )
 
-    success = generator.run()
+    success = generator.run(force=args.force, adopt=args.adopt)
     exit(0 if success else 1)
 
 
@@ -0,0 +1,255 @@
+"""
+LLMBackend - Where SolutionGenerator's prompts go
+
+Backends:
+    anthropic  the Anthropic Messages API (real calls)
+    stub       the same client pointed at llm_stub_server.py
+    record     calls through to the client and saves every response
+    replay     answers from saved responses, without network calls
+
+Recordings are keyed by a hash of (model, max_tokens, prompt), so replaying a
+recorded run sends identical prompts to identical answers, errors included.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from anthropic import Anthropic, AsyncAnthropic
+
+from metrics import LLM_TOKENS
+
+LLM_BACKENDS = ("anthropic", "stub", "record", "replay")
+DEFAULT_STUB_URL = "http://127.0.0.1:8100"
+DEFAULT_RECORDINGS_DIR = Path(__file__).parent / ".llm_recordings"
+
+
+class ReplayedError(Exception):
+    """A recorded call that failed, raised again on replay"""
+
+
+class LLMBackend:
+    """Interface: send a single-turn prompt, get the response text back"""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict:
+        return {"backend": self.name, "model": self.model}
+
+
+class AnthropicBackend(LLMBackend):
+    """Anthropic Messages API, sync and async clients"""
+
+    name = "anthropic"
+
+    def __init__(self, model: str, base_url: Optional[str] = None, api_key: Optional[str] = None, name: str = "anthropic"):
+        super().__init__(model)
+        self.name = name
+        self.base_url = base_url
+
+        # Retries are LLMScheduler's job, with backoff shared across calls
+        kwargs = {"max_retries": 0}
+        if base_url:
+            kwargs["base_url"] = base_url
+            # Local endpoints don't check the key, but the client requires one
+            api_key = api_key or os.getenv("ANTHROPIC_API_KEY") or "local"
+        if api_key:
+            kwargs["api_key"] = api_key
+
+        self.client = Anthropic(**kwargs)
+        self.async_client = AsyncAnthropic(**kwargs)
+
+    def _request(self, prompt: str, max_tokens: int) -> Dict:
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+
+    @staticmethod
+    def _response_text(response) -> str:
+        """Text of the first content block (ValueError if the response has none)"""
+        if not response or not hasattr(response, 'content') or not response.content:
+            raise ValueError("Invalid API response structure")
+        if not hasattr(response.content[0], 'text'):
+            raise ValueError("API response missing text field")
+        return response.content[0].text
+
+    @staticmethod
+    def _count_usage(response) -> None:
+        """Add the response's reported token usage to wwld_llm_tokens_total"""
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            LLM_TOKENS.inc(getattr(usage, 'input_tokens', 0) or 0, direction="input")
+            LLM_TOKENS.inc(getattr(usage, 'output_tokens', 0) or 0, direction="output")
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        response = self.client.messages.create(**self._request(prompt, max_tokens))
+        self._count_usage(response)
+        return self._response_text(response)
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        response = await self.async_client.messages.create(**self._request(prompt, max_tokens))
+        self._count_usage(response)
+        return self._response_text(response)
+
+    def get_stats(self) -> Dict:
+        return dict(super().get_stats(), base_url=self.base_url)
+
+
+class RecordReplayBackend(LLMBackend):
+    """
+    Save responses of an inner backend by prompt hash, or serve them back
+
+    In "record" mode every call goes to the inner backend and its text (or
+    error) and latency are written to recordings_dir. In "replay" mode calls
+    are answered from those files; with replay_latency the recorded latency is
+    reproduced too. A prompt that was never recorded raises LookupError.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(
+        self,
+        model: str,
+        recordings_dir: Path,
+        mode: str = "replay",
+        inner: Optional[LLMBackend] = None,
+        replay_latency: bool = False
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown record/replay mode {mode!r}, expected one of {self.MODES}")
+        if mode == "record" and inner is None:
+            raise ValueError("record mode needs an inner backend to call")
+
+        super().__init__(model)
+        self.name = mode
+        self.mode = mode
+        self.inner = inner
+        self.replay_latency = replay_latency
+        self.recordings_dir = Path(recordings_dir)
+        self.recordings_dir.mkdir(parents=True, exist_ok=True)
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+
+    def prompt_hash(self, prompt: str, max_tokens: int) -> str:
+        """Recording key for a request"""
+        return hashlib.sha256(f"{self.model}\0{max_tokens}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _save(self, key: str, recording: Dict) -> None:
+        path = self.recordings_dir / f"{key}.json"
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(recording, prompt_hash=key, model=self.model, recorded_at=datetime.now().isoformat()), f)
+        os.replace(tmp_path, path)
+        self.recorded += 1
+
+    def _load(self, prompt: str, max_tokens: int) -> Dict:
+        key = self.prompt_hash(prompt, max_tokens)
+        path = self.recordings_dir / f"{key}.json"
+        if not path.exists():
+            self.missing += 1
+            raise LookupError(f"No recording for prompt {key[:12]}")
+        with open(path, 'r') as f:
+            recording = json.load(f)
+        self.replayed += 1
+        return recording
+
+    @staticmethod
+    def _result(recording: Dict) -> str:
+        if "error" in recording:
+            raise ReplayedError(recording["error"])
+        return recording["text"]
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        if self.mode == "replay":
+            recording = self._load(prompt, max_tokens)
+            if self.replay_latency:
+                time.sleep(recording.get("latency_ms", 0) / 1000)
+            return self._result(recording)
+
+        key = self.prompt_hash(prompt, max_tokens)
+        started = time.perf_counter()
+        try:
+            text = self.inner.complete(prompt, max_tokens)
+        except Exception as e:
+            self._save(key, {"error": f"{type(e).__name__}: {e}", "latency_ms": (time.perf_counter() - started) * 1000})
+            raise
+        self._save(key, {"text": text, "latency_ms": (time.perf_counter() - started) * 1000})
+        return text
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        if self.mode == "replay":
+            recording = self._load(prompt, max_tokens)
+            if self.replay_latency:
+                await asyncio.sleep(recording.get("latency_ms", 0) / 1000)
+            return self._result(recording)
+
+        key = self.prompt_hash(prompt, max_tokens)
+        started = time.perf_counter()
+        try:
+            text = await self.inner.acomplete(prompt, max_tokens)
+        except Exception as e:
+            self._save(key, {"error": f"{type(e).__name__}: {e}", "latency_ms": (time.perf_counter() - started) * 1000})
+            raise
+        self._save(key, {"text": text, "latency_ms": (time.perf_counter() - started) * 1000})
+        return text
+
+    def get_stats(self) -> Dict:
+        return dict(
+            super().get_stats(),
+            recordings_dir=str(self.recordings_dir),
+            recorded=self.recorded,
+            replayed=self.replayed,
+            missing=self.missing
+        )
+
+
+def create_backend(
+    kind: str,
+    model: str,
+    base_url: Optional[str] = None,
+    recordings_dir: Optional[Path] = None,
+    replay_latency: bool = False
+) -> LLMBackend:
+    """
+    Build a backend by name (see LLM_BACKENDS)
+
+    base_url redirects the anthropic and record backends (e.g. recording
+    against the stub); the stub backend defaults to DEFAULT_STUB_URL.
+    """
+    if kind == "anthropic":
+        return AnthropicBackend(model, base_url=base_url)
+    if kind == "stub":
+        return AnthropicBackend(model, base_url=base_url or DEFAULT_STUB_URL, name="stub")
+    if kind in RecordReplayBackend.MODES:
+        inner = AnthropicBackend(model, base_url=base_url) if kind == "record" else None
+        return RecordReplayBackend(
+            model,
+            recordings_dir or DEFAULT_RECORDINGS_DIR,
+            mode=kind,
+            inner=inner,
+            replay_latency=replay_latency
+        )
+
+    raise ValueError(f"Unknown LLM backend {kind!r}, expected one of {LLM_BACKENDS}")
@@ -0,0 +1,324 @@
+"""
+LLMScheduler - One gate for every outbound model call
+
+Calls wait in a priority queue (interactive /ask before batch before
+background generation) and are started only while there is a free
+concurrency slot and both token buckets - requests per minute and tokens per
+minute - have budget. Rate limit (429), server (5xx) and connection errors
+are retried with jittered exponential backoff; a 429's retry-after pauses
+the whole queue, since every queued call would hit the same limit.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from anthropic import APIConnectionError
+
+from llm_backend import LLMBackend
+from metrics import LLM_CALLS, span
+
+# Lower rank is served first
+PRIORITIES = {"interactive": 0, "batch": 1, "background": 2}
+
+# Rough prompt size in tokens, for the tokens-per-minute budget
+CHARS_PER_TOKEN = 4
+
+
+class LLMUnavailableError(Exception):
+    """Every model call for a request failed, even after retries"""
+
+
+class TokenBucket:
+    """Budget that refills continuously at rate_per_minute, up to one minute's worth"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (requests larger than capacity wait for a full bucket)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        """Spend amount (the balance may go negative; later callers wait it off)"""
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    """
+    Priority-queued, rate-limited and retrying front for an LLMBackend
+
+    acomplete() queues by priority; complete() (scripts, tests) only waits
+    for rate budget. Limits left as None are not enforced.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 4,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        self._lock = threading.Lock()  # buckets and pause, shared with complete() callers
+        self._paused_until = 0.0
+        self._waiting = []  # heap of (rank, seq, future, tokens)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._loop = None
+        self._timer = None
+
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self._waits = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+
+    @staticmethod
+    def estimate_tokens(prompt: str, max_tokens: int) -> int:
+        """Prompt tokens (approximate) plus the output allowance"""
+        return len(prompt) // CHARS_PER_TOKEN + max_tokens
+
+    @staticmethod
+    def _rank(priority: str) -> int:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}, expected one of {tuple(PRIORITIES)}")
+        return PRIORITIES[priority]
+
+    async def acomplete(self, prompt: str, max_tokens: int, priority: str = "interactive") -> str:
+        """Queue a call at priority, retrying retryable failures"""
+        rank = self._rank(priority)
+        tokens = self.estimate_tokens(prompt, max_tokens)
+
+        for attempt in itertools.count():
+            with span("llm_queue"):
+                await self._acquire(rank, tokens, priority)
+            error = None
+            try:
+                with span("llm_call"):
+                    text = await self.backend.acomplete(prompt, max_tokens)
+            except Exception as e:
+                error = e
+            finally:
+                self._release()
+
+            if error is None:
+                self.completed += 1
+                LLM_CALLS.inc(outcome="ok")
+                return text
+
+            delay = self._retry_delay(error, attempt)
+            if delay is None:
+                self.failed += 1
+                LLM_CALLS.inc(outcome="failed")
+                raise error
+            LLM_CALLS.inc(outcome="retried")
+            await asyncio.sleep(delay)
+
+    def complete(self, prompt: str, max_tokens: int, priority: str = "interactive") -> str:
+        """Blocking call: waits for rate budget (no queue), retrying retryable failures"""
+        self._rank(priority)
+        tokens = self.estimate_tokens(prompt, max_tokens)
+
+        for attempt in itertools.count():
+            with self._lock:
+                now = time.monotonic()
+                wait = self._budget_wait(tokens, now)
+                self._take(tokens, now)
+            self._waits[priority].append(wait)
+            if wait > 0:
+                with span("llm_queue"):
+                    time.sleep(wait)
+
+            try:
+                with span("llm_call"):
+                    text = self.backend.complete(prompt, max_tokens)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    self.failed += 1
+                    LLM_CALLS.inc(outcome="failed")
+                    raise
+                LLM_CALLS.inc(outcome="retried")
+                time.sleep(delay)
+                continue
+
+            self.completed += 1
+            LLM_CALLS.inc(outcome="ok")
+            return text
+
+    async def _acquire(self, rank: int, tokens: int, priority: str) -> None:
+        """Wait until the dispatcher starts this call"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters and timers belong to the loop that created them (scripts run one loop per asyncio.run)
+            self._loop = loop
+            self._waiting = []
+            self._timer = None
+
+        future = loop.create_future()
+        enqueued = time.monotonic()
+        heapq.heappush(self._waiting, (rank, next(self._seq), future, tokens))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # started just as the caller gave up
+            raise
+        self._waits[priority].append(time.monotonic() - enqueued)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        if self._loop is not None and not self._loop.is_closed():
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Start queued calls in priority order while slots and rate budget allow"""
+        while self._waiting and self._in_flight < self.max_concurrency:
+            _, _, future, tokens = self._waiting[0]
+            if future.done():  # cancelled while queued
+                heapq.heappop(self._waiting)
+                continue
+
+            with self._lock:
+                now = time.monotonic()
+                wait = self._budget_wait(tokens, now)
+                if wait <= 0:
+                    self._take(tokens, now)
+
+            if wait > 0:
+                # The head of the queue waits for budget; lower priorities wait behind it
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = self._loop.call_later(wait, self._on_timer)
+                return
+
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _budget_wait(self, tokens: int, now: float) -> float:
+        """Seconds until a call of this size may start (caller holds _lock)"""
+        wait = self._paused_until - now
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.wait_time(1, now))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.wait_time(tokens, now))
+        return max(wait, 0.0)
+
+    def _take(self, tokens: int, now: float) -> None:
+        if self.request_bucket:
+            self.request_bucket.take(1, now)
+        if self.token_bucket:
+            self.token_bucket.take(tokens, now)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before retrying error, or None if it should not be retried"""
+        status = getattr(error, "status_code", None)
+        retryable = status == 429 or (status is not None and status >= 500) or isinstance(error, APIConnectionError)
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = random.uniform(backoff / 2, backoff)
+
+        retry_after = self._retry_after(error)
+        if status == 429:
+            self.rate_limited += 1
+            if retry_after:
+                with self._lock:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        if retry_after:
+            delay = max(delay, retry_after)
+
+        self.retries += 1
+        print(f"⏳ LLM call failed ({status or type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Seconds from the response's retry-after header, if it has one"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def get_stats(self) -> Dict:
+        """Queue depth, wait times and call counters"""
+        queued = {priority: 0 for priority in PRIORITIES}
+        names = {rank: priority for priority, rank in PRIORITIES.items()}
+        for rank, _, future, _ in self._waiting:
+            if not future.done():
+                queued[names[rank]] += 1
+
+        waits = {}
+        for priority, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[priority] = {
+                "samples": len(ordered),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else 0.0,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 1) if ordered else 0.0,
+                "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0
+            }
+
+        with self._lock:
+            now = time.monotonic()
+            for bucket in (self.request_bucket, self.token_bucket):
+                if bucket:
+                    bucket.wait_time(0, now)  # refill up to now
+            budget = {
+                "requests_per_minute": self.request_bucket.capacity if self.request_bucket else None,
+                "tokens_per_minute": self.token_bucket.capacity if self.token_bucket else None,
+                "requests_available": round(self.request_bucket.tokens, 1) if self.request_bucket else None,
+                "tokens_available": round(self.token_bucket.tokens) if self.token_bucket else None,
+                "paused_ms": round(max(self._paused_until - now, 0.0) * 1000, 1)
+            }
+
+        return {
+            "backend": self.backend.get_stats(),
+            "queued": queued,
+            "queue_depth": sum(queued.values()),
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "wait": waits,
+            "budget": budget
+        }
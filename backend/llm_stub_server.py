@@ -0,0 +1,200 @@
+"""
+LLM stub server - A local stand-in for the Anthropic Messages API
+
+Answers POST /v1/messages in the real API's shape after a random latency
+(log-normal around a median), and fails a configurable share of requests
+with 429 / 500 / 529 errors, so the full /ask path can be load-tested
+offline with realistic timing. The answer quotes a sentence from the
+prompt's transcript excerpts, so responses parse like real ones.
+
+Run it, then start the backend with LLM_BACKEND=stub:
+    python llm_stub_server.py [port]
+
+Configuration (environment):
+    LLM_STUB_LATENCY_MS      median latency (default 1500)
+    LLM_STUB_LATENCY_SIGMA   log-normal sigma (default 0.5)
+    LLM_STUB_RATE_LIMIT_RATE share of 429 rate limit errors (default 0)
+    LLM_STUB_ERROR_RATE      share of 500 api errors (default 0)
+    LLM_STUB_OVERLOAD_RATE   share of 529 overloaded errors (default 0)
+    LLM_STUB_SEED            random seed
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+DEFAULT_PORT = 8100
+
+EXCERPT_PATTERN = re.compile(r'TRANSCRIPT EXCERPTS FROM (.+?):\n(.*?)\n\nYour task:', re.S)
+TIMESTAMP_PATTERN = re.compile(r'\((\d{1,2}:\d{2}(?::\d{2})?)\):')
+SENTENCE_PATTERN = re.compile(r'[A-Z][^.!?\n]{40,240}[.!?]')
+
+ERRORS = {
+    429: ("rate_limit_error", "Number of requests has exceeded your rate limit"),
+    500: ("api_error", "Internal server error"),
+    529: ("overloaded_error", "Overloaded")
+}
+
+
+def stub_insight(prompt: str, rng: random.Random) -> str:
+    """Insight JSON quoting a sentence from the prompt's transcript excerpts"""
+    match = EXCERPT_PATTERN.search(prompt)
+    if not match:
+        return json.dumps({"quote": None})
+
+    excerpt = match.group(2)
+    sentences = SENTENCE_PATTERN.findall(excerpt)
+    if not sentences:
+        return json.dumps({"quote": None})
+
+    timestamp = TIMESTAMP_PATTERN.search(excerpt)
+    return json.dumps({
+        "quote": rng.choice(sentences).strip(),
+        "framework1": "Stub Framework",
+        "framework2": "Stub Concept",
+        "timestamp": timestamp.group(1) if timestamp else None,
+        "confidence": 0.85
+    })
+
+
+class StubConfig:
+    """Latency and error distribution of a stub server"""
+
+    def __init__(
+        self,
+        latency_ms: float = 1500,
+        latency_sigma: float = 0.5,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        overload_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rates = {429: rate_limit_rate, 500: error_rate, 529: overload_rate}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = {status: 0 for status in ERRORS}
+
+    @classmethod
+    def from_env(cls) -> "StubConfig":
+        seed = os.getenv('LLM_STUB_SEED')
+        return cls(
+            latency_ms=float(os.getenv('LLM_STUB_LATENCY_MS', '1500')),
+            latency_sigma=float(os.getenv('LLM_STUB_LATENCY_SIGMA', '0.5')),
+            rate_limit_rate=float(os.getenv('LLM_STUB_RATE_LIMIT_RATE', '0')),
+            error_rate=float(os.getenv('LLM_STUB_ERROR_RATE', '0')),
+            overload_rate=float(os.getenv('LLM_STUB_OVERLOAD_RATE', '0')),
+            seed=int(seed) if seed else None
+        )
+
+    def draw(self):
+        """(latency in seconds, error status or None) for one request"""
+        with self.lock:
+            self.requests += 1
+            latency = self.latency_ms * self.rng.lognormvariate(0, self.latency_sigma) / 1000
+            roll = self.rng.random()
+            for status, rate in self.rates.items():
+                if roll < rate:
+                    self.errors[status] += 1
+                    return latency, status
+                roll -= rate
+            return latency, None
+
+    def get_stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "errors": {str(status): count for status, count in self.errors.items()},
+            "latency_ms": self.latency_ms,
+            "latency_sigma": self.latency_sigma,
+            "rates": {str(status): rate for status, rate in self.rates.items()}
+        }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Messages API subset: POST /v1/messages, plus GET /stats"""
+
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown out a load test
+
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.config.get_stats())
+        else:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.startswith("/v1/messages"):
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "Not found"}})
+            return
+
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        latency, error = self.config.draw()
+        time.sleep(latency)
+
+        if error:
+            error_type, message = ERRORS[error]
+            headers = {"retry-after": "1"} if error == 429 else None
+            self._send_json(error, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+            return
+
+        prompt = "".join(
+            message["content"] if isinstance(message["content"], str)
+            else "".join(block.get("text", "") for block in message["content"])
+            for message in request.get("messages", [])
+        )
+        # Same prompt, same answer
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        text = stub_insight(prompt, rng)
+
+        self._send_json(200, {
+            "id": f"msg_stub_{rng.getrandbits(64):016x}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "stub"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+        })
+
+
+def start_stub_server(port: int = DEFAULT_PORT, config: Optional[StubConfig] = None) -> ThreadingHTTPServer:
+    """Serve the stub on a background thread (port 0 picks a free port)"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config or StubConfig()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    config = StubConfig.from_env()
+    StubHandler.config = config
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    print(f"🧪 LLM stub listening on http://127.0.0.1:{port} "
+          f"(median {config.latency_ms:.0f}ms, errors {config.rates})")
+    server.serve_forever()
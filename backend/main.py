@@ -3,16 +3,24 @@ WWLD Backend - What Would Lenny Do?
 Extracts real quotes and advice from Lenny's podcast transcripts using Claude AI
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import os
 import json
+import time
 from pathlib import Path
 from transcript_processor import TranscriptProcessor
 from solution_generator import SolutionGenerator
+from speaker_index import SpeakerIndex
+from llm_backend import create_backend
+from llm_scheduler import LLMScheduler, LLMUnavailableError
 from cache_manager import CacheManager
+from cached_response import CachedResponse
+from request_coalescer import RequestCoalescer
+from metrics import CACHE_LOOKUPS, CONTENT_TYPE, REGISTRY, MetricsMiddleware, span
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -29,10 +37,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-endpoint request latency for /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Initialize processors
 transcript_processor = None
 solution_generator = None
+request_coalescer = None
 cache_manager = None
 
 class ProblemQuery(BaseModel):
@@ -40,6 +51,11 @@ class ProblemQuery(BaseModel):
     num_solutions: int = 3
     problem_category: Optional[str] = None  # Optional: can be pre-categorized
 
+class BatchProblemQuery(BaseModel):
+    problems: List[str]
+    num_solutions: int = 3
+    problem_categories: Optional[List[Optional[str]]] = None  # Optional: one per problem
+
 class Solution(BaseModel):
     speaker: str
     speaker_role: str
@@ -55,13 +71,14 @@ class ResultResponse(BaseModel):
     problem: str
     category: str
     solutions: list
+    cache: Optional[dict] = None  # how a cached answer matched (exact or semantic + similarity)
 
 # ===== ROUTES =====
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize processors on startup"""
-    global transcript_processor, solution_generator, cache_manager
+    global transcript_processor, solution_generator, cache_manager, request_coalescer
 
     # Use TRANSCRIPTS_DIR env var or default to current directory
     transcripts_dir = Path(os.getenv('TRANSCRIPTS_DIR', '.'))
@@ -69,12 +86,87 @@ async def startup_event():
     print("🚀 Initializing WWLD Backend...")
     print(f"📁 Loading transcripts from: {transcripts_dir}")
 
-    # Enable demo mode if no API credentials available
-    demo_mode = not os.getenv('ANTHROPIC_API_KEY')
+    # "anthropic" (default), "stub" (llm_stub_server.py), "record" or "replay"
+    llm_backend_kind = os.getenv('LLM_BACKEND', 'anthropic')
+
+    # Enable demo mode if no API credentials available (the stub and replay need none)
+    demo_mode = llm_backend_kind == 'anthropic' and not os.getenv('ANTHROPIC_API_KEY')
+
+    # Reuse the parsed-state snapshot next to the transcripts unless disabled
+    use_snapshot = os.getenv('TRANSCRIPT_SNAPSHOT', '1') != '0'
+    # "mmap" keeps transcripts on disk instead of in every worker's heap
+    storage = os.getenv('TRANSCRIPT_STORAGE', 'memory')
+    # Parallel ingestion only matters when the snapshot is missing or stale. Every uvicorn
+    # worker runs this startup, so by default they split the CPUs instead of each taking all
+    web_workers = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+    workers = int(os.getenv('INGEST_WORKERS', max(1, (os.cpu_count() or 1) // web_workers)))
+    # Claude calls allowed in flight at once across all /ask requests
+    llm_concurrency = int(os.getenv('LLM_CONCURRENCY', '4'))
+    # Provider rate limits to stay under (unset = not enforced)
+    requests_per_minute = os.getenv('LLM_REQUESTS_PER_MINUTE')
+    tokens_per_minute = os.getenv('LLM_TOKENS_PER_MINUTE')
+    # Pick speakers from the corpus-derived ranking instead of the hand-picked table
+    use_speaker_index = os.getenv('SPEAKER_INDEX', '1') != '0'
+
+    transcript_processor = TranscriptProcessor(
+        transcripts_dir,
+        use_snapshot=use_snapshot,
+        storage=storage,
+        workers=workers
+    )
+    llm_scheduler = None
+    if not demo_mode:
+        llm_backend = create_backend(
+            llm_backend_kind,
+            SolutionGenerator.MODEL,
+            base_url=os.getenv('LLM_BASE_URL'),
+            recordings_dir=os.getenv('LLM_RECORDINGS_DIR'),
+            replay_latency=os.getenv('LLM_REPLAY_LATENCY', '0') != '0'
+        )
+        print(f"🤖 LLM backend: {llm_backend.name}")
+        llm_scheduler = LLMScheduler(
+            llm_backend,
+            requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+            tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+            max_concurrency=llm_concurrency,
+            # 429 / 5xx / connection errors are retried with jittered exponential backoff
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '4')),
+            base_delay=float(os.getenv('LLM_RETRY_BASE_DELAY', '1.0')),
+            max_delay=float(os.getenv('LLM_RETRY_MAX_DELAY', '30'))
+        )
 
-    transcript_processor = TranscriptProcessor(transcripts_dir)
-    solution_generator = SolutionGenerator(transcript_processor, demo_mode=demo_mode)
-    cache_manager = CacheManager()
+    speaker_index = None
+    if use_speaker_index:
+        speaker_index = SpeakerIndex.load_or_build(transcript_processor, SolutionGenerator.CATEGORY_KEYWORDS)
+
+    solution_generator = SolutionGenerator(
+        transcript_processor,
+        demo_mode=demo_mode,
+        llm_scheduler=llm_scheduler,
+        speaker_index=speaker_index
+    )
+    similarity = os.getenv('CACHE_SIMILARITY_THRESHOLD', '0.85')
+    # Hot answers are served from memory; everything else from the file store
+    cache_dir = os.getenv('CACHE_DIR')
+    cache_manager = CacheManager(
+        Path(cache_dir) if cache_dir else None,
+        memory_entries=int(os.getenv('CACHE_MEMORY_ENTRIES', '256')),
+        memory_bytes=int(os.getenv('CACHE_MEMORY_BYTES', str(32 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv('CACHE_TTL_SECONDS', '3600')),
+        backend=os.getenv('CACHE_BACKEND', 'file'),
+        # Store writes happen off the request path
+        write_behind=os.getenv('CACHE_WRITE_BEHIND', '1') != '0',
+        # Paraphrases of cached problems at or above this cosine similarity are cache hits
+        similarity_threshold=float(similarity) if similarity else None,
+        # Persistent tier budgets; the compactor evicts by CACHE_EVICTION once over
+        max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+        max_bytes=int(os.getenv('CACHE_MAX_BYTES', str(256 * 1024 * 1024))),
+        eviction=os.getenv('CACHE_EVICTION', 'lru'),
+        # Set when several workers or nodes share CACHE_DIR, so each sees the others' writes at once
+        shared=os.getenv('CACHE_SHARED', '0') == '1'
+    )
+    request_coalescer = RequestCoalescer()
+    _register_gauges()
 
     print(f"✅ Loaded {transcript_processor.transcript_count} transcripts")
     print(f"✅ Cache manager initialized")
@@ -82,6 +174,70 @@ async def startup_event():
         print(f"📋 Running in DEMO MODE (no API credentials found)")
     print(f"✅ Ready to generate solutions")
 
+def _register_gauges():
+    """Gauges read from the live components on every /metrics scrape"""
+    def corpus_sizes():
+        return {
+            "transcripts": transcript_processor.transcript_count,
+            "speakers": len(transcript_processor.speakers),
+            "characters": transcript_processor.corpus_stats.total_characters,
+            "tokens": transcript_processor.corpus_stats.total_tokens,
+            "utterances": len(transcript_processor.utterances) if transcript_processor.utterances is not None else 0,
+            "index_terms": transcript_processor.search_index.term_count if transcript_processor.search_index else 0,
+            "index_documents": transcript_processor.search_index.doc_count if transcript_processor.search_index else 0
+        }
+
+    def cache_sizes():
+        stats = cache_manager.get_stats()
+        return {
+            "entries": stats["budget"]["entries"],
+            "bytes": stats["budget"]["bytes"],
+            "memory_entries": stats["tiers"]["memory"]["entries"],
+            "memory_bytes": stats["tiers"]["memory"]["bytes"],
+            "semantic_problems": stats["semantic"]["problems"]
+        }
+
+    def cache_hit_ratio():
+        hits = CACHE_LOOKUPS.value(result="exact") + CACHE_LOOKUPS.value(result="semantic")
+        lookups = hits + CACHE_LOOKUPS.value(result="miss")
+        return hits / lookups if lookups else 0
+
+    def llm_queue():
+        if solution_generator.demo_mode:
+            return None
+        return solution_generator.scheduler.get_stats()["queued"]
+
+    REGISTRY.gauge("wwld_corpus_size", "Corpus and search index sizes", ["kind"]).set_function(corpus_sizes)
+    REGISTRY.gauge("wwld_cache_size", "Solution cache sizes", ["kind"]).set_function(cache_sizes)
+    REGISTRY.gauge("wwld_cache_hit_ratio", "Share of /ask lookups answered from the cache").set_function(cache_hit_ratio)
+    REGISTRY.gauge("wwld_llm_in_flight", "Model calls in flight").set_function(
+        lambda: None if solution_generator.demo_mode else solution_generator.scheduler.get_stats()["in_flight"]
+    )
+    REGISTRY.gauge("wwld_llm_queue_depth", "Model calls waiting for the scheduler", ["priority"]).set_function(llm_queue)
+    REGISTRY.gauge("wwld_coalesced_in_flight", "Distinct /ask generations in flight").set_function(
+        lambda: request_coalescer.get_stats()["in_flight"]
+    )
+
+def _categorize(problem: str, category: Optional[str]) -> str:
+    """The given category, or the categorizer's (timed)"""
+    if category:
+        return category
+    with span("categorize"):
+        return solution_generator.categorize_problem(problem)
+
+def _lookup(problem: str, category: str):
+    """cache_manager.lookup, timed and counted by result"""
+    with span("cache_lookup"):
+        cached, match = cache_manager.lookup(problem, category)
+    CACHE_LOOKUPS.inc(result=match["type"] if cached else "miss")
+    return cached, match
+
+def _store(problem: str, category: str, result: dict) -> None:
+    """Cache a generated result (timed); empty ones are not worth serving again"""
+    if result["solutions"]:
+        with span("cache_store"):
+            cache_manager.set(problem, category, result)
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
@@ -102,60 +258,265 @@ async def ask_lenny(query: ProblemQuery):
 
     try:
         # Determine category
-        category = query.problem_category or solution_generator.categorize_problem(query.problem)
+        category = _categorize(query.problem, query.problem_category)
 
-        # Check cache first
-        cached = cache_manager.get(query.problem, category)
+        # Check cache first (exact problem, then close paraphrases)
+        cached, match = _lookup(query.problem, category)
         if cached:
-            print(f"📦 Cache hit for: {query.problem[:50]}...")
-            return cached
-
-        # Generate solutions based on problem
-        result = solution_generator.generate_solutions(
-            problem=query.problem,
-            num_solutions=query.num_solutions,
-            category=category
-        )
+            print(f"📦 Cache hit ({match['type']}) for: {query.problem[:50]}...")
+            return dict(cached, cache=match)
+
+        async def generate_and_cache():
+            # Generate solutions based on problem (speaker extractions run concurrently)
+            with span("generate"):
+                result = await solution_generator.generate_solutions_async(
+                    problem=query.problem,
+                    num_solutions=query.num_solutions,
+                    category=category
+                )
+
+            # Cache the result
+            _store(query.problem, category, result)
+            return result
+
+        # Identical requests arriving while this one is generating share its result
+        key = cache_manager._get_cache_key(query.problem, category)
+        return await request_coalescer.run(key, generate_and_cache)
+
+    except LLMUnavailableError as e:
+        print(f"❌ Model unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        print(f"❌ Error generating solutions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Cache the result
-        cache_manager.set(query.problem, category, result)
+MAX_BATCH_PROBLEMS = 50
 
-        return result
+@app.post("/ask/batch")
+async def ask_lenny_batch(query: BatchProblemQuery):
+    """
+    Ask about many problems in one request
+
+    Cached problems are answered from the cache; the rest are generated
+    together, sharing retrieval per speaker and running every extraction
+    concurrently. Results are returned in input order.
+    """
+    if not transcript_processor or not solution_generator:
+        raise HTTPException(status_code=503, detail="Processors not initialized")
+    if not 1 <= len(query.problems) <= MAX_BATCH_PROBLEMS:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {MAX_BATCH_PROBLEMS} problems")
+    if query.problem_categories is not None and len(query.problem_categories) != len(query.problems):
+        raise HTTPException(status_code=400, detail="problem_categories must match problems in length")
 
+    try:
+        categories = [
+            _categorize(problem, category)
+            for problem, category in zip(query.problems, query.problem_categories or [None] * len(query.problems))
+        ]
+
+        results = [None] * len(query.problems)
+        misses = []
+        for position, (problem, category) in enumerate(zip(query.problems, categories)):
+            cached, match = _lookup(problem, category)
+            if cached:
+                results[position] = dict(cached, cache=match)
+            else:
+                misses.append(position)
+
+        if misses:
+            keys = [cache_manager._get_cache_key(query.problems[position], categories[position]) for position in misses]
+
+            async def generate_and_cache(leading_keys):
+                positions = [misses[keys.index(key)] for key in leading_keys]
+                with span("generate"):
+                    generated = await solution_generator.generate_solutions_batch_async(
+                        [query.problems[position] for position in positions],
+                        num_solutions=query.num_solutions,
+                        categories=[categories[position] for position in positions]
+                    )
+                for result in generated:
+                    _store(result["problem"], result["category"], result)
+                return generated
+
+            # Misses already being generated (by /ask or another batch) are joined, not regenerated
+            generated = await request_coalescer.run_batch(keys, generate_and_cache)
+            for position, result in zip(misses, generated):
+                results[position] = result
+
+        print(f"📚 Batch of {len(results)} problems ({len(results) - len(misses)} cached)")
+        return {
+            "results": results,
+            "count": len(results),
+            "cached": len(results) - len(misses)
+        }
+
+    except LLMUnavailableError as e:
+        print(f"❌ Model unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
-        print(f"❌ Error generating solutions: {str(e)}")
+        print(f"❌ Error generating batch solutions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ask/stream")
+async def ask_lenny_stream(query: ProblemQuery):
+    """
+    Streaming /ask over Server-Sent Events
+
+    Sends a "category" event right away, one "solution" event per solution as
+    soon as its extraction finishes, then a "summary" event. Cache hits are
+    replayed in the same format; failures end the stream with an "error" event.
+    Identical streams and /ask requests in flight at once share one
+    generation; streams joining late first replay the solutions sent so far.
+    """
+    if not transcript_processor or not solution_generator:
+        raise HTTPException(status_code=503, detail="Processors not initialized")
+
+    category = _categorize(query.problem, query.problem_category)
+
+    async def generate_and_cache(emit):
+        ranked = []
+        with span("generate"):
+            async for position, solution in solution_generator.iter_solutions(
+                problem=query.problem,
+                num_solutions=query.num_solutions,
+                category=category
+            ):
+                ranked.append((position, solution))
+                emit(solution)
+
+        # Cache in speaker order, as /ask would have returned it
+        result = {
+            "problem": query.problem,
+            "category": category,
+            "solutions": [solution for _, solution in sorted(ranked, key=lambda item: item[0])]
+        }
+        _store(query.problem, category, result)
+        return result
+
+    async def events():
+        started = time.perf_counter()
+        yield _sse("category", {"problem": query.problem, "category": category})
+
+        # Looked up here, so no await separates a miss from joining the generation in flight
+        cached, match = _lookup(query.problem, category)
+        count = 0
+        if cached:
+            print(f"📦 Cache hit ({match['type']}) for: {query.problem[:50]}...")
+            for solution in cached["solutions"]:
+                count += 1
+                yield _sse("solution", solution)
+        else:
+            key = cache_manager._get_cache_key(query.problem, category)
+            try:
+                async for solution in request_coalescer.stream(
+                    key, generate_and_cache, replay=lambda result: result["solutions"]
+                ):
+                    count += 1
+                    yield _sse("solution", solution)
+            except Exception as e:
+                print(f"❌ Error generating solutions: {str(e)}")
+                yield _sse("error", {"detail": str(e)})
+                return
+
+        yield _sse("summary", {
+            "problem": query.problem,
+            "category": category,
+            "count": count,
+            "cache": match,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _speakers_body() -> dict:
+    speakers = transcript_processor.get_all_speakers()
+    return {
+        "speakers": speakers,
+        "count": len(speakers)
+    }
+
+# Read-mostly listings, serialized once per corpus version and revalidated by ETag
+problems_response = CachedResponse(lambda: {"problems": solution_generator.get_popular_problems()})
+speakers_response = CachedResponse(_speakers_body, version=lambda: transcript_processor.corpus_version)
+transcripts_response = CachedResponse(
+    lambda: {
+        "total_transcripts": transcript_processor.transcript_count,
+        "transcripts": transcript_processor.get_transcript_names()
+    },
+    version=lambda: transcript_processor.corpus_version
+)
+
 @app.get("/problems")
-async def get_popular_problems():
+async def get_popular_problems(request: Request):
     """Get list of popular problems from transcripts"""
     if not solution_generator:
         raise HTTPException(status_code=503, detail="Processors not initialized")
 
+    return problems_response.respond(request)
+
+@app.get("/categorize")
+async def categorize(problem: str, limit: int = 3):
+    """
+    Rank the categories a problem could belong to (cheap enough to call per keystroke)
+
+    Returns the best category plus up to limit scored candidates with the
+    keywords that matched.
+    """
+    if not solution_generator:
+        raise HTTPException(status_code=503, detail="Processors not initialized")
+    if not 1 <= limit <= len(solution_generator.CATEGORY_KEYWORDS):
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {len(solution_generator.CATEGORY_KEYWORDS)}")
+
+    with span("categorize"):
+        ranked = solution_generator.rank_categories(problem)
     return {
-        "problems": solution_generator.get_popular_problems()
+        "problem": problem,
+        "category": ranked[0]["category"],
+        "categories": ranked[:limit],
+        "speakers": solution_generator.speakers_for_category(ranked[0]["category"], 3)
     }
 
 @app.get("/speakers")
-async def get_speakers():
+async def get_speakers(request: Request):
     """Get list of all speakers in transcripts"""
     if not transcript_processor:
         raise HTTPException(status_code=503, detail="Processors not initialized")
 
-    return {
-        "speakers": transcript_processor.get_all_speakers(),
-        "count": len(transcript_processor.get_all_speakers())
-    }
+    return speakers_response.respond(request)
 
 @app.get("/transcripts")
-async def get_transcripts_info():
+async def get_transcripts_info(request: Request):
     """Get info about loaded transcripts"""
     if not transcript_processor:
         raise HTTPException(status_code=503, detail="Processors not initialized")
 
+    return transcripts_response.respond(request)
+
+@app.get("/transcripts/stats")
+async def get_transcript_stats(top: int = 10):
+    """
+    Corpus totals, the distribution of episode sizes and the speakers with the most tokens
+
+    Everything is read from aggregates kept current as transcripts load.
+    """
+    if not transcript_processor:
+        raise HTTPException(status_code=503, detail="Processors not initialized")
+    if not 1 <= top <= 100:
+        raise HTTPException(status_code=400, detail="top must be between 1 and 100")
+
+    corpus_stats = transcript_processor.corpus_stats
     return {
-        "total_transcripts": transcript_processor.transcript_count,
-        "transcripts": transcript_processor.get_transcript_names()
+        **transcript_processor.get_transcript_stats(),
+        "distribution": corpus_stats.distribution(),
+        "top_speakers": corpus_stats.top_speakers(top)
     }
 
 @app.post("/search")
@@ -190,7 +551,34 @@ async def get_cache_stats():
     if not cache_manager:
         raise HTTPException(status_code=503, detail="Cache not initialized")
 
-    return cache_manager.get_stats()
+    stats = cache_manager.get_stats()
+    stats["coalescing"] = request_coalescer.get_stats()
+    return stats
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    """Get LLM scheduler statistics (queue depth, wait times, retries, rate budget)"""
+    if not solution_generator:
+        raise HTTPException(status_code=503, detail="Processors not initialized")
+    if solution_generator.demo_mode:
+        return {"backend": {"backend": "demo"}}
+
+    return solution_generator.scheduler.get_stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: stage and request latency histograms, cache, model and corpus gauges"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/cache/entries")
+async def list_cache_entries(offset: int = 0, limit: int = 50):
+    """Page through cached solutions, most recently used first"""
+    if not cache_manager:
+        raise HTTPException(status_code=503, detail="Cache not initialized")
+    if offset < 0 or not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 500")
+
+    return cache_manager.list_entries(offset, limit)
 
 @app.delete("/cache/clear")
 async def clear_cache():
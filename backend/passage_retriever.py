@@ -0,0 +1,230 @@
+"""
+PassageRetriever - Pick the transcript passages most relevant to a problem
+
+Passages are utterances from the UtteranceTable. Each episode gets a sparse
+TF-IDF matrix (CSR in numpy arrays, term ids shared with the search index),
+built on first use and cached. A request scores the passages of all its
+episodes against the problem in one batched cosine, then fills each
+episode's character budget with the best passages.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from search_index import tokenize
+from speaker_index import host_speakers
+from transcript_processor import TranscriptProcessor
+from utterance_store import format_timestamp
+
+
+class EpisodeMatrix(NamedTuple):
+    """L2-normalised TF-IDF rows for one episode's passages"""
+    rows: np.ndarray  # utterance table rows
+    costs: np.ndarray  # characters the passage takes in an excerpt (header, text, separators)
+    priors: np.ndarray  # per-passage score multiplier
+    indptr: np.ndarray
+    indices: np.ndarray  # search index term ids
+    data: np.ndarray
+
+
+class PassageRetriever:
+    """Vectorized TF-IDF passage retrieval over transcript utterances"""
+
+    # The host mostly asks questions; prefer the guest's answers
+    HOST_WEIGHT = 0.5
+    MIN_PASSAGE_CHARS = 40
+
+    def __init__(
+        self,
+        processor: TranscriptProcessor,
+        max_cached_episodes: int = 128,
+        hosts: Optional[Iterable[str]] = None
+    ):
+        self.processor = processor
+        # A SpeakerIndex's hosts when there is one, else derived from the corpus the same way
+        self.hosts = set(hosts) if hosts is not None else host_speakers(processor.utterances)
+        self.max_cached_episodes = max_cached_episodes
+        self._matrices = OrderedDict()  # {episode_name: EpisodeMatrix}, least recently used first
+        self._idf = None
+
+    @property
+    def idf(self) -> np.ndarray:
+        """BM25-style idf for every term id in the search index"""
+        if self._idf is None:
+            index = self.processor.search_index
+            df = np.diff(index.term_ptr).astype(np.float64)
+            self._idf = np.log(1 + (index.doc_count - df + 0.5) / (df + 0.5)).astype(np.float32)
+        return self._idf
+
+    def _weights(self, text: str):
+        """Sparse (term ids, L2-normalised tf-idf weights) for a piece of text"""
+        term_ids = self.processor.search_index.term_ids
+        ids = [term_ids[token] for token in tokenize(text) if token in term_ids]
+        if not ids:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        ids, counts = np.unique(np.array(ids, dtype=np.int32), return_counts=True)
+        weights = (1 + np.log(counts)) * self.idf[ids]
+        norm = np.linalg.norm(weights)
+        return ids, (weights / norm if norm else weights).astype(np.float32)
+
+    def _episode_matrix(self, episode_name: str) -> EpisodeMatrix:
+        """TF-IDF matrix for an episode's passages (cached)"""
+        matrix = self._matrices.get(episode_name)
+        if matrix is not None:
+            self._matrices.move_to_end(episode_name)
+            return matrix
+
+        table = self.processor.utterances
+        start, end = table.episode_rows(episode_name)
+        rows, costs, priors = [], [], []
+        indptr, indices, data = [0], [], []
+
+        for row in range(start, end):
+            text = self.processor.get_utterance_text(episode_name, row)
+            if len(text) < self.MIN_PASSAGE_CHARS:
+                continue
+
+            ids, weights = self._weights(text)
+            rows.append(row)
+            # Header, newline, text and the blank line separating passages
+            costs.append(len(self._passage_header(episode_name, row)) + len(text) + 3)
+            priors.append(self.HOST_WEIGHT if table.speaker_of(row) in self.hosts else 1.0)
+            indices.append(ids)
+            data.append(weights)
+            indptr.append(indptr[-1] + len(ids))
+
+        matrix = EpisodeMatrix(
+            rows=np.array(rows, dtype=np.int64),
+            costs=np.array(costs, dtype=np.int64),
+            priors=np.array(priors, dtype=np.float32),
+            indptr=np.array(indptr, dtype=np.int64),
+            indices=np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+            data=np.concatenate(data) if data else np.empty(0, dtype=np.float32)
+        )
+
+        self._matrices[episode_name] = matrix
+        while len(self._matrices) > self.max_cached_episodes:
+            self._matrices.popitem(last=False)
+
+        return matrix
+
+    def score_passages(self, problem: str, episode_names: List[str]) -> List[np.ndarray]:
+        """Cosine similarity of every passage of every episode to the problem, in one batch"""
+        return [scores[:, 0] for scores in self._score_batch([problem], episode_names)]
+
+    def score_passages_batch(self, problems: List[str], episode_name: str) -> np.ndarray:
+        """Cosine similarity of an episode's passages to several problems at once (passages x problems)"""
+        return self._score_batch(problems, [episode_name])[0]
+
+    def _score_batch(self, problems: List[str], episode_names: List[str]) -> List[np.ndarray]:
+        """
+        Cosine similarity of every passage to every problem, one (passages x problems) array per episode
+
+        The episodes are stacked into one CSR matrix. Queries stay sparse: they
+        are dense only over the terms some problem contains, and only matrix
+        entries for those terms are gathered, so time and memory follow the
+        matching entries rather than the vocabulary.
+        """
+        matrices = [self._episode_matrix(episode_name) for episode_name in episode_names]
+        if not matrices:
+            return []
+        weights = [self._weights(problem) for problem in problems]
+
+        terms = np.unique(np.concatenate([ids for ids, _ in weights] or [np.empty(0, dtype=np.int32)]))
+        queries = np.zeros((len(terms), len(problems)), dtype=np.float32)
+        for column, (ids, values) in enumerate(weights):
+            queries[np.searchsorted(terms, ids), column] = values
+
+        row_counts = [len(matrix.rows) for matrix in matrices]
+        nnz_per_row = np.concatenate([np.diff(matrix.indptr) for matrix in matrices])
+        indices = np.concatenate([matrix.indices for matrix in matrices])
+        data = np.concatenate([matrix.data for matrix in matrices])
+        priors = np.concatenate([matrix.priors for matrix in matrices])
+
+        scores = np.zeros((len(nnz_per_row), len(problems)), dtype=np.float32)
+        if len(terms) and len(indices):
+            positions = np.minimum(np.searchsorted(terms, indices), len(terms) - 1)
+            hits = np.flatnonzero(terms[positions] == indices)
+            if len(hits):
+                row_starts = np.concatenate(([0], np.cumsum(nnz_per_row)))
+                row_of_hit = np.searchsorted(row_starts, hits, side="right") - 1
+                contributions = data[hits, None] * queries[positions[hits]]
+                # Hits are in row order, so each row's are one run; rows without hits score 0
+                rows, starts = np.unique(row_of_hit, return_index=True)
+                scores[rows] = np.add.reduceat(contributions, starts, axis=0)
+
+        scores *= priors[:, None]
+        return np.split(scores, np.cumsum(row_counts)[:-1])
+
+    def _passage_header(self, episode_name: str, row: int) -> str:
+        """Passage label in the transcripts' own "Speaker (HH:MM:SS):" form"""
+        table = self.processor.utterances
+        speaker = table.speaker_of(row) or episode_name
+        timestamp = format_timestamp(int(table.start_seconds[row]))
+        return f"{speaker} ({timestamp}):" if timestamp else f"{speaker}:"
+
+    def _excerpt(self, episode_name: str, scores: np.ndarray, char_budget: int) -> str:
+        """Best-scoring passages of an episode that fit the budget, in transcript order"""
+        matrix = self._episode_matrix(episode_name)
+        order = np.argsort(-scores, kind='stable')
+        order = order[scores[order] > 0]
+        costs = matrix.costs[order].tolist()
+        smallest = min(costs, default=0)
+        chosen = []
+        used = 0
+
+        for position, cost in zip(order.tolist(), costs):
+            if used + cost > char_budget:
+                if used + smallest > char_budget:
+                    break
+                continue
+            chosen.append(int(matrix.rows[position]))
+            used += cost
+
+        if not chosen:
+            return self.processor.get_transcript_content(episode_name)[:char_budget]
+
+        return "\n\n".join(
+            f"{self._passage_header(episode_name, row)}\n{self.processor.get_utterance_text(episode_name, row)}"
+            for row in sorted(chosen)
+        )
+
+    def select_passages(self, problem: str, episode_names: List[str], char_budget: int = 8000) -> Dict[str, str]:
+        """
+        Build a prompt excerpt per episode from its best-scoring passages
+
+        Passages are taken in score order until the budget is full, then put back
+        in transcript order with their speaker and timestamp. Episodes with no
+        matching passage fall back to the start of the transcript.
+        """
+        return {
+            episode_name: self._excerpt(episode_name, scores, char_budget)
+            for episode_name, scores in zip(episode_names, self.score_passages(problem, episode_names))
+        }
+
+    def select_passages_batch(
+        self,
+        requests: List[Tuple[str, List[str]]],
+        char_budget: int = 8000
+    ) -> List[Dict[str, str]]:
+        """
+        select_passages for many (problem, episode_names) requests
+
+        Each episode is scored once against every problem that needs it.
+        Returns one {episode_name: excerpt} dict per request, in order.
+        """
+        wanted = {}  # {episode_name: [request positions]}
+        for position, (_, episode_names) in enumerate(requests):
+            for episode_name in episode_names:
+                wanted.setdefault(episode_name, []).append(position)
+
+        excerpts = [{} for _ in requests]
+        for episode_name, positions in wanted.items():
+            scores = self.score_passages_batch([requests[position][0] for position in positions], episode_name)
+            for column, position in enumerate(positions):
+                excerpts[position][episode_name] = self._excerpt(episode_name, scores[:, column], char_budget)
+
+        return excerpts
@@ -0,0 +1,167 @@
+"""
+RequestCoalescer - Single-flight deduplication of identical in-flight requests
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+
+class _Feed:
+    """Items emitted by an in-flight computation, kept so late followers can replay them"""
+
+    def __init__(self):
+        self.items = []
+        self.closed = False
+        self._waiter = None  # resolved on the next emit or close
+
+    def emit(self, item: Any) -> None:
+        self.items.append(item)
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        self._waiter = None
+
+    async def follow(self) -> AsyncIterator:
+        """Every item from the first, until the feed closes"""
+        position = 0
+        while True:
+            while position < len(self.items):
+                yield self.items[position]
+                position += 1
+            if self.closed:
+                return
+            if self._waiter is None:
+                self._waiter = asyncio.get_running_loop().create_future()
+            # Shielded: one follower going away must not wake the others with a cancellation
+            await asyncio.shield(self._waiter)
+
+
+class RequestCoalescer:
+    """
+    Share one in-flight computation between concurrent callers with the same key
+
+    The first caller for a key (the leader) starts the work as a task; callers
+    arriving before it finishes await the same task instead of starting their
+    own. The task is shielded, so a disconnecting caller does not cancel the
+    work the others are waiting on. Keys are forgotten as soon as the task
+    completes, so later callers go back to the cache.
+
+    stream() is run() for computations that produce their result piece by
+    piece: every follower receives each piece as it is emitted.
+    """
+
+    def __init__(self):
+        self._in_flight = {}  # {key: asyncio.Task}
+        self._feeds = {}  # {key: _Feed} for keys started by stream()
+        self.leaders = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable]):
+        """Await factory() for key, joining an in-flight call when there is one"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._start(key, factory())
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[Callable[[Any], None]], Awaitable],
+        replay: Callable[[Any], List]
+    ) -> AsyncIterator:
+        """
+        run() that yields the result as it is produced
+
+        factory(emit) computes the result and calls emit(item) for each piece
+        as it becomes ready. Yields every item emitted for key, starting with
+        those emitted before this caller joined, then raises if the
+        computation failed. run() and run_batch() callers for the key join the
+        same computation and get its result. A key in flight through run() or
+        run_batch() emits nothing, so its result is awaited and replay(result)
+        yielded instead.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            feed = _Feed()
+            task = self._start(key, self._feeding(factory, feed))
+            self._feeds[key] = feed
+        else:
+            self.coalesced += 1
+            feed = self._feeds.get(key)
+
+        if feed is None:
+            for item in replay(await asyncio.shield(task)):
+                yield item
+            return
+
+        async for item in feed.follow():
+            yield item
+        await asyncio.shield(task)  # raises the computation's error, if any
+
+    @staticmethod
+    async def _feeding(factory: Callable[[Callable[[Any], None]], Awaitable], feed: _Feed):
+        """factory(feed.emit), closing the feed however it ends"""
+        try:
+            return await factory(feed.emit)
+        finally:
+            feed.close()
+
+    def _start(self, key: str, work: Awaitable) -> asyncio.Task:
+        """Run work as the in-flight task for key"""
+        self.leaders += 1
+        task = asyncio.ensure_future(work)
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    async def run_batch(self, keys: List[str], factory: Callable[[List[str]], Awaitable[List]]) -> List:
+        """
+        run() for many keys at once, returning one result per key in order
+
+        Keys already in flight are joined; the rest are computed together by
+        a single factory(leading_keys) call, which returns results in the same
+        order, and are in flight for other callers until it completes.
+        """
+        leading = [key for key in dict.fromkeys(keys) if key not in self._in_flight]
+        if leading:
+            batch = asyncio.ensure_future(factory(leading))
+            for position, key in enumerate(leading):
+                self._start(key, self._pick(batch, position))
+        self.coalesced += len(keys) - len(leading)
+
+        tasks = [self._in_flight[key] for key in keys]
+        return list(await asyncio.gather(*(asyncio.shield(task) for task in tasks)))
+
+    @staticmethod
+    async def _pick(batch: asyncio.Future, position: int):
+        """One key's result out of a run_batch factory call"""
+        return (await batch)[position]
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        """Drop a completed task and count failures"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            self._feeds.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            self.failures += 1
+
+    def get_stats(self) -> Dict:
+        """Coalescing counters"""
+        requests = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "coalesced_ratio": round(self.coalesced / requests, 3) if requests else 0.0
+        }
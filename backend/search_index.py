@@ -0,0 +1,370 @@
+"""
+InvertedIndex - Token-level BM25 index over transcript lines
+"""
+
+import bisect
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+# Array attributes persisted by to_snapshot/from_snapshot
+INDEX_ARRAYS = (
+    "doc_lengths", "doc_line_ptr", "line_offsets",
+    "term_ptr", "post_docs", "post_tfs", "post_line_ptr", "post_lines"
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class DocumentAnalysis(NamedTuple):
+    """Per-document postings in compact arrays (cheap to pickle between processes)"""
+    token_count: int
+    line_offsets: np.ndarray  # start of every line plus a final sentinel
+    terms: List[str]  # sorted distinct terms
+    tfs: np.ndarray  # occurrences of each term
+    line_ptr: np.ndarray  # CSR pointers into lines, one row per term
+    lines: np.ndarray  # sorted distinct line numbers containing each term
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into index tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def analyze_document(content: str) -> DocumentAnalysis:
+    """
+    Tokenize a transcript line by line
+
+    Line offsets hold the start of every line plus a final sentinel, so line i
+    spans content[offsets[i]:offsets[i + 1] - 1].
+    """
+    terms = defaultdict(list)
+    offsets = [0]
+    token_count = 0
+    position = 0
+
+    for line_no, line in enumerate(content.split('\n')):
+        tokens = TOKEN_PATTERN.findall(line.lower())
+        token_count += len(tokens)
+        for token in tokens:
+            terms[token].append(line_no)
+        position += len(line) + 1
+        offsets.append(position)
+
+    vocab = sorted(terms)
+    line_ptr = [0]
+    lines = []
+    for term in vocab:
+        # Occurrences are appended in line order, so dict.fromkeys dedupes and stays sorted
+        lines.extend(dict.fromkeys(terms[term]))
+        line_ptr.append(len(lines))
+
+    return DocumentAnalysis(
+        token_count=token_count,
+        line_offsets=np.array(offsets, dtype=np.int64),
+        terms=vocab,
+        tfs=np.array([len(terms[term]) for term in vocab], dtype=np.int32),
+        line_ptr=np.array(line_ptr, dtype=np.int64),
+        lines=np.array(lines, dtype=np.int32)
+    )
+
+
+def _gather_rows(ptr: np.ndarray, values: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Select rows of a CSR (ptr, values) pair, returning the new (ptr, values)"""
+    starts = ptr[rows]
+    lengths = ptr[rows + 1] - starts
+    new_ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_ptr[1:])
+    positions = np.repeat(starts - new_ptr[:-1], lengths) + np.arange(new_ptr[-1])
+    return new_ptr, values[positions]
+
+
+def _concat(arrays: List[np.ndarray], dtype) -> np.ndarray:
+    """Concatenate arrays, tolerating an empty list"""
+    return np.concatenate(arrays).astype(dtype) if arrays else np.empty(0, dtype=dtype)
+
+
+def _concat_ptrs(ptrs: List[np.ndarray]) -> np.ndarray:
+    """Chain several CSR pointer arrays (each starting at 0) into one"""
+    merged = [np.zeros(1, dtype=np.int64)]
+    base = 0
+    for ptr in ptrs:
+        merged.append(ptr[1:] + base)
+        base += int(ptr[-1])
+    return np.concatenate(merged).astype(np.int64)
+
+
+class InvertedIndex:
+    """Posting lists with term frequencies and line offsets, ranked with BM25"""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(
+        self,
+        doc_names: List[str],
+        doc_lengths: np.ndarray,
+        doc_line_ptr: np.ndarray,
+        line_offsets: np.ndarray,
+        vocab: List[str],
+        term_ptr: np.ndarray,
+        post_docs: np.ndarray,
+        post_tfs: np.ndarray,
+        post_line_ptr: np.ndarray,
+        post_lines: np.ndarray
+    ):
+        # Documents: token counts and per-line start offsets (CSR by doc)
+        self.doc_names = doc_names
+        self.doc_ids = {name: i for i, name in enumerate(doc_names)}
+        self.doc_lengths = doc_lengths
+        self.doc_line_ptr = doc_line_ptr
+        self.line_offsets = line_offsets
+
+        # Postings: one row per (term, doc), sorted by term then doc (CSR by term)
+        self.vocab = vocab
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.term_ptr = term_ptr
+        self.post_docs = post_docs
+        self.post_tfs = post_tfs
+        self.post_line_ptr = post_line_ptr
+        self.post_lines = post_lines
+
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, DocumentAnalysis]]) -> "InvertedIndex":
+        """Build an index from (name, analyze_document(...)) pairs, in the given order"""
+        doc_names = []
+        doc_lengths = []
+        line_offsets = []
+        term_strings = []
+        docs = []
+        tfs = []
+        line_ptrs = []
+        lines = []
+
+        for doc_id, (name, analysis) in enumerate(documents):
+            doc_names.append(name)
+            doc_lengths.append(analysis.token_count)
+            line_offsets.append(analysis.line_offsets)
+            term_strings.extend(analysis.terms)
+            docs.append(np.full(len(analysis.terms), doc_id, dtype=np.int64))
+            tfs.append(analysis.tfs)
+            line_ptrs.append(analysis.line_ptr)
+            lines.append(analysis.lines)
+
+        vocab = sorted(set(term_strings))
+        term_ids = {term: i for i, term in enumerate(vocab)}
+
+        return cls._from_postings(
+            doc_names=doc_names,
+            doc_lengths=np.array(doc_lengths, dtype=np.int32),
+            doc_line_ptr=_concat_ptrs([np.array([0, len(offsets)]) for offsets in line_offsets]),
+            line_offsets=_concat(line_offsets, np.int64),
+            vocab=vocab,
+            terms=np.array([term_ids[term] for term in term_strings], dtype=np.int64),
+            docs=_concat(docs, np.int64),
+            tfs=_concat(tfs, np.int32),
+            line_ptr=_concat_ptrs(line_ptrs),
+            lines=_concat(lines, np.int32)
+        )
+
+    @classmethod
+    def _from_postings(
+        cls,
+        doc_names: List[str],
+        doc_lengths: np.ndarray,
+        doc_line_ptr: np.ndarray,
+        line_offsets: np.ndarray,
+        vocab: List[str],
+        terms: np.ndarray,
+        docs: np.ndarray,
+        tfs: np.ndarray,
+        line_ptr: np.ndarray,
+        lines: np.ndarray
+    ) -> "InvertedIndex":
+        """Sort unordered (term id, doc, tf, lines) postings into CSR form"""
+        order = np.lexsort((docs, terms))
+        post_line_ptr, post_lines = _gather_rows(line_ptr, lines, order)
+        terms = terms[order]
+
+        # Drop vocabulary entries without postings (e.g. only in removed documents)
+        counts = np.bincount(terms, minlength=len(vocab))
+        live_terms = np.flatnonzero(counts)
+        term_ptr = np.zeros(len(live_terms) + 1, dtype=np.int64)
+        np.cumsum(counts[live_terms], out=term_ptr[1:])
+
+        return cls(
+            doc_names=doc_names,
+            doc_lengths=doc_lengths.astype(np.int32),
+            doc_line_ptr=doc_line_ptr,
+            line_offsets=line_offsets,
+            vocab=[vocab[i] for i in live_terms],
+            term_ptr=term_ptr,
+            post_docs=docs[order].astype(np.int32),
+            post_tfs=tfs[order].astype(np.int32),
+            post_line_ptr=post_line_ptr,
+            post_lines=post_lines.astype(np.int32)
+        )
+
+    @classmethod
+    def from_snapshot(cls, meta: dict, arrays: Dict[str, np.ndarray]) -> "InvertedIndex":
+        """Rebuild an index from to_snapshot() output (arrays may be mmap-backed)"""
+        return cls(
+            doc_names=meta["doc_names"],
+            vocab=meta["vocab"],
+            **{name: arrays[f"index.{name}"] for name in INDEX_ARRAYS}
+        )
+
+    def to_snapshot(self) -> Tuple[dict, Dict[str, np.ndarray]]:
+        """Split the index into JSON-able metadata and named arrays"""
+        meta = {"doc_names": self.doc_names, "vocab": self.vocab}
+        arrays = {f"index.{name}": getattr(self, name) for name in INDEX_ARRAYS}
+        return meta, arrays
+
+    def updated(self, removed: Iterable[str], added: "InvertedIndex") -> "InvertedIndex":
+        """
+        Return a new index without the removed documents plus every document of added
+
+        Postings of untouched documents are carried over with array operations,
+        so only changed transcripts ever need to be re-tokenized.
+        """
+        removed = set(removed) | set(added.doc_names)
+        kept_docs = np.array(
+            [i for i, name in enumerate(self.doc_names) if name not in removed],
+            dtype=np.int64
+        )
+
+        # Documents: kept ones first (renumbered densely), then the added ones
+        doc_remap = np.full(self.doc_count, -1, dtype=np.int64)
+        doc_remap[kept_docs] = np.arange(len(kept_docs))
+        doc_names = [self.doc_names[i] for i in kept_docs] + added.doc_names
+        doc_lengths = np.concatenate([self.doc_lengths[kept_docs], added.doc_lengths])
+        kept_line_ptr, kept_offsets = _gather_rows(self.doc_line_ptr, self.line_offsets, kept_docs)
+        doc_line_ptr = np.concatenate([kept_line_ptr, added.doc_line_ptr[1:] + kept_line_ptr[-1]])
+        line_offsets = np.concatenate([kept_offsets, added.line_offsets])
+
+        # Postings: map both vocabularies onto their union
+        vocab = sorted(set(self.vocab) | set(added.vocab))
+        term_ids = {term: i for i, term in enumerate(vocab)}
+
+        def posting_terms(index: "InvertedIndex") -> np.ndarray:
+            remap = np.array([term_ids[term] for term in index.vocab], dtype=np.int64)
+            return np.repeat(remap, np.diff(index.term_ptr))
+
+        kept_rows = np.flatnonzero(doc_remap[self.post_docs] >= 0)
+        kept_line_ptr, kept_lines = _gather_rows(self.post_line_ptr, self.post_lines, kept_rows)
+
+        return InvertedIndex._from_postings(
+            doc_names=doc_names,
+            doc_lengths=doc_lengths,
+            doc_line_ptr=doc_line_ptr,
+            line_offsets=line_offsets,
+            vocab=vocab,
+            terms=np.concatenate([posting_terms(self)[kept_rows], posting_terms(added)]),
+            docs=np.concatenate([doc_remap[self.post_docs[kept_rows]], added.post_docs + len(kept_docs)]),
+            tfs=np.concatenate([self.post_tfs[kept_rows], added.post_tfs]),
+            line_ptr=np.concatenate([kept_line_ptr, added.post_line_ptr[1:] + kept_line_ptr[-1]]),
+            lines=np.concatenate([kept_lines, added.post_lines])
+        )
+
+    @property
+    def doc_count(self) -> int:
+        """Number of indexed documents"""
+        return len(self.doc_names)
+
+    @property
+    def term_count(self) -> int:
+        """Number of distinct terms"""
+        return len(self.vocab)
+
+    def _posting_range(self, term: str) -> Tuple[int, int]:
+        """Start/end rows of a term's postings (empty if unknown)"""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return 0, 0
+        return int(self.term_ptr[term_id]), int(self.term_ptr[term_id + 1])
+
+    def document_frequency(self, term: str) -> int:
+        """Number of documents containing a term"""
+        start, end = self._posting_range(term)
+        return end - start
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency (always non-negative)"""
+        df = self.document_frequency(term)
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def terms_with_prefix(self, prefix: str) -> List[str]:
+        """Indexed terms starting with prefix (the vocabulary is sorted)"""
+        start = bisect.bisect_left(self.vocab, prefix)
+        end = start
+        while end < len(self.vocab) and self.vocab[end].startswith(prefix):
+            end += 1
+        return self.vocab[start:end]
+
+    def terms_containing(self, fragment: str) -> List[str]:
+        """Indexed terms with fragment anywhere in them (a scan of the vocabulary)"""
+        return [term for term in self.vocab if fragment in term]
+
+    def score(self, term_weights: Dict[str, float]) -> np.ndarray:
+        """BM25 score of every document for weighted query terms (one entry per doc_id)"""
+        scores = np.zeros(self.doc_count, dtype=np.float64)
+        length_norm = 1 - self.B + self.B * self.doc_lengths / max(self.avg_doc_length, 1.0)
+
+        for term, term_weight in term_weights.items():
+            start, end = self._posting_range(term)
+            if start == end:
+                continue
+
+            docs = self.post_docs[start:end]
+            tfs = self.post_tfs[start:end]
+            weights = tfs * (self.K1 + 1) / (tfs + self.K1 * length_norm[docs])
+            scores[docs] += term_weight * self.idf(term) * weights
+
+        return scores
+
+    def rank(self, terms: List[str]) -> List[Tuple[int, float]]:
+        """
+        Score every document containing at least one term with BM25
+
+        Returns [(doc_id, score)] sorted by descending score
+        """
+        if not self.doc_count:
+            return []
+
+        scores = self.score(dict.fromkeys(terms, 1.0))
+
+        matched = np.flatnonzero(scores)
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in order]
+
+    def matching_lines(self, doc_id: int, terms: List[str]) -> List[int]:
+        """Line numbers in a document containing any term, most distinct terms first"""
+        hits = Counter()
+
+        for term in set(terms):
+            start, end = self._posting_range(term)
+            if start == end:
+                continue
+
+            row = start + int(np.searchsorted(self.post_docs[start:end], doc_id))
+            if row < end and self.post_docs[row] == doc_id:
+                lines = self.post_lines[self.post_line_ptr[row]:self.post_line_ptr[row + 1]]
+                hits.update(lines.tolist())
+
+        return sorted(hits, key=lambda line_no: (-hits[line_no], line_no))
+
+    def line_count(self, doc_id: int) -> int:
+        """Number of lines in a document"""
+        return int(self.doc_line_ptr[doc_id + 1] - self.doc_line_ptr[doc_id]) - 1
+
+    def line_span(self, doc_id: int, first_line: int, last_line: int) -> Tuple[int, int]:
+        """Character span covering lines first_line..last_line inclusive"""
+        base = int(self.doc_line_ptr[doc_id])
+        start = int(self.line_offsets[base + first_line])
+        end = int(self.line_offsets[base + last_line + 1]) - 1
+        return start, end
@@ -0,0 +1,251 @@
+"""
+SemanticIndex - Nearest-neighbour lookup over cached problems
+
+Problems are normalized (case, punctuation, contractions, common
+abbreviations, stopwords, plural/verb suffixes) and turned into L2-normalised
+bag-of-words vectors. Vectors are stored as flat (row, term, weight) entry
+arrays, so a lookup is one gather and one bincount over every cached problem.
+The arrays grow by doubling, and discarded problems are compacted away once
+they make up most of the rows. Request handlers and the cache compactor
+thread share one index, so every public method holds its lock.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+CONTRACTIONS = {
+    "'ve": " have", "'re": " are", "'ll": " will", "'d": " would", "'m": " am", "n't": " not", "'s": ""
+}
+
+# Expanded before tokenizing so "PMF" and "product market fit" normalize alike
+ABBREVIATIONS = {
+    "pmf": "product market fit",
+    "gtm": "go to market",
+    "pm": "product manager",
+    "pms": "product managers",
+    "eng": "engineering",
+    "okr": "objective key result",
+    "okrs": "objective key result",
+    "kpi": "metric",
+    "kpis": "metric",
+    "b2b": "business to business",
+    "b2c": "business to consumer",
+    "saas": "software as a service",
+    "mvp": "minimum viable product",
+    "roi": "return on investment"
+}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "for", "with", "at", "by", "from",
+    "about", "as", "into", "is", "are", "was", "were", "be", "been", "am", "do", "does", "did", "have",
+    "has", "had", "will", "would", "should", "can", "could", "i", "me", "my", "we", "us", "our", "you",
+    "your", "it", "its", "they", "them", "their", "this", "that", "these", "those", "what", "how", "when",
+    "why", "which", "who", "there", "so", "than", "then", "just", "get", "got", "really", "actually"
+}
+
+SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def _stem(word: str) -> str:
+    """Strip one common suffix from longer words"""
+    for suffix in SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_problem(problem: str) -> List[str]:
+    """Content words of a problem, normalized for comparison"""
+    text = problem.lower().replace("’", "'").replace("-", " ")
+    words = []
+    for word in WORD_PATTERN.findall(text):
+        for contraction, expansion in CONTRACTIONS.items():
+            if word.endswith(contraction):
+                word = word[:-len(contraction)] + expansion
+                break
+        for part in word.split():
+            words.extend(ABBREVIATIONS.get(part, part).split())
+
+    return [_stem(word) for word in words if word not in STOPWORDS]
+
+
+class SemanticIndex:
+    """Cosine similarity search over normalized problems, partitioned by category"""
+
+    # Compact once discarded rows are over this fraction of all rows (and at least COMPACT_MIN_DEAD)
+    COMPACT_DEAD_FRACTION = 0.5
+    COMPACT_MIN_DEAD = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        """Empty every row, entry and vocabulary table (caller holds _lock)"""
+        self._term_ids = {}
+        self._category_ids = {}
+        self._keys = []  # row -> cache key
+        self._problems = []  # row -> original problem text
+        self._rows_by_key = {}
+        # Row and entry arrays grow by doubling; only the first _row_count / _entry_count are valid
+        self._row_count = 0
+        self._row_category = np.empty(0, dtype=np.int32)
+        self._row_alive = np.empty(0, dtype=bool)
+        self._entry_count = 0
+        self._entry_rows = np.empty(0, dtype=np.int32)
+        self._entry_terms = np.empty(0, dtype=np.int32)
+        self._entry_weights = np.empty(0, dtype=np.float32)
+        self.compactions = 0
+
+    def __len__(self) -> int:
+        return len(self._rows_by_key)
+
+    def _vector(self, problem: str, grow: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Term ids and unit-vector weights of a problem
+
+        Unknown terms are added to the vocabulary when grow is set; otherwise
+        they are dropped but still count towards the vector's length.
+        """
+        counts = {}
+        for word in normalize_problem(problem):
+            counts[word] = counts.get(word, 0) + 1
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        if grow:
+            for word in counts:
+                self._term_ids.setdefault(word, len(self._term_ids))
+
+        norm = np.linalg.norm(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        known = [word for word in counts if word in self._term_ids]
+        terms = np.array([self._term_ids[word] for word in known], dtype=np.int32)
+        weights = np.array([counts[word] for word in known], dtype=np.float32) / norm
+        return terms, weights
+
+    def _grow(self, names: Tuple[str, ...], used: int, needed: int) -> None:
+        """Make room for needed items in the named arrays, of which the first used are valid"""
+        capacity = len(getattr(self, names[0]))
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 64)
+        for name in names:
+            old = getattr(self, name)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:used] = old[:used]
+            setattr(self, name, grown)
+
+    def add(self, key: str, problem: str, category: str) -> None:
+        """Index a cached problem (no-op if the key is already indexed)"""
+        with self._lock:
+            self._add(key, problem, category)
+
+    def _add(self, key: str, problem: str, category: str) -> None:
+        """Append a problem's row and entries (caller holds _lock)"""
+        if key in self._rows_by_key:
+            return
+
+        terms, weights = self._vector(problem, grow=True)
+        row = self._row_count
+        category_id = self._category_ids.setdefault(category, len(self._category_ids))
+
+        self._keys.append(key)
+        self._problems.append(problem)
+        self._rows_by_key[key] = row
+        self._grow(("_row_category", "_row_alive"), row, row + 1)
+        self._row_category[row] = category_id
+        self._row_alive[row] = True
+        self._row_count = row + 1
+
+        end = self._entry_count + len(terms)
+        self._grow(("_entry_rows", "_entry_terms", "_entry_weights"), self._entry_count, end)
+        self._entry_rows[self._entry_count:end] = row
+        self._entry_terms[self._entry_count:end] = terms
+        self._entry_weights[self._entry_count:end] = weights
+        self._entry_count = end
+
+    def discard(self, key: str) -> None:
+        """Stop matching a key (its entries are dropped at the next compaction)"""
+        with self._lock:
+            row = self._rows_by_key.pop(key, None)
+            if row is None:
+                return
+            self._row_alive[row] = False
+
+            dead = self._row_count - len(self._rows_by_key)
+            if dead >= self.COMPACT_MIN_DEAD and dead > self._row_count * self.COMPACT_DEAD_FRACTION:
+                self._compact()
+
+    def _compact(self) -> None:
+        """Drop discarded rows, their entries and the terms only they used (caller holds _lock)"""
+        n = self._entry_count
+        alive = self._row_alive[:self._row_count]
+        kept_rows = np.flatnonzero(alive)
+        new_row = np.cumsum(alive, dtype=np.int32) - 1
+
+        kept = alive[self._entry_rows[:n]]
+        used_terms, terms = np.unique(self._entry_terms[:n][kept], return_inverse=True)
+        words = {term_id: word for word, term_id in self._term_ids.items()}
+
+        self._term_ids = {words[term_id]: new_id for new_id, term_id in enumerate(used_terms.tolist())}
+        self._keys = [self._keys[row] for row in kept_rows.tolist()]
+        self._problems = [self._problems[row] for row in kept_rows.tolist()]
+        self._rows_by_key = {key: row for row, key in enumerate(self._keys)}
+        self._row_count = len(kept_rows)
+        self._row_category = self._row_category[kept_rows]
+        self._row_alive = np.ones(self._row_count, dtype=bool)
+        self._entry_rows = new_row[self._entry_rows[:n][kept]]
+        self._entry_terms = terms.astype(np.int32)
+        self._entry_weights = self._entry_weights[:n][kept]
+        self._entry_count = len(self._entry_rows)
+        self.compactions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def nearest(self, problem: str, category: str) -> Optional[Tuple[str, str, float]]:
+        """(key, cached problem, cosine similarity) of the closest problem in the category"""
+        with self._lock:
+            return self._nearest(problem, category)
+
+    def _nearest(self, problem: str, category: str) -> Optional[Tuple[str, str, float]]:
+        """Score every live row of the category against the problem (caller holds _lock)"""
+        category_id = self._category_ids.get(category)
+        if category_id is None or not len(self):
+            return None
+
+        terms, weights = self._vector(problem, grow=False)
+        if not len(terms):
+            return None
+
+        query = np.zeros(len(self._term_ids), dtype=np.float32)
+        query[terms] = weights
+
+        n, m = self._entry_count, self._row_count
+        scores = np.bincount(
+            self._entry_rows[:n],
+            weights=self._entry_weights[:n] * query[self._entry_terms[:n]],
+            minlength=m
+        )
+        scores[(self._row_category[:m] != category_id) | ~self._row_alive[:m]] = -1.0
+
+        row = int(np.argmax(scores))
+        if scores[row] <= 0:
+            return None
+        return self._keys[row], self._problems[row], round(float(scores[row]), 4)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "problems": len(self),
+                "terms": len(self._term_ids),
+                "categories": len(self._category_ids),
+                "rows": self._row_count,
+                "compactions": self.compactions
+            }
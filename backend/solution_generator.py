@@ -3,16 +3,23 @@ SolutionGenerator - Use Claude to extract relevant wisdom from transcripts
 Uses Anthropic Claude API for extraction
 """
 
-from anthropic import Anthropic
+import asyncio
 import json
 import re
 from transcript_processor import TranscriptProcessor
-from typing import Optional, Dict, List
+from passage_retriever import PassageRetriever
+from llm_backend import AnthropicBackend, LLMBackend
+from llm_scheduler import LLMScheduler, LLMUnavailableError
+from speaker_index import SpeakerIndex
+from metrics import span
+from typing import AsyncIterator, Optional, Dict, List, Tuple
+
+NON_WORD_PATTERN = re.compile(r"[^a-z0-9]+")
 
 class SolutionGenerator:
     """Generate solutions by asking Claude to search transcripts"""
 
-    # Map of problem keywords to relevant episodes
+    # Hand-picked speakers per category; the corpus-derived SpeakerIndex takes over when one is given
     PROBLEM_CATEGORIES = {
         "product-market-fit": [
             "Sean Ellis",
@@ -76,6 +83,24 @@ class SolutionGenerator:
         ]
     }
 
+    # Keywords that point at each category. Matched as prefixes at word starts
+    # ("prioriti" matches "prioritize"), ignoring case and punctuation
+    CATEGORY_KEYWORDS = {
+        "product-market-fit": ["pmf", "product market", "fit", "traction", "growth accelerates", "retention curve", "must have"],
+        "product-eng-conflict": ["product eng", "engineer", "team", "conflict", "collaboration", "get along", "tension", "friction"],
+        "prioritization": ["prioriti", "what to build", "roadmap", "focus", "build", "trade off", "tradeoff", "backlog", "say no"],
+        "team-burnout": ["burnout", "burn out", "burning out", "burned out", "team", "mental health", "stress", "unsustainable", "exhaust", "overwork", "morale"],
+        "go-to-market": ["launch", "marketing", "gtm", "go to market", "distribution", "positioning", "channel"],
+        "building-teams": ["building team", "build a team", "hiring", "hire", "structure", "org", "people", "high performing", "team structure"],
+        "data-driven": ["data", "metric", "analytics", "measure", "experiment", "a b test", "kpi"],
+        "communication": ["communicat", "messaging", "story", "pitch", "influence", "presentation", "stakeholder", "feedback"],
+        "scaling": ["scale", "scaling", "growth", "large", "organizational", "complexity", "hypergrowth", "culture"],
+        "pricing": ["pricing", "monetiz", "price", "revenue", "unit economics", "willingness to pay"]
+    }
+
+    # Used when no keyword matches
+    DEFAULT_CATEGORY = "product-market-fit"
+
     # Popular problems for discovery
     POPULAR_PROBLEMS = [
         "How do I know if we have product-market fit?",
@@ -90,44 +115,138 @@ class SolutionGenerator:
         "What's the right pricing strategy?"
     ]
 
-    def __init__(self, transcript_processor: TranscriptProcessor, demo_mode: bool = False):
+    # Max characters of transcript excerpts sent per speaker
+    PROMPT_CHAR_BUDGET = 8000
+    MODEL = "claude-3-5-sonnet-20241022"
+
+    # Filled in by _build_prompt; generate_static_data.py hashes it to tell when answers are stale
+    EXTRACTION_PROMPT = """
+You are an expert at extracting actionable advice from podcast transcripts.
+
+PROBLEM: {problem}
+
+TRANSCRIPT EXCERPTS FROM {speaker_name}:
+{excerpt}
+
+Your task:
+1. Find the most relevant insight or quote from {speaker_name} that directly addresses the problem
+2. Extract a concise, actionable quote (1-3 sentences max) that {speaker_name} actually said
+3. Identify 1-2 frameworks or concepts mentioned
+4. If you find a timestamp, include it (format: MM:SS or HH:MM:SS)
+
+IMPORTANT:
+- Only include actual quotes from the transcript, NOT paraphrased versions
+- The quote must be verbatim or nearly verbatim from the text
+- If no relevant content exists, respond with null
+
+Respond in this exact JSON format (no markdown, just JSON):
+{{
+    "quote": "exact quote from transcript addressing the problem",
+    "framework1": "framework or concept name",
+    "framework2": "second framework or concept",
+    "timestamp": "HH:MM:SS or null",
+    "confidence": 0.85
+}}
+
+If no relevant insight found, respond with:
+{{"quote": null}}
+"""
+
+    def __init__(
+        self,
+        transcript_processor: TranscriptProcessor,
+        demo_mode: bool = False,
+        max_concurrency: int = 4,
+        llm_backend: Optional[LLMBackend] = None,
+        llm_scheduler: Optional[LLMScheduler] = None,
+        speaker_index: Optional[SpeakerIndex] = None
+    ):
         self.processor = transcript_processor
         self.demo_mode = demo_mode
+        self.speaker_index = speaker_index
+        self.retriever = PassageRetriever(
+            transcript_processor,
+            hosts=speaker_index.hosts if speaker_index is not None else None
+        )
+        self._keyword_pattern, self._keyword_scores = self._compile_categorizer(self.CATEGORY_KEYWORDS)
         if not demo_mode:
-            self.client = Anthropic()
+            # Every Claude call goes through the scheduler (priorities, rate limits, retries);
+            # without one, max_concurrency bounds calls in flight and nothing else is limited
+            self.scheduler = llm_scheduler or LLMScheduler(
+                llm_backend or AnthropicBackend(self.MODEL),
+                max_concurrency=max_concurrency
+            )
+            self.llm = self.scheduler.backend
 
     def get_popular_problems(self) -> List[str]:
         """Return list of popular problems"""
         return self.POPULAR_PROBLEMS
 
+    def speakers_for_category(self, category: str, n: int) -> List[str]:
+        """The n speakers to ask about a category: ranked from the corpus if indexed, else hand-picked"""
+        if self.speaker_index is not None and category in self.speaker_index:
+            return self.speaker_index.top_speakers(category, n)
+        return self.PROBLEM_CATEGORIES.get(category, [])[:n]
+
     def categorize_problem(self, problem: str) -> str:
         """
         Categorize a problem to find relevant episodes
 
-        Uses keyword matching and Claude if needed
+        Returns the best scoring category (see rank_categories)
         """
-        problem_lower = problem.lower()
-
-        # Direct keyword matching
-        keyword_map = {
-            "product-market-fit": ["pmf", "product market", "fit", "traction", "growth accelerates"],
-            "product-eng-conflict": ["product eng", "engineering", "team", "conflict", "collaboration"],
-            "prioritization": ["prioriti", "what to build", "roadmap", "focus", "build"],
-            "team-burnout": ["burnout", "team", "mental health", "stress", "unsustainable"],
-            "go-to-market": ["launch", "marketing", "gtm", "go-to-market", "distribution"],
-            "building-teams": ["building team", "hiring", "structure", "org", "people"],
-            "data-driven": ["data", "metrics", "analytics", "measurement", "experiment"],
-            "communication": ["communicat", "messaging", "story", "pitch", "influence"],
-            "scaling": ["scale", "growth", "large", "organizational", "complexity"],
-            "pricing": ["pricing", "monetiz", "price", "revenue", "unit economics"]
-        }
+        return self.rank_categories(problem)[0]["category"]
+
+    def rank_categories(self, problem: str) -> List[Dict]:
+        """
+        Score every category against a problem in a single scan
 
-        for category, keywords in keyword_map.items():
-            if any(kw in problem_lower for kw in keywords):
-                return category
+        Each keyword hit adds its weight to the categories listing it; phrases
+        weigh one per word, and a keyword listed under several categories is
+        split between them. Returns [{"category", "confidence", "keywords"}]
+        best first, confidences summing to 1; ties keep CATEGORY_KEYWORDS
+        order. With no hits, DEFAULT_CATEGORY is returned with confidence 0.
+        """
+        scores = {}
+        keywords = {}
+        for match in self._keyword_pattern.finditer(NON_WORD_PATTERN.sub(" ", problem.lower())):
+            keyword = match.group()
+            for category, weight in self._keyword_scores[keyword]:
+                scores[category] = scores.get(category, 0.0) + weight
+                keywords.setdefault(category, []).append(keyword)
+
+        if not scores:
+            return [{"category": self.DEFAULT_CATEGORY, "confidence": 0.0, "keywords": []}]
+
+        total = sum(scores.values())
+        order = {category: position for position, category in enumerate(self.CATEGORY_KEYWORDS)}
+        return [
+            {"category": category, "confidence": round(scores[category] / total, 3), "keywords": keywords[category]}
+            for category in sorted(scores, key=lambda category: (-scores[category], order[category]))
+        ]
 
-        # Fallback to "product-market-fit" as default
-        return "product-market-fit"
+    @staticmethod
+    def _compile_categorizer(category_keywords: Dict[str, List[str]]):
+        """
+        One regex alternation over every keyword, plus {keyword: [(category, weight)]}
+
+        Longer keywords come first in the alternation, so at any position the
+        longest keyword wins ("go to market" over "go").
+        """
+        owners = {}
+        for category, keywords in category_keywords.items():
+            for keyword in keywords:
+                keyword = NON_WORD_PATTERN.sub(" ", keyword.lower()).strip()
+                categories = owners.setdefault(keyword, [])
+                if category not in categories:
+                    categories.append(category)
+
+        scores = {
+            keyword: [(category, len(keyword.split()) / len(categories)) for category in categories]
+            for keyword, categories in owners.items()
+        }
+        alternatives = sorted(owners, key=len, reverse=True)
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in alternatives) + ")")
+        return pattern, scores
 
     def generate_solutions(
         self,
@@ -140,62 +259,334 @@ class SolutionGenerator:
 
         Returns structured solutions with real quotes
         """
-        # Categorize problem if not provided
-        if not category:
-            category = self.categorize_problem(problem)
+        category, targets = self._plan_extractions(problem, num_solutions, category)
 
-        # Get relevant speakers/episodes for this problem
-        relevant_speakers = self.PROBLEM_CATEGORIES.get(category, [])
-
-        # Extract insights from relevant episodes
+        # Extract insights from relevant episodes, one speaker at a time
         solutions = []
-
-        for i, speaker_name in enumerate(relevant_speakers[:num_solutions]):
+        errors = []
+        for speaker_name, role, episode_name, transcript in targets:
             try:
-                # Get transcript for this speaker
-                episodes = self.processor.get_speaker_episodes(speaker_name)
-                if not episodes:
-                    continue
-
-                # Use the first/largest episode for this speaker
-                episode_name = episodes[0]
-                transcript = self.processor.get_transcript_content(episode_name)
-                role = self.processor.get_speaker_role(speaker_name)
-
-                if not transcript:
-                    continue
-
-                # Use Claude to extract relevant insight
                 insight = self._extract_insight_with_claude(
                     problem=problem,
                     speaker_name=speaker_name,
                     transcript=transcript,
                     episode_name=episode_name
                 )
-
-                if insight:
-                    solutions.append({
-                        "speaker": speaker_name,
-                        "speaker_role": role,
-                        "icon": self._get_speaker_icon(speaker_name),
-                        "insight": insight["quote"],
-                        "framework": insight["framework1"],
-                        "framework2": insight["framework2"],
-                        "episode_name": episode_name,
-                        "episode_timestamp": insight.get("timestamp", ""),
-                        "confidence": 0.85
-                    })
-
             except Exception as e:
                 print(f"⚠️  Error generating solution for {speaker_name}: {str(e)}")
+                errors.append(e)
                 continue
 
+            solution = self._solution_or_none(speaker_name, role, episode_name, insight)
+            if solution:
+                solutions.append(solution)
+
+        self._check_failures(len(targets), errors)
+
         return {
             "problem": problem,
             "category": category,
             "solutions": solutions
         }
 
+    async def generate_solutions_async(
+        self,
+        problem: str,
+        num_solutions: int = 3,
+        category: Optional[str] = None,
+        priority: str = "interactive"
+    ) -> Dict:
+        """
+        Async generate_solutions: all speaker extractions run concurrently
+
+        Calls are queued at priority on the LLM scheduler, so request latency
+        is roughly the slowest call rather than the sum. Solutions keep
+        speaker order.
+        """
+        category = category or self.categorize_problem(problem)
+        solutions = [item async for item in self.iter_solutions(problem, num_solutions, category, priority)]
+
+        return {
+            "problem": problem,
+            "category": category,
+            "solutions": [solution for _, solution in sorted(solutions, key=lambda item: item[0])]
+        }
+
+    async def iter_solutions(
+        self,
+        problem: str,
+        num_solutions: int = 3,
+        category: Optional[str] = None,
+        priority: str = "interactive"
+    ) -> AsyncIterator[Tuple[int, Dict]]:
+        """
+        Yield (speaker position, solution) as each concurrent extraction finishes
+
+        Extractions still running are cancelled if the consumer stops early.
+        Raises LLMUnavailableError if every extraction failed.
+        """
+        category, targets = self._plan_extractions(problem, num_solutions, category)
+        errors = []
+
+        async def extract(position, speaker_name, role, episode_name, transcript):
+            try:
+                insight = await self._extract_insight_async(
+                    problem=problem,
+                    speaker_name=speaker_name,
+                    transcript=transcript,
+                    episode_name=episode_name,
+                    priority=priority
+                )
+            except Exception as e:
+                print(f"⚠️  Error generating solution for {speaker_name}: {str(e)}")
+                errors.append(e)
+                return position, None
+            return position, self._solution_or_none(speaker_name, role, episode_name, insight)
+
+        tasks = [asyncio.ensure_future(extract(position, *target)) for position, target in enumerate(targets)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                position, solution = await finished
+                if solution:
+                    yield position, solution
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self._check_failures(len(targets), errors)
+
+    async def generate_solutions_batch_async(
+        self,
+        problems: List[str],
+        num_solutions: int = 3,
+        categories: Optional[List[Optional[str]]] = None,
+        priority: str = "batch"
+    ) -> List[Dict]:
+        """
+        generate_solutions for many problems at once
+
+        Problems are grouped by category and speaker so each speaker's passages
+        are retrieved once for the whole batch, and identical (problem, category)
+        pairs are generated once. Every extraction in the batch is queued on the
+        LLM scheduler at once, at priority (behind interactive requests by
+        default). Results are in input order; a problem whose extractions all
+        failed comes back with no solutions rather than failing the batch.
+        Raises LLMUnavailableError if every extraction in the batch failed.
+        """
+        plans = self.plan_solutions_batch(problems, num_solutions, categories)
+        return await self.generate_planned_async(plans, priority)
+
+    def plan_solutions_batch(
+        self,
+        problems: List[str],
+        num_solutions: int = 3,
+        categories: Optional[List[Optional[str]]] = None
+    ) -> List[Tuple[str, str, List[Tuple[str, str, str, str]]]]:
+        """
+        Pick speakers and excerpts for many problems without calling Claude
+
+        Returns (problem, category, [(speaker_name, role, episode_name, excerpt), ...])
+        per problem, in input order. Each speaker's passages are retrieved once.
+        """
+        categories = categories or [None] * len(problems)
+        categories = [category or self.categorize_problem(problem) for problem, category in zip(problems, categories)]
+
+        # {(problem, category): speaker names}, first occurrence order
+        requests = {}
+        for problem, category in zip(problems, categories):
+            requests.setdefault((problem, category), self.speakers_for_category(category, num_solutions))
+
+        with span("retrieval"):
+            excerpts = self._select_excerpts_batch([(problem, speakers) for (problem, _), speakers in requests.items()])
+        plans = {
+            (problem, category): (problem, category, self._extraction_targets(speakers, episode_excerpts))
+            for ((problem, category), speakers), episode_excerpts in zip(requests.items(), excerpts)
+        }
+
+        return [plans[(problem, category)] for problem, category in zip(problems, categories)]
+
+    async def generate_planned_async(
+        self,
+        plans: List[Tuple[str, str, List[Tuple[str, str, str, str]]]],
+        priority: str = "batch"
+    ) -> List[Dict]:
+        """Run the extractions of plan_solutions_batch plans concurrently; one result per plan"""
+        unique = list({(problem, category): (problem, category, targets) for problem, category, targets in plans}.values())
+
+        insights = await asyncio.gather(*(
+            self._extract_insight_async(
+                problem=problem,
+                speaker_name=speaker_name,
+                transcript=transcript,
+                episode_name=episode_name,
+                priority=priority
+            )
+            for problem, _, targets in unique
+            for speaker_name, role, episode_name, transcript in targets
+        ), return_exceptions=True)
+
+        self._check_failures(len(insights), [insight for insight in insights if isinstance(insight, Exception)])
+
+        results = {}
+        insights = iter(insights)
+        for problem, category, targets in unique:
+            solutions = []
+            for (speaker_name, role, episode_name, transcript), insight in zip(targets, insights):
+                if isinstance(insight, Exception):
+                    print(f"⚠️  Error generating solution for {speaker_name}: {str(insight)}")
+                    continue
+                solution = self._solution_or_none(speaker_name, role, episode_name, insight)
+                if solution:
+                    solutions.append(solution)
+
+            results[(problem, category)] = {
+                "problem": problem,
+                "category": category,
+                "solutions": solutions
+            }
+
+        return [results[(problem, category)] for problem, category, _ in plans]
+
+    def generate_solutions_batch(
+        self,
+        problems: List[str],
+        num_solutions: int = 3,
+        categories: Optional[List[Optional[str]]] = None,
+        priority: str = "batch"
+    ) -> List[Dict]:
+        """Blocking generate_solutions_batch_async for scripts (not for use inside a running event loop)"""
+        return asyncio.run(self.generate_solutions_batch_async(problems, num_solutions, categories, priority))
+
+    @staticmethod
+    def _check_failures(attempted: int, errors: List[Exception]) -> None:
+        """
+        Raise LLMUnavailableError when every attempted extraction failed
+
+        errors holds only scheduler/API failures; a reply that could not be
+        parsed or shaped means the backend answered, so it is not an outage.
+        """
+        if attempted and len(errors) == attempted:
+            raise LLMUnavailableError(f"All {attempted} extractions failed: {errors[-1]}")
+
+    def _plan_extractions(
+        self,
+        problem: str,
+        num_solutions: int,
+        category: Optional[str]
+    ) -> Tuple[str, List[Tuple[str, str, str, str]]]:
+        """
+        Pick the speakers to ask and the excerpt each one gets
+
+        Returns (category, [(speaker_name, role, episode_name, excerpt), ...])
+        """
+        # Categorize problem if not provided
+        if not category:
+            category = self.categorize_problem(problem)
+
+        # Get relevant speakers/episodes for this problem
+        relevant_speakers = self.speakers_for_category(category, num_solutions)
+        with span("retrieval"):
+            excerpts = self._select_excerpts(problem, relevant_speakers)
+
+        return category, self._extraction_targets(relevant_speakers, excerpts)
+
+    def _extraction_targets(
+        self,
+        speaker_names: List[str],
+        excerpts: Dict[str, str]
+    ) -> List[Tuple[str, str, str, str]]:
+        """(speaker_name, role, episode_name, excerpt) for each speaker with an excerpt"""
+        targets = []
+        for speaker_name in speaker_names:
+            episodes = self.processor.get_speaker_episodes(speaker_name)
+            if not episodes:
+                continue
+
+            # Use the first/largest episode for this speaker
+            episode_name = episodes[0]
+            transcript = excerpts.get(episode_name, "")
+            if not transcript:
+                continue
+
+            targets.append((speaker_name, self.processor.get_speaker_role(speaker_name), episode_name, transcript))
+
+        return targets
+
+    def _build_solution(self, speaker_name: str, role: str, episode_name: str, insight: Dict) -> Dict:
+        """Shape an extracted insight into a solution card"""
+        return {
+            "speaker": speaker_name,
+            "speaker_role": role,
+            "icon": self._get_speaker_icon(speaker_name),
+            "insight": insight["quote"],
+            "framework": insight["framework1"],
+            "framework2": insight["framework2"],
+            "episode_name": episode_name,
+            "episode_timestamp": insight.get("timestamp", ""),
+            "confidence": 0.85
+        }
+
+    def _solution_or_none(
+        self,
+        speaker_name: str,
+        role: str,
+        episode_name: str,
+        insight: Optional[Dict]
+    ) -> Optional[Dict]:
+        """_build_solution for an extracted insight, or None if there is none or it can't be shaped"""
+        if not insight:
+            return None
+        try:
+            return self._build_solution(speaker_name, role, episode_name, insight)
+        except Exception as e:
+            print(f"⚠️  Error building solution for {speaker_name}: {str(e)}")
+            return None
+
+    def _speaker_episode_names(self, speaker_names: List[str]) -> List[str]:
+        """First (largest) episode of each speaker, without duplicates"""
+        episode_names = []
+        for speaker_name in speaker_names:
+            episodes = self.processor.get_speaker_episodes(speaker_name)
+            if episodes and episodes[0] not in episode_names:
+                episode_names.append(episodes[0])
+        return episode_names
+
+    def _select_excerpts(self, problem: str, speaker_names: List[str]) -> Dict[str, str]:
+        """
+        Pick the passages most relevant to the problem from each speaker's episode
+
+        All episodes are scored in one batch; each gets PROMPT_CHAR_BUDGET characters.
+        Returns {episode_name: excerpt}
+        """
+        episode_names = self._speaker_episode_names(speaker_names)
+
+        if self.demo_mode or not episode_names:
+            return {name: self.processor.get_transcript_content(name) for name in episode_names}
+
+        return self.retriever.select_passages(problem, episode_names, self.PROMPT_CHAR_BUDGET)
+
+    def _select_excerpts_batch(self, requests: List[Tuple[str, List[str]]]) -> List[Dict[str, str]]:
+        """
+        _select_excerpts for many (problem, speaker_names) requests
+
+        Each speaker's episode is looked up and scored once, against every
+        problem that needs it.
+        """
+        episode_requests = [
+            (problem, self._speaker_episode_names(speaker_names))
+            for problem, speaker_names in requests
+        ]
+
+        if self.demo_mode:
+            transcripts = {}
+            for _, episode_names in episode_requests:
+                for name in episode_names:
+                    if name not in transcripts:
+                        transcripts[name] = self.processor.get_transcript_content(name)
+            return [{name: transcripts[name] for name in episode_names} for _, episode_names in episode_requests]
+
+        return self.retriever.select_passages_batch(episode_requests, self.PROMPT_CHAR_BUDGET)
+
     def _extract_insight_with_claude(
         self,
         problem: str,
@@ -212,63 +603,52 @@ class SolutionGenerator:
         if self.demo_mode:
             return self._get_demo_insight(problem, speaker_name, episode_name)
 
-        # Limit transcript to first 8000 chars to avoid token limits
-        truncated_transcript = transcript[:8000]
-
-        prompt = f"""
-You are an expert at extracting actionable advice from podcast transcripts.
-
-PROBLEM: {problem}
-
-TRANSCRIPT FROM {speaker_name}:
-{truncated_transcript}
-
-Your task:
-1. Find the most relevant insight or quote from {speaker_name} that directly addresses the problem
-2. Extract a concise, actionable quote (1-3 sentences max) that {speaker_name} actually said
-3. Identify 1-2 frameworks or concepts mentioned
-4. If you find a timestamp, include it (format: MM:SS or HH:MM:SS)
+        try:
+            response_text = self.scheduler.complete(self._build_prompt(problem, speaker_name, transcript), max_tokens=500)
+        except Exception as e:
+            # Already retried by the scheduler; let the caller count the failure
+            print(f"⚠️  Claude API error: {str(e)}")
+            raise
 
-IMPORTANT:
-- Only include actual quotes from the transcript, NOT paraphrased versions
-- The quote must be verbatim or nearly verbatim from the text
-- If no relevant content exists, respond with null
+        with span("parse"):
+            return self._parse_insight_text(response_text)
 
-Respond in this exact JSON format (no markdown, just JSON):
-{{
-    "quote": "exact quote from transcript addressing the problem",
-    "framework1": "framework or concept name",
-    "framework2": "second framework or concept",
-    "timestamp": "HH:MM:SS or null",
-    "confidence": 0.85
-}}
-
-If no relevant insight found, respond with:
-{{"quote": null}}
-"""
+    async def _extract_insight_async(
+        self,
+        problem: str,
+        speaker_name: str,
+        transcript: str,
+        episode_name: str,
+        priority: str = "interactive"
+    ) -> Optional[Dict]:
+        """Async _extract_insight_with_claude, queued on the LLM scheduler at priority"""
+        if self.demo_mode:
+            return self._get_demo_insight(problem, speaker_name, episode_name)
 
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
+            response_text = await self.scheduler.acomplete(
+                self._build_prompt(problem, speaker_name, transcript),
                 max_tokens=500,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+                priority=priority
             )
+        except Exception as e:
+            print(f"⚠️  Claude API error: {str(e)}")
+            raise
 
-            # Validate response structure
-            if not response or not hasattr(response, 'content') or not response.content:
-                print(f"⚠️  Invalid API response structure")
-                return None
+        with span("parse"):
+            return self._parse_insight_text(response_text)
 
-            if not hasattr(response.content[0], 'text'):
-                print(f"⚠️  API response missing text field")
-                return None
+    def _build_prompt(self, problem: str, speaker_name: str, transcript: str) -> str:
+        """Extraction prompt for one speaker's transcript excerpts"""
+        # Excerpts are already budgeted; the slice only guards direct callers
+        excerpt = transcript[:self.PROMPT_CHAR_BUDGET]
 
-            response_text = response.content[0].text.strip()
+        return self.EXTRACTION_PROMPT.format(problem=problem, speaker_name=speaker_name, excerpt=excerpt)
+
+    def _parse_insight_text(self, response_text: str) -> Optional[Dict]:
+        """Parse the JSON insight in a Claude response (None if unusable)"""
+        try:
+            response_text = response_text.strip()
 
             if not response_text:
                 print(f"⚠️  API response text is empty")
@@ -277,21 +657,21 @@ If no relevant insight found, respond with:
             # Parse JSON response
             result = json.loads(response_text)
 
-            if result.get("quote"):
+            # Every field _build_solution reads must be there
+            if result.get("quote") and "framework1" in result and "framework2" in result:
                 return result
             else:
                 return None
 
         except json.JSONDecodeError as e:
             print(f"⚠️  JSON parsing error: {str(e)}")
-            if 'response_text' in locals():
-                print(f"   Response was: {response_text[:200]}")
+            print(f"   Response was: {response_text[:200]}")
             return None
         except (AttributeError, IndexError) as e:
             print(f"⚠️  API response format error: {str(e)}")
             return None
         except Exception as e:
-            print(f"⚠️  Claude API error: {str(e)}")
+            print(f"⚠️  Response parsing error: {str(e)}")
             return None
 
     def _get_demo_insight(self, problem: str, speaker_name: str, episode_name: str) -> Optional[Dict]:
@@ -0,0 +1,254 @@
+"""
+SpeakerIndex - Which speakers to ask about each problem category
+
+Built offline from the whole corpus: every episode is scored against every
+category with BM25 over that category's keywords (the same table the
+categorizer uses; keyword prefixes are expanded against the index
+vocabulary), and the best speakers per category are kept, one episode per
+person. Hosts are the speakers heard across many episodes; compilation and
+host-only episodes are not ranked: an episode counts only if its named
+guests hold most of the non-host turns. The table and the hosts are saved as
+JSON next to the transcripts together with fingerprints of the corpus and
+the keywords, and rebuilt when either changes.
+
+    python speaker_index.py [transcripts_dir]   # rebuild and print the table
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from search_index import InvertedIndex, tokenize
+from utterance_store import NO_SPEAKER
+
+SPEAKER_INDEX_FILENAME = ".wwld_speaker_index.json"
+FORMAT_VERSION = 2
+
+# Speakers kept per category
+TOP_SPEAKERS = 20
+
+# Shorter episodes (teasers, trailers) are not ranked
+MIN_EPISODE_TOKENS = 3000
+
+# Speakers heard in over this share of the episodes, and in at least HOST_MIN_EPISODES, are
+# hosts; the host's turns are split across labels ("Lenny", "Lenny Rachitsky"), so each
+# label covers well under half of them
+HOST_EPISODE_SHARE = 0.2
+HOST_MIN_EPISODES = 3
+
+# Episodes whose guests hold no more than this share of the non-host turns
+# (year-end reviews, compilations) are not ranked
+MIN_GUEST_SHARE = 0.5
+
+# "April Dunford 2.0" and "Andy Raskin_" are the same people as "April Dunford" and "Andy Raskin"
+PERSON_SUFFIX_PATTERN = re.compile(r"(?:\s+\d+\.\d+|_)+$")
+
+# "Jake Knapp + John Zeratsky", "Sriram and Aarthi" have two guests
+GUEST_SEPARATOR_PATTERN = re.compile(r"\s+(?:\+|&|and)\s+")
+
+
+def person_name(speaker_name: str) -> str:
+    """Speaker name without repeat-episode suffixes"""
+    return PERSON_SUFFIX_PATTERN.sub("", speaker_name).strip()
+
+
+def guest_count(episode_name: str) -> int:
+    """Number of guests named in an episode title"""
+    return len(GUEST_SEPARATOR_PATTERN.split(person_name(episode_name)))
+
+
+def host_speakers(table) -> Set[str]:
+    """Speakers of the utterance table heard in over HOST_EPISODE_SHARE of its episodes (and HOST_MIN_EPISODES)"""
+    episode_ids = np.repeat(np.arange(table.episode_count), np.diff(table.episode_ptr))
+    labelled = table.speaker_ids != NO_SPEAKER
+    pairs = np.unique(episode_ids[labelled].astype(np.int64) * len(table.speaker_names) + table.speaker_ids[labelled])
+    episodes = np.bincount(pairs % max(len(table.speaker_names), 1), minlength=len(table.speaker_names))
+
+    hosts = np.flatnonzero((episodes > HOST_EPISODE_SHARE * table.episode_count) & (episodes >= HOST_MIN_EPISODES))
+    return {table.speaker_names[speaker_id] for speaker_id in hosts.tolist()}
+
+
+def is_guest_episode(table, episode_name: str, hosts: Iterable[str]) -> bool:
+    """
+    Whether an episode is an interview with the guests it is named after
+
+    Transcript labels don't always match the title ("Boz", "Vijay"), so the
+    guests are taken to be the most frequent non-host speakers, as many as the
+    title names; they must hold over MIN_GUEST_SHARE of the non-host turns.
+    Episodes without any speaker labels can't be judged and are kept.
+    """
+    start, end = table.episode_rows(episode_name)
+    speaker_ids = table.speaker_ids[start:end]
+    speaker_ids = speaker_ids[speaker_ids != NO_SPEAKER]
+    if not len(speaker_ids):
+        return True
+
+    host_ids = [table.speaker_idx[host] for host in hosts if host in table.speaker_idx]
+    guest_ids = speaker_ids[~np.isin(speaker_ids, host_ids)]
+    if not len(guest_ids):
+        return False
+
+    turns = np.sort(np.bincount(guest_ids))[::-1]
+    return turns[:guest_count(episode_name)].sum() > MIN_GUEST_SHARE * len(guest_ids)
+
+
+def category_term_weights(index: InvertedIndex, category_keywords: Dict[str, List[str]]) -> Dict[str, Dict[str, float]]:
+    """
+    {category: {index term: weight}} for the keyword table
+
+    Each word of a keyword becomes a query term; the last word is a prefix,
+    as in the categorizer, so it expands to every indexed term it starts.
+    Keywords listed under several categories are down-weighted the same way.
+    """
+    owners = {}
+    for category, keywords in category_keywords.items():
+        for keyword in keywords:
+            owners.setdefault(" ".join(tokenize(keyword)), set()).add(category)
+
+    weights = {category: {} for category in category_keywords}
+    for keyword, categories in owners.items():
+        words = keyword.split()
+        if not words:
+            continue
+        terms = words[:-1] + index.terms_with_prefix(words[-1])
+        weight = 1.0 / len(categories)
+        for category in categories:
+            for term in terms:
+                # A term reached through several keywords counts once, at its best weight
+                weights[category][term] = max(weights[category].get(term, 0.0), weight)
+
+    return weights
+
+
+class SpeakerIndex:
+    """Ranked speakers per category, looked up in O(1)"""
+
+    def __init__(self, categories: Dict[str, List[Dict]], corpus_fingerprint: str, keywords_fingerprint: str,
+                 built_at: Optional[str] = None, hosts: Iterable[str] = ()):
+        self.categories = categories  # {category: [{"speaker", "score"}, ...]} best first
+        self.hosts = set(hosts)
+        self.corpus_fingerprint = corpus_fingerprint
+        self.keywords_fingerprint = keywords_fingerprint
+        self.built_at = built_at or datetime.now().isoformat()
+        self._speakers = {category: [entry["speaker"] for entry in ranked] for category, ranked in categories.items()}
+
+    def __contains__(self, category: str) -> bool:
+        return bool(self._speakers.get(category))
+
+    def top_speakers(self, category: str, n: int) -> List[str]:
+        """The n best speakers for a category (empty if the category is unknown)"""
+        return self._speakers.get(category, [])[:n]
+
+    @staticmethod
+    def keywords_fingerprint_of(category_keywords: Dict[str, List[str]]) -> str:
+        """Hash of the keyword table and the ranking settings"""
+        settings = [
+            FORMAT_VERSION, TOP_SPEAKERS, MIN_EPISODE_TOKENS, HOST_EPISODE_SHARE, HOST_MIN_EPISODES, MIN_GUEST_SHARE,
+            category_keywords
+        ]
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def build(cls, processor, category_keywords: Dict[str, List[str]], top: int = TOP_SPEAKERS) -> "SpeakerIndex":
+        """Score every episode against every category and keep the best speakers"""
+        print("🗂️  Ranking speakers per category...")
+        index = processor.search_index
+        categories = {}
+        hosts = host_speakers(processor.utterances) if processor.utterances is not None else set()
+
+        if index is not None and index.doc_count:
+            eligible = (index.doc_lengths >= MIN_EPISODE_TOKENS) & np.array(
+                [is_guest_episode(processor.utterances, name, hosts) for name in index.doc_names], dtype=bool
+            )
+            for category, term_weights in category_term_weights(index, category_keywords).items():
+                scores = np.where(eligible, index.score(term_weights), 0.0)
+                ranked = []
+                people = set()
+                for doc_id in np.argsort(-scores, kind="stable"):
+                    if scores[doc_id] <= 0 or len(ranked) >= top:
+                        break
+                    speaker = index.doc_names[doc_id]
+                    if person_name(speaker) in people:
+                        continue
+                    people.add(person_name(speaker))
+                    ranked.append({"speaker": speaker, "score": round(float(scores[doc_id]), 3)})
+                categories[category] = ranked
+
+        print(f"   ✅ Ranked speakers for {len(categories)} categories")
+        return cls(categories, processor.corpus_version, cls.keywords_fingerprint_of(category_keywords), hosts=hosts)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["SpeakerIndex"]:
+        """Read a saved index (None if missing, unreadable or from another format version)"""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return None
+        if data.get("version") != FORMAT_VERSION:
+            return None
+        return cls(data["categories"], data["corpus_fingerprint"], data["keywords_fingerprint"], data.get("built_at"),
+                   hosts=data["hosts"])
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "built_at": self.built_at,
+                "corpus_fingerprint": self.corpus_fingerprint,
+                "keywords_fingerprint": self.keywords_fingerprint,
+                "hosts": sorted(self.hosts),
+                "categories": self.categories
+            }, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_or_build(cls, processor, category_keywords: Dict[str, List[str]]) -> "SpeakerIndex":
+        """The saved index if it matches the corpus and keywords, else a fresh one (saved for next time)"""
+        path = processor.transcripts_dir / SPEAKER_INDEX_FILENAME
+        saved = cls.load(path)
+        if (saved is not None
+                and saved.corpus_fingerprint == processor.corpus_version
+                and saved.keywords_fingerprint == cls.keywords_fingerprint_of(category_keywords)):
+            print(f"🗂️  Loaded speaker index from {path.name}")
+            return saved
+
+        built = cls.build(processor, category_keywords)
+        try:
+            built.save(path)
+        except IOError as e:
+            print(f"⚠️  Could not save speaker index: {str(e)}")
+        return built
+
+    def get_stats(self) -> Dict:
+        return {
+            "categories": len(self.categories),
+            "speakers": len({speaker for speakers in self._speakers.values() for speaker in speakers}),
+            "hosts": sorted(self.hosts),
+            "built_at": self.built_at
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    from solution_generator import SolutionGenerator
+    from transcript_processor import TranscriptProcessor
+
+    transcripts_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent
+    processor = TranscriptProcessor(transcripts_dir)
+    speaker_index = SpeakerIndex.build(processor, SolutionGenerator.CATEGORY_KEYWORDS)
+    speaker_index.save(transcripts_dir / SPEAKER_INDEX_FILENAME)
+
+    for category, ranked in speaker_index.categories.items():
+        print(f"\n{category}")
+        for entry in ranked[:5]:
+            print(f"   {entry['score']:>8.2f}  {entry['speaker']}")
+    print(f"\n💾 Saved to {transcripts_dir / SPEAKER_INDEX_FILENAME}")
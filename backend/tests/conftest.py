@@ -0,0 +1,71 @@
+"""
+Shared fixtures for the backend tests
+
+Tests import the backend modules directly (they are flat in backend/) and
+build a TranscriptProcessor over a few small transcripts written to tmp_path.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from transcript_processor import TranscriptProcessor  # noqa: E402
+
+TRANSCRIPTS = {
+    "Ada Growth": (
+        "Ada Growth (00:00:00):\n"
+        "Retention is the foundation of growth. Without retention every acquisition channel leaks.\n"
+        "\n"
+        "Lenny (00:00:30):\n"
+        "How do you think about pricing experiments and retention curves together?\n"
+        "\n"
+        "Ada Growth (00:01:00):\n"
+        "Pricing experiments should run on new cohorts only, and retention curves tell you when to stop.\n"
+        "\n"
+        "Ada Growth (00:02:00):\n"
+        "-- ... -- ... -- ... -- ... -- ... -- ... -- ... -- ...\n"
+        "\n"
+        "Lenny (00:02:30):\n"
+        "?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?! ?!\n"
+    ),
+    "Ben Hiring": (
+        "Ben Hiring (00:00:00):\n"
+        "Hiring your first product manager is about judgment, not process. Look for people who ship.\n"
+        "\n"
+        "Lenny (00:00:40):\n"
+        "What about hiring engineers before you have product market fit?\n"
+        "\n"
+        "Ben Hiring (00:01:10):\n"
+        "Before product market fit, hire generalist engineers who talk to customers every week.\n"
+    ),
+    "Cy Leadership": (
+        "Cy Leadership (00:00:00):\n"
+        "Leadership means giving feedback early. Managers who wait for the performance review lose trust.\n"
+        "\n"
+        "Lenny (00:00:20):\n"
+        "How do you scale yourself as a founder while the team doubles?\n"
+        "\n"
+        "Cy Leadership (00:00:50):\n"
+        "Write things down, delegate decisions, and keep one weekly meeting for strategy and feedback.\n"
+    )
+}
+
+
+def write_transcripts(directory: Path, transcripts: dict = TRANSCRIPTS) -> Path:
+    """Write {episode_name: text} as .txt transcripts into directory"""
+    for episode_name, text in transcripts.items():
+        (directory / f"{episode_name}.txt").write_text(text, encoding="utf-8")
+    return directory
+
+
+@pytest.fixture
+def transcripts_dir(tmp_path: Path) -> Path:
+    return write_transcripts(tmp_path)
+
+
+@pytest.fixture
+def processor(transcripts_dir: Path) -> TranscriptProcessor:
+    return TranscriptProcessor(transcripts_dir, use_snapshot=False)
@@ -0,0 +1,150 @@
+"""Tests for /ask/stream: the SSE event sequence, cache replay, errors and coalescing"""
+
+import asyncio
+import json
+
+import pytest
+
+import main
+from cache_manager import CacheManager
+from llm_backend import LLMBackend
+from llm_scheduler import LLMScheduler
+from request_coalescer import RequestCoalescer
+from solution_generator import SolutionGenerator
+
+PROBLEM = "How do retention and hiring engineers fit together?"
+SPEAKERS = ["Ada Growth", "Ben Hiring"]
+
+
+class InsightBackend(LLMBackend):
+    """Answers each speaker's extraction with a quote naming them; held speakers wait for release"""
+
+    name = "insight"
+
+    def __init__(self, held=(), error: Exception = None):
+        super().__init__("test-model")
+        self.held = set(held)
+        self.error = error
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        speaker = next(name for name in SPEAKERS if f"EXCERPTS FROM {name}:" in prompt)
+        self.calls.append(speaker)
+        if speaker in self.held:
+            await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return json.dumps({"quote": f"{speaker} on retention", "framework1": "A", "framework2": "B"})
+
+
+@pytest.fixture
+def app_state(processor, tmp_path, monkeypatch):
+    """Point main's globals at the test corpus; returns a function installing a backend"""
+    monkeypatch.setitem(SolutionGenerator.PROBLEM_CATEGORIES, "scaling", SPEAKERS)
+    monkeypatch.setattr(main, "transcript_processor", processor)
+    monkeypatch.setattr(main, "cache_manager", CacheManager(tmp_path / "cache", compact_interval=None))
+    monkeypatch.setattr(main, "request_coalescer", RequestCoalescer())
+
+    def install(backend: LLMBackend) -> LLMBackend:
+        scheduler = LLMScheduler(backend, max_retries=0)
+        monkeypatch.setattr(main, "solution_generator", SolutionGenerator(processor, llm_scheduler=scheduler))
+        return backend
+
+    return install
+
+
+def query() -> main.ProblemQuery:
+    return main.ProblemQuery(problem=PROBLEM, num_solutions=2, problem_category="scaling")
+
+
+async def read_stream(on_event=None) -> list:
+    """[(event, data)] of one /ask/stream response; on_event(event, data) runs as each arrives"""
+    response = await main.ask_lenny_stream(query())
+    assert response.media_type == "text/event-stream"
+    events = []
+    async for chunk in response.body_iterator:
+        event, data = chunk.strip().split("\n")
+        event, data = event[len("event: "):], json.loads(data[len("data: "):])
+        events.append((event, data))
+        if on_event is not None:
+            on_event(event, data)
+    return events
+
+
+def speakers(events: list) -> list:
+    return sorted(data["speaker"] for event, data in events if event == "solution")
+
+
+def test_miss_streams_solutions_then_replays_from_the_cache(app_state):
+    backend = app_state(InsightBackend())
+
+    events = asyncio.run(read_stream())
+    assert [event for event, _ in events] == ["category", "solution", "solution", "summary"]
+    assert events[0][1] == {"problem": PROBLEM, "category": "scaling"}
+    assert speakers(events) == SPEAKERS
+    summary = events[-1][1]
+    assert summary["count"] == 2 and summary["cache"] is None
+
+    # Cached in speaker order, as /ask returns it
+    cached = main.cache_manager.get(PROBLEM, "scaling")
+    assert [solution["speaker"] for solution in cached["solutions"]] == SPEAKERS
+
+    replayed = asyncio.run(read_stream())
+    assert [event for event, _ in replayed] == ["category", "solution", "solution", "summary"]
+    assert replayed[-1][1]["cache"] == {"type": "exact"} and replayed[-1][1]["count"] == 2
+    assert len(backend.calls) == 2
+
+
+def test_failure_ends_the_stream_with_an_error_event(app_state):
+    error = RuntimeError("model down")
+    error.status_code = 400
+    app_state(InsightBackend(error=error))
+
+    events = asyncio.run(read_stream())
+    assert [event for event, _ in events] == ["category", "error"]
+    assert "failed" in events[-1][1]["detail"]
+    assert main.cache_manager.get(PROBLEM, "scaling") is None
+
+
+def test_concurrent_streams_and_ask_share_one_generation(app_state):
+    backend = app_state(InsightBackend(held=["Ben Hiring"]))
+
+    async def run():
+        first_solution = asyncio.Event()
+        leader = asyncio.create_task(read_stream(lambda event, data: event == "solution" and first_solution.set()))
+        await asyncio.wait_for(first_solution.wait(), 5)  # Ada's solution is out, Ben's is held
+
+        # Joiners replay Ada's solution and follow Ben's
+        followers = [asyncio.create_task(read_stream()) for _ in range(2)]
+        ask = asyncio.create_task(main.ask_lenny(query()))
+        await asyncio.sleep(0.01)
+        backend.release.set()
+        return await leader, await asyncio.gather(*followers), await ask
+
+    leader, followers, ask = asyncio.run(run())
+    assert sorted(backend.calls) == SPEAKERS  # one call per speaker for all four requests
+    for events in [leader, *followers]:
+        assert [event for event, _ in events] == ["category", "solution", "solution", "summary"]
+        assert speakers(events) == SPEAKERS
+    assert [solution["speaker"] for solution in ask["solutions"]] == SPEAKERS
+
+    stats = main.request_coalescer.get_stats()
+    assert stats["leaders"] == 1 and stats["coalesced"] == 3 and stats["in_flight"] == 0
+
+
+def test_stream_joins_an_ask_in_flight(app_state):
+    backend = app_state(InsightBackend(held=SPEAKERS))
+
+    async def run():
+        ask = asyncio.create_task(main.ask_lenny(query()))
+        await asyncio.sleep(0.01)
+        stream = asyncio.create_task(read_stream())
+        await asyncio.sleep(0.01)
+        backend.release.set()
+        return await ask, await stream
+
+    ask, events = asyncio.run(run())
+    assert len(backend.calls) == 2
+    assert [event for event, _ in events] == ["category", "solution", "solution", "summary"]
+    assert speakers(events) == SPEAKERS == [solution["speaker"] for solution in ask["solutions"]]
@@ -0,0 +1,43 @@
+"""Tests for the benchmark's statistics and result comparison"""
+
+import json
+
+from benchmark import compare, percentile
+
+
+def result(commit: str, p95: float, startup_s: float = 1.0) -> dict:
+    """A minimal results file with one /search scenario"""
+    latency = {"p50": p95 / 2, "p95": p95, "p99": p95 * 1.5}
+    return {
+        "meta": {"commit": commit, "corpus": "corpus", "workers": 1},
+        "scenarios": [{"scenario": "search", "concurrency": 4, "ok": 60, "latency_ms": latency, "throughput_rps": 100.0}],
+        "startup": {"parse": {"median_s": startup_s}}
+    }
+
+
+def write(path, data: dict) -> str:
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_percentile_is_nearest_rank():
+    ordered = [float(value) for value in range(1, 101)]
+    assert percentile(ordered, 50) == 50.0
+    assert percentile(ordered, 95) == 95.0
+    assert percentile(ordered, 100) == 100.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_fails_only_past_the_threshold(tmp_path, capsys):
+    before = write(tmp_path / "before.json", result("aaa", p95=100.0))
+    after = write(tmp_path / "after.json", result("bbb", p95=115.0, startup_s=0.5))
+
+    assert compare(before, after, fail_over=None) == 0
+    assert compare(before, after, fail_over=20) == 0
+    assert compare(before, after, fail_over=10) == 1
+
+    output = capsys.readouterr().out
+    assert "aaa → bbb" in output
+    assert "+15.0%" in output
+    assert "startup (parse): 0.50s (-50.0%)" in output
@@ -0,0 +1,163 @@
+"""Tests for CacheManager's memory tier and persistent-tier eviction"""
+
+import threading
+
+import pytest
+
+from cache_manager import CacheManager, MemoryTier
+
+
+def make_cache(tmp_path, backend="file", **kwargs) -> CacheManager:
+    return CacheManager(tmp_path / "cache", backend=backend, compact_interval=None, **kwargs)
+
+
+def test_memory_tier_evicts_least_recently_used_and_expires():
+    tier = MemoryTier(max_entries=2, max_bytes=100, ttl_seconds=60)
+    tier.put("a", {"v": "a"}, 10)
+    tier.put("b", {"v": "b"}, 10)
+    assert tier.get("a") == {"v": "a"}  # a is now most recent
+    tier.put("c", {"v": "c"}, 10)
+    assert tier.get("b") is None and tier.get("a") is not None and tier.get("c") is not None
+
+    tier.put("big", {}, 95)  # over the byte limit together with the others
+    assert tier.get_stats()["entries"] == 1 and tier.bytes == 95
+
+    expired = MemoryTier(ttl_seconds=-1)
+    expired.put("a", {}, 1)
+    assert expired.get("a") is None and expired.expirations == 1
+
+
+def test_memory_tier_stays_consistent_under_concurrent_access():
+    tier = MemoryTier(max_entries=50, max_bytes=400)
+
+    def churn(worker: int):
+        for i in range(2000):
+            key = f"k{(worker * 7 + i) % 80}"
+            if i % 5 == 0:
+                tier.discard(key)
+            elif i % 2:
+                tier.put(key, {"i": i}, 1 + i % 13)
+            else:
+                tier.get(key)
+
+    threads = [threading.Thread(target=churn, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tier.bytes == sum(size for _, size, _ in tier._entries.values()) <= 400
+    assert len(tier._entries) <= 50
+
+
+def test_hot_keys_are_served_without_touching_the_store(tmp_path):
+    cache = make_cache(tmp_path, memory_entries=2)
+    reads = []
+    store_get = cache.store.get
+    cache.store.get = lambda key: reads.append(key) or store_get(key)
+
+    cache.set("hot", "growth", {"answer": 1})
+    for _ in range(5):
+        assert cache.get("hot", "growth") == {"answer": 1}
+    assert reads == [] and cache.memory.hits == 5
+
+    # Pushed out of memory by newer entries, then read back from disk once
+    cache.set("warm", "growth", {"answer": 2})
+    cache.set("new", "growth", {"answer": 3})
+    assert cache.get("hot", "growth") == {"answer": 1} and cache.get("hot", "growth") == {"answer": 1}
+    assert len(reads) == 1
+    tiers = cache.get_stats()["tiers"]
+    assert tiers["disk"] == {"hits": 1, "misses": 0} and tiers["memory"]["evictions"] == 2
+
+
+@pytest.mark.parametrize("backend", ["file", "sqlite"])
+def test_set_get_across_tiers_and_restarts(tmp_path, backend):
+    cache = make_cache(tmp_path, backend)
+    cache.set("How do I grow?", "growth", {"solutions": [1, 2, 3]})
+    assert cache.get("how do i grow?", "growth") == {"solutions": [1, 2, 3]}  # keys ignore case
+    assert cache.get("How do I grow?", "pricing") is None
+
+    restarted = make_cache(tmp_path, backend)
+    assert restarted.get("How do I grow?", "growth") == {"solutions": [1, 2, 3]}
+    assert restarted.disk_hits == 1
+    assert restarted.get("How do I grow?", "growth") is not None
+    assert restarted.memory.hits == 1
+
+
+@pytest.mark.parametrize("backend", ["file", "sqlite"])
+def test_lru_eviction_drops_least_recently_used_down_to_the_low_watermark(tmp_path, backend):
+    cache = make_cache(tmp_path, backend, max_entries=10, eviction="lru")
+    for i in range(10):
+        cache.set(f"problem {i}", "growth", {"i": i})
+    for i in range(5):
+        assert cache.get(f"problem {i}", "growth") is not None  # 0-4 recently used
+
+    cache.set("problem 10", "growth", {"i": 10})  # 11 > 10 entries: evict down to 9
+    survivors = {i for i in range(11) if cache.get(f"problem {i}", "growth") is not None}
+    assert survivors == {0, 1, 2, 3, 4, 7, 8, 9, 10}
+    assert cache.evictions == 2
+    assert len(make_cache(tmp_path, backend).index) == 9  # deleted from the store too
+
+
+@pytest.mark.parametrize("backend", ["file", "sqlite"])
+def test_set_of_a_victim_during_compaction_is_not_lost(tmp_path, backend):
+    cache = make_cache(tmp_path, backend, max_entries=4, eviction="lru")
+    for i in range(4):
+        cache.set(f"problem {i}", "growth", {"i": i})
+    cache.max_entries = 3  # "problem 0" is the next victim
+    store_delete = cache.store.delete
+    rewrite = threading.Thread(target=cache.set, args=("problem 0", "growth", {"i": "new"}))
+
+    def delete_while_victim_is_rewritten(keys):
+        # Another request re-caches the victim while it is being evicted
+        rewrite.start()
+        rewrite.join(timeout=0.2)
+        store_delete(keys)
+
+    cache.store.delete = delete_while_victim_is_rewritten
+    assert cache.compact() >= 1
+    cache.store.delete = store_delete
+    rewrite.join()
+
+    assert cache.get("problem 0", "growth") == {"i": "new"}
+    assert set(cache._entries) == set(cache.store.index())
+
+
+def test_lfu_eviction_drops_fewest_hits(tmp_path):
+    cache = make_cache(tmp_path, max_entries=4, eviction="lfu")
+    for i in range(4):
+        cache.set(f"problem {i}", "growth", {"i": i})
+    for i, hits in enumerate([3, 0, 2, 1]):
+        for _ in range(hits):
+            cache.get(f"problem {i}", "growth")
+
+    cache.set("problem 4", "growth", {"i": 4})  # 5 > 4: evict down to 3
+    survivors = {i for i in range(5) if f"problem {i}" in {entry["problem"] for entry in cache.list_entries()["entries"]}}
+    assert survivors == {0, 2, 3}
+
+
+def test_byte_budget(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=1000)
+    for i in range(10):
+        cache.set(f"problem {i}", "growth", {"text": "x" * 180})
+    stats = cache.get_stats()["budget"]
+    assert stats["bytes"] <= 1000
+    assert stats["bytes"] == sum(entry["size"] for entry in cache.index.values())
+
+
+def test_semantic_lookup_matches_paraphrases_in_the_same_category(tmp_path):
+    cache = make_cache(tmp_path, similarity_threshold=0.5)
+    cache.set("How do I know if we have product-market fit?", "pmf", {"answer": 1})
+
+    solution, match = cache.lookup("How do we know we have product market fit", "pmf")
+    assert solution == {"answer": 1} and match["type"] == "semantic"
+    assert cache.lookup("How do we know we have product market fit", "pricing") == (None, None)
+
+
+def test_list_entries_pages_most_recent_first(tmp_path):
+    cache = make_cache(tmp_path)
+    for i in range(5):
+        cache.set(f"problem {i}", "growth", {"i": i})
+    page = cache.list_entries(offset=1, limit=2)
+    assert page["total"] == 5
+    assert [entry["problem"] for entry in page["entries"]] == ["problem 3", "problem 2"]
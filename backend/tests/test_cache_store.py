@@ -0,0 +1,158 @@
+"""Tests for the persistent cache stores"""
+
+import json
+
+import pytest
+
+from cache_store import CACHE_BACKENDS, FileCacheStore, SQLiteCacheStore, WriteBehindQueue
+
+
+def meta_for(problem: str, payload: str, timestamp: str = "2026-01-01T00:00:00") -> dict:
+    return {"problem": problem, "category": "growth", "timestamp": timestamp, "size": len(payload)}
+
+
+@pytest.fixture(params=sorted(CACHE_BACKENDS))
+def open_store(request, tmp_path):
+    stores = []
+
+    def open_store():
+        store = CACHE_BACKENDS[request.param](tmp_path / "cache")
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def test_round_trip_replace_and_delete(open_store):
+    store = open_store()
+    assert store.get("missing") is None
+
+    store.put("a", '{"v": 1}', meta_for("problem a", '{"v": 1}'))
+    store.put("b", '{"v": 2}', meta_for("problem b", '{"v": 2}'))
+    store.put("a", '{"v": 10}', meta_for("problem a", '{"v": 10}', "2026-01-02T00:00:00"))
+    assert json.loads(store.get("a")) == {"v": 10}
+    assert store.index()["a"] == meta_for("problem a", '{"v": 10}', "2026-01-02T00:00:00")
+
+    store.delete(["b", "never-stored"])
+    assert store.get("b") is None
+    assert set(store.index()) == {"a"}
+
+
+def test_reopen_sees_everything_written(open_store):
+    store = open_store()
+    for i in range(20):
+        payload = json.dumps({"i": i})
+        store.put(f"k{i}", payload, meta_for(f"problem {i}", payload))
+    store.delete([f"k{i}" for i in range(0, 20, 2)])
+    store.close()
+
+    reopened = open_store()
+    assert set(reopened.index()) == {f"k{i}" for i in range(1, 20, 2)}
+    assert json.loads(reopened.get("k7")) == {"i": 7}
+
+
+def test_compact_keeps_live_entries(open_store):
+    store = open_store()
+    for round_ in range(3):
+        for i in range(10):
+            payload = json.dumps({"i": i, "round": round_})
+            store.put(f"k{i}", payload, meta_for(f"problem {i}", payload))
+    store.delete(["k0", "k1"])
+    before = store.index()
+
+    store.compact()
+    assert store.index() == before
+    store.close()
+    assert open_store().index() == before
+
+
+def test_clear(open_store):
+    store = open_store()
+    store.put("a", "{}", meta_for("a", "{}"))
+    store.clear()
+    assert store.index() == {} and store.get("a") is None
+    store.close()
+    assert open_store().index() == {}
+
+
+def test_file_store_log_compaction_and_legacy_index(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    # An index.json from before the append-only log
+    (cache_dir / "legacy.json").write_text('{"old": true}')
+    (cache_dir / "index.json").write_text(json.dumps({"legacy": {"problem": "old", "category": "growth"}}))
+
+    store = FileCacheStore(cache_dir)
+    assert store.index()["legacy"]["size"] == len('{"old": true}')
+
+    for i in range(5):
+        store.put("k", json.dumps(i), meta_for("k", json.dumps(i)))
+    store.delete(["legacy"])
+    store.compact()
+
+    records = [json.loads(line) for line in store.log_file.read_text().splitlines()]
+    assert records == [dict(meta_for("k", "4"), key="k"), {"key": "legacy", "deleted": True}]
+    assert set(FileCacheStore(cache_dir).index()) == {"k"}  # the tombstone outlives index.json
+
+
+def test_sqlite_store_vacuums_only_when_pages_are_free(tmp_path):
+    store = SQLiteCacheStore(tmp_path)
+    payload = json.dumps({"text": "x" * 4000})
+    for i in range(50):
+        store.put(f"k{i}", payload, meta_for(f"problem {i}", payload))
+
+    store.compact()  # nothing deleted: no full rewrite
+    assert store.vacuums == 0
+
+    store.delete([f"k{i}" for i in range(5)])
+    store.compact()  # 10% free
+    assert store.vacuums == 0
+
+    store.delete([f"k{i}" for i in range(5, 40)])
+    size = store.db_file.stat().st_size
+    store.compact()
+    assert store.vacuums == 1 and store.db_file.stat().st_size < size / 2
+    assert set(store.index()) == {f"k{i}" for i in range(40, 50)}
+    store.close()
+
+
+def test_file_store_ignores_a_torn_final_line(tmp_path):
+    store = FileCacheStore(tmp_path)
+    store.put("a", "{}", meta_for("a", "{}"))
+    with open(store.log_file, "a") as f:
+        f.write('{"key": "b", "problem": "b", "categ')
+
+    assert set(FileCacheStore(tmp_path).index()) == {"a"}
+
+
+@pytest.mark.parametrize("track_changes", [False, True])
+def test_changes_are_only_queued_when_tracked(tmp_path, track_changes):
+    reader = FileCacheStore(tmp_path, track_changes=track_changes)
+    writer = FileCacheStore(tmp_path)
+    for i in range(20):
+        writer.put(f"k{i}", "{}", meta_for(f"k{i}", "{}"))
+    writer.delete(["k0"])
+    writer.compact()  # the reader reloads and diffs the replaced log
+
+    updated, removed = reader.changes()
+    assert len(reader.index()) == 19  # the index follows the log either way
+    if track_changes:
+        assert set(updated) == {f"k{i}" for i in range(1, 20)}
+    else:
+        assert (updated, removed) == ({}, set())
+        assert not reader._updated and not reader._removed
+
+
+def test_write_behind_serves_pending_writes_until_flushed(tmp_path):
+    store = FileCacheStore(tmp_path)
+    writer = WriteBehindQueue(store)
+    for i in range(50):
+        writer.put(f"k{i}", json.dumps(i), meta_for(f"k{i}", json.dumps(i)))
+        assert writer.pending(f"k{i}") is not None or store.get(f"k{i}") == json.dumps(i)
+
+    writer.flush()
+    assert writer.get_stats() == {"queued": 0, "written": 50, "failed": 0}
+    assert writer.pending("k0") is None
+    assert len(store.index()) == 50 and store.get("k49") == "49"
@@ -0,0 +1,110 @@
+"""Tests for CachedResponse: ETags, 304 revalidation and gzip"""
+
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi import Request
+
+import main
+from cached_response import GZIP_MIN_BYTES, CachedResponse, accepts_gzip, etag_matches
+from conftest import TRANSCRIPTS, write_transcripts
+from transcript_processor import TranscriptProcessor
+
+
+def get(headers: dict = None) -> Request:
+    """A GET request carrying headers"""
+    raw = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class Listing:
+    """render() counting its calls, over a list that can grow"""
+
+    def __init__(self, size: int):
+        self.items = [f"item {i}" for i in range(size)]
+        self.renders = 0
+        self.version = "v1"
+
+    def render(self) -> dict:
+        self.renders += 1
+        return {"items": self.items}
+
+
+def cached_listing(size: int):
+    listing = Listing(size)
+    return listing, CachedResponse(listing.render, version=lambda: listing.version)
+
+
+@pytest.mark.parametrize("header, accepted", [
+    ("gzip", True), ("deflate, gzip;q=0.5", True), ("*", True),
+    ("gzip;q=0", False), ("br", False), ("", False), ("gzip;q=x", False)
+])
+def test_accepts_gzip(header, accepted):
+    assert accepts_gzip(header) is accepted
+
+
+def test_etag_matches_either_representation():
+    assert etag_matches('"abc"', "abc") and etag_matches('W/"abc-gzip"', "abc")
+    assert etag_matches('"other", "abc"', "abc") and etag_matches("*", "abc")
+    assert not etag_matches('"abcd"', "abc") and not etag_matches(None, "abc")
+
+
+def test_small_body_is_rendered_once_and_revalidates_with_304():
+    listing, cached = cached_listing(3)
+
+    first = cached.respond(get({"Accept-Encoding": "gzip"}))
+    assert first.status_code == 200 and json.loads(first.body) == {"items": listing.items}
+    assert "content-encoding" not in first.headers  # under GZIP_MIN_BYTES
+    assert first.headers["vary"] == "Accept-Encoding" and first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+    assert etag.startswith('"v1-')
+
+    revalidated = cached.respond(get({"If-None-Match": etag}))
+    assert revalidated.status_code == 304 and revalidated.body == b"" and revalidated.headers["etag"] == etag
+    assert listing.renders == 1
+
+    # A new version re-renders and changes the tag, so the old one no longer matches
+    listing.version = "v2"
+    listing.items.append("item 3")
+    changed = cached.respond(get({"If-None-Match": etag}))
+    assert changed.status_code == 200 and len(json.loads(changed.body)["items"]) == 4
+    assert changed.headers["etag"] != etag and listing.renders == 2
+
+
+def test_large_body_is_gzipped_once_with_its_own_tag():
+    listing, cached = cached_listing(200)
+
+    plain = cached.respond(get({"Accept-Encoding": "identity"}))
+    assert len(plain.body) >= GZIP_MIN_BYTES and "content-encoding" not in plain.headers
+
+    zipped = cached.respond(get({"Accept-Encoding": "gzip"}))
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert gzip.decompress(zipped.body) == plain.body and len(zipped.body) < len(plain.body)
+
+    # Either tag revalidates either representation
+    revalidated = cached.respond(get({"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]}))
+    assert revalidated.status_code == 304 and revalidated.headers["etag"].endswith('-gzip"')
+    assert listing.renders == 1
+
+
+def test_speakers_endpoint_follows_the_corpus_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "transcript_processor", TranscriptProcessor(write_transcripts(tmp_path), use_snapshot=False))
+    monkeypatch.setattr(main, "speakers_response", CachedResponse(
+        main._speakers_body, version=lambda: main.transcript_processor.corpus_version
+    ))
+
+    first = asyncio.run(main.get_speakers(get()))
+    speakers = json.loads(first.body)
+    assert speakers["speakers"] == main.transcript_processor.get_all_speakers()
+    assert asyncio.run(main.get_speakers(get({"If-None-Match": first.headers["etag"]}))).status_code == 304
+
+    # A reloaded corpus with another speaker is a new version
+    write_transcripts(tmp_path, {"Di Pricing": TRANSCRIPTS["Ada Growth"].replace("Ada Growth", "Di Pricing")})
+    monkeypatch.setattr(main, "transcript_processor", TranscriptProcessor(tmp_path, use_snapshot=False))
+    changed = asyncio.run(main.get_speakers(get({"If-None-Match": first.headers["etag"]})))
+    assert changed.status_code == 200
+    assert json.loads(changed.body)["count"] == speakers["count"] + 1
+    assert "Di Pricing" in json.loads(changed.body)["speakers"]
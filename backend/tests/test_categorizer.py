@@ -0,0 +1,62 @@
+"""Tests for SolutionGenerator's compiled keyword categorizer"""
+
+import pytest
+
+from solution_generator import SolutionGenerator
+
+
+@pytest.fixture
+def generator(processor) -> SolutionGenerator:
+    return SolutionGenerator(processor, demo_mode=True)
+
+
+@pytest.mark.parametrize("problem, category", [
+    ("How should we prioritize the roadmap?", "prioritization"),  # "prioriti" matches as a prefix
+    ("Planning our Go-To-Market launch", "go-to-market"),  # punctuation and case are ignored
+    ("Our HIRING bar keeps slipping", "building-teams"),
+    ("Burnout and stress on the team", "team-burnout"),
+    ("Pricing and product market fit", "product-market-fit"),  # phrases weigh one per word
+])
+def test_categorize_problem(generator, problem, category):
+    assert generator.categorize_problem(problem) == category
+
+
+def test_rank_categories_scores_and_orders(generator):
+    ranked = generator.rank_categories("Burnout and stress on the team")
+    assert ranked == [
+        {"category": "team-burnout", "confidence": 0.833, "keywords": ["burnout", "stress", "team"]},
+        {"category": "product-eng-conflict", "confidence": 0.167, "keywords": ["team"]}
+    ]
+
+
+def test_shared_keyword_is_split_and_ties_keep_table_order(generator):
+    # "team" is listed under two categories: half a point each, table order breaks the tie
+    ranked = generator.rank_categories("team")
+    assert [(item["category"], item["confidence"]) for item in ranked] == [
+        ("product-eng-conflict", 0.5), ("team-burnout", 0.5)
+    ]
+
+
+def test_no_match_falls_back_to_default(generator):
+    # Keywords only match at word starts: "fit" is not found in "benefits"
+    assert generator.rank_categories("What are the benefits?") == [
+        {"category": SolutionGenerator.DEFAULT_CATEGORY, "confidence": 0.0, "keywords": []}
+    ]
+
+
+def test_confidences_sum_to_one(generator):
+    for problem in SolutionGenerator.POPULAR_PROBLEMS:
+        ranked = generator.rank_categories(problem)
+        assert ranked[0]["category"] == generator.categorize_problem(problem)
+        if ranked[0]["confidence"]:
+            assert sum(item["confidence"] for item in ranked) == pytest.approx(1.0, abs=0.01)
+
+
+def test_longest_keyword_wins_at_a_position():
+    pattern, scores = SolutionGenerator._compile_categorizer({
+        "short": ["go"],
+        "long": ["Go-to-market", "go"]
+    })
+    assert [match.group() for match in pattern.finditer("go to market or go")] == ["go to market", "go"]
+    assert scores["go to market"] == [("long", 3.0)]
+    assert scores["go"] == [("short", 0.5), ("long", 0.5)]
@@ -0,0 +1,140 @@
+"""Tests for the corpus snapshot and incremental reloads"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from conftest import TRANSCRIPTS, write_transcripts
+from corpus_snapshot import SNAPSHOT_FILENAME, read_snapshot, write_snapshot
+from transcript_processor import TranscriptProcessor, compare_ingestion
+from utterance_store import UtteranceTable, parse_utterances
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    arrays = {"a": np.arange(5, dtype=np.int64), "b": np.array([1.5, 2.5], dtype=np.float32), "c": np.empty(0)}
+    write_snapshot(path, {"files": {"x": 1}}, dict(arrays))
+
+    header, loaded = read_snapshot(path)
+    assert header == {"files": {"x": 1}}
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+
+
+def test_unusable_snapshots_are_ignored(tmp_path):
+    assert read_snapshot(tmp_path / "missing.bin") is None
+
+    path = tmp_path / "snapshot.bin"
+    write_snapshot(path, {}, {"a": np.arange(3)})
+    data = bytearray(path.read_bytes())
+    data[8] += 1  # format version
+    path.write_bytes(bytes(data))
+    assert read_snapshot(path) is None
+
+
+def test_concurrent_writers_publish_a_complete_snapshot(tmp_path):
+    path = tmp_path / "snapshot.bin"
+
+    def write(writer: int) -> None:
+        for _ in range(10):
+            write_snapshot(path, {"writer": writer}, {"a": np.full(50000, writer, dtype=np.int64)})
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(write, range(6)))
+
+    header, arrays = read_snapshot(path)
+    assert (arrays["a"] == header["writer"]).all()
+    assert [p.name for p in tmp_path.iterdir()] == ["snapshot.bin"]
+
+
+def episode_rows(table: UtteranceTable) -> dict:
+    """{episode: [(speaker, start, first line, line count, header kind)]} independent of row order and interning"""
+    rows = {}
+    for episode_name in table.episode_names:
+        start, end = table.episode_rows(episode_name)
+        rows[episode_name] = [
+            (table.speaker_of(row), int(table.start_seconds[row]), int(table.first_lines[row]),
+             int(table.line_counts[row]), int(table.header_kinds[row]))
+            for row in range(start, end)
+        ]
+    return rows
+
+
+def test_utterance_table_updated_matches_a_fresh_build():
+    table = UtteranceTable.build((name, parse_utterances(text)) for name, text in TRANSCRIPTS.items())
+    changed = {"Ben Hiring": "Ben Hiring (00:00:05):\nOnly one turn now.\n", "Dee New": "Dee New (00:01:00):\nHello.\n"}
+    updated = table.updated(
+        removed=["Cy Leadership"],
+        added=UtteranceTable.build((name, parse_utterances(text)) for name, text in changed.items())
+    )
+
+    expected = UtteranceTable.build(
+        (name, parse_utterances(text))
+        for name, text in {"Ada Growth": TRANSCRIPTS["Ada Growth"], **changed}.items()
+    )
+    assert updated.episode_names == expected.episode_names
+    assert episode_rows(updated) == episode_rows(expected)
+
+
+def processor_state(processor: TranscriptProcessor) -> dict:
+    """What a load produces, keyed by episode so document order does not matter"""
+    index = processor.search_index
+    return {
+        "docs": {
+            name: (int(index.doc_lengths[doc_id]), index.line_count(doc_id))
+            for name, doc_id in index.doc_ids.items()
+        },
+        "rank": {
+            query: sorted((index.doc_names[doc_id], round(score, 9)) for doc_id, score in index.rank(query.split()))
+            for query in ("retention", "hiring engineers", "feedback", "onboarding")
+        },
+        "utterances": episode_rows(processor.utterances),
+        "speakers": sorted(processor.speakers),
+        "stats": processor.corpus_stats.summary(),
+        "distribution": processor.corpus_stats.distribution()
+    }
+
+
+def test_warm_reload_after_changes_matches_a_cold_load(transcripts_dir):
+    TranscriptProcessor(transcripts_dir)  # writes the snapshot
+
+    (transcripts_dir / "Ben Hiring.txt").write_text(
+        "Ben Hiring (00:00:00):\nHiring is about onboarding well and keeping retention high.\n"
+    )
+    (transcripts_dir / "Cy Leadership.txt").unlink()
+    write_transcripts(transcripts_dir, {"Dee Onboarding": "Dee Onboarding (00:00:00):\nOnboarding is the product.\n"})
+
+    warm = TranscriptProcessor(transcripts_dir)
+    cold = TranscriptProcessor(transcripts_dir, use_snapshot=False)
+    assert processor_state(warm) == processor_state(cold)
+    assert warm.corpus_version == cold.corpus_version
+
+
+def test_unchanged_reload_reuses_the_snapshot(transcripts_dir):
+    first = TranscriptProcessor(transcripts_dir)
+    snapshot = transcripts_dir / SNAPSHOT_FILENAME
+    written = snapshot.stat().st_mtime_ns
+
+    second = TranscriptProcessor(transcripts_dir)
+    assert snapshot.stat().st_mtime_ns == written
+    assert processor_state(second) == processor_state(first)
+
+
+def test_parallel_load_matches_a_serial_load(transcripts_dir):
+    serial = TranscriptProcessor(transcripts_dir, use_snapshot=False)
+    parallel = TranscriptProcessor(transcripts_dir, use_snapshot=False, workers=2)
+
+    assert processor_state(parallel) == processor_state(serial)
+    assert parallel.get_transcript_names() == serial.get_transcript_names()
+    assert parallel.search_transcripts("retention") == serial.search_transcripts("retention")
+
+
+def test_compare_ingestion_reports_both_modes(transcripts_dir):
+    report = compare_ingestion(transcripts_dir, workers=2)
+
+    assert report["serial"]["workers"] == 1
+    assert report["parallel"]["workers"] == 2
+    for timings in (report["serial"], report["parallel"]):
+        assert set(timings) >= {"read", "parse", "index", "total"}
+    assert report["speedup"] > 0
@@ -0,0 +1,74 @@
+"""Tests for CorpusStats running aggregates and their upkeep across reloads"""
+
+import asyncio
+
+import main
+from conftest import TRANSCRIPTS, write_transcripts
+from corpus_stats import CorpusStats
+from transcript_processor import TranscriptProcessor
+
+
+def state(stats: CorpusStats) -> dict:
+    return {
+        "summary": stats.summary(),
+        "distribution": stats.distribution(),
+        "top_speakers": stats.top_speakers(),
+        "speaker_tokens": stats.speaker_tokens
+    }
+
+
+def test_updates_match_a_fresh_build():
+    stats = CorpusStats()
+    for i in range(10):
+        stats.add(f"episode {i}", 100 * (i + 1), 20 * (i + 1), f"speaker {i % 3}")
+    stats.add("episode 9", 50, 10, "speaker 0")  # changed: replaces its figures
+    stats.remove("episode 4")
+    stats.remove("never added")
+
+    figures = {f"episode {i}": [100 * (i + 1), 20 * (i + 1), f"speaker {i % 3}"] for i in range(9) if i != 4}
+    figures["episode 9"] = [50, 10, "speaker 0"]
+    assert state(stats) == state(CorpusStats.from_figures(figures))
+    assert stats.to_figures() == figures
+
+    assert stats.largest_episode == "episode 8" and len(stats) == 9
+    assert stats.distribution()["characters"]["min"] == 50
+    assert stats.distribution()["characters"]["p50"] == 400  # nearest rank: 5th of 9 sizes
+    assert stats.top_speakers(1) == [{"speaker": "speaker 2", "tokens": 20 * (3 + 6 + 9)}]
+
+
+def test_removing_a_speakers_last_episode_drops_the_speaker():
+    stats = CorpusStats()
+    stats.add("a", 10, 2, "Ada")
+    stats.add("b", 30, 6, "Ben")
+    stats.remove("b")
+    assert stats.speaker_tokens == {"Ada": 2} and stats.largest_episode == "a"
+
+    stats.remove("a")
+    assert stats.summary()["largest_episode"] is None and stats.summary()["average_transcript_length"] == 0
+    assert stats.distribution() == {"characters": {}, "tokens": {}}
+
+
+def test_incremental_reload_counts_only_changed_episodes(transcripts_dir, monkeypatch):
+    TranscriptProcessor(transcripts_dir)  # writes the snapshot
+
+    longer = TRANSCRIPTS["Ben Hiring"] + "Ben Hiring (00:02:00):\n" + "Hire for slope over intercept. " * 40 + "\n"
+    (transcripts_dir / "Ben Hiring.txt").write_text(longer, encoding="utf-8")
+    (transcripts_dir / "Cy Leadership.txt").unlink()
+    write_transcripts(transcripts_dir, {"Dee Onboarding": "Dee Onboarding (00:00:00):\nOnboarding is the product.\n"})
+
+    added = []
+    add = CorpusStats.add
+    monkeypatch.setattr(CorpusStats, "add", lambda self, name, *figures: added.append(name) or add(self, name, *figures))
+    warm = TranscriptProcessor(transcripts_dir)
+    assert sorted(added) == ["Ben Hiring", "Dee Onboarding"]
+
+    cold = TranscriptProcessor(transcripts_dir, use_snapshot=False)
+    assert state(warm.corpus_stats) == state(cold.corpus_stats)
+    assert warm.corpus_stats.largest_episode == "Ben Hiring"
+    assert "Cy Leadership" not in warm.corpus_stats.speaker_tokens
+
+    monkeypatch.setattr(main, "transcript_processor", warm)
+    stats = asyncio.run(main.get_transcript_stats(top=2))
+    assert stats["total_transcripts"] == 3 and stats["largest_episode"] == "Ben Hiring"
+    assert stats["total_characters"] == sum(len(path.read_text()) for path in transcripts_dir.glob("*.txt"))
+    assert [entry["speaker"] for entry in stats["top_speakers"]] == ["Ben Hiring", "Ada Growth"]
@@ -0,0 +1,115 @@
+"""Tests for the sharded static data export, incremental builds and --adopt"""
+
+import gzip
+import json
+
+import pytest
+
+import generate_static_data
+from generate_static_data import StaticDataGenerator, shard_id
+from solution_generator import SolutionGenerator
+
+PROBLEMS = ["How do I improve retention and pricing?", "How do I hire engineers?"]
+
+
+@pytest.fixture(autouse=True)
+def small_problem_set(monkeypatch):
+    # Every category draws on the test corpus speakers
+    categories = {category: ["Ada Growth", "Ben Hiring", "Cy Leadership"] for category in SolutionGenerator.PROBLEM_CATEGORIES}
+    monkeypatch.setattr(SolutionGenerator, "PROBLEM_CATEGORIES", categories)
+    monkeypatch.setattr(SolutionGenerator, "POPULAR_PROBLEMS", PROBLEMS)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")  # real-mode generators build a client, never call it
+
+
+def build(transcripts_dir, output_dir, demo_mode=True, **kwargs) -> StaticDataGenerator:
+    generator = StaticDataGenerator(transcripts_dir, demo_mode=demo_mode, output_dir=output_dir, use_speaker_index=False)
+    assert generator.run(**kwargs)
+    return generator
+
+
+def manifest_entries(output_dir) -> dict:
+    return json.loads((output_dir / "build-manifest.json").read_text())["entries"]
+
+
+def test_index_points_at_one_precompressed_shard_per_problem(transcripts_dir, tmp_path):
+    output_dir = tmp_path / "data"
+    build(transcripts_dir, output_dir)
+
+    index = json.loads((output_dir / "index.json").read_text())
+    assert "responses" not in index and index["popular_problems"] == PROBLEMS
+    assert index["problems"] == {problem.lower(): shard_id(problem.lower()) for problem in PROBLEMS}
+    for problem_key, shard in index["problems"].items():
+        path = output_dir / "responses" / f"{shard}.json"
+        payload = path.read_bytes()
+        assert json.loads(payload)["problem"].lower() == problem_key
+        assert gzip.decompress((output_dir / "responses" / f"{shard}.json.gz").read_bytes()) == payload
+        if generate_static_data.brotli is not None:
+            br_path = output_dir / "responses" / f"{shard}.json.br"
+            assert generate_static_data.brotli.decompress(br_path.read_bytes()) == payload
+    assert gzip.decompress((output_dir / "index.json.gz").read_bytes()) == (output_dir / "index.json").read_bytes()
+
+
+def test_dropped_problems_lose_their_shards(transcripts_dir, tmp_path, monkeypatch):
+    output_dir = tmp_path / "data"
+    build(transcripts_dir, output_dir)
+
+    monkeypatch.setattr(SolutionGenerator, "POPULAR_PROBLEMS", PROBLEMS[:1])
+    build(transcripts_dir, output_dir)
+    suffixes = ("", ".br", ".gz") if generate_static_data.brotli is not None else ("", ".gz")
+    assert sorted(path.name for path in (output_dir / "responses").iterdir()) == [
+        f"{shard_id(PROBLEMS[0].lower())}.json{suffix}" for suffix in suffixes
+    ]
+
+
+def test_without_brotli_rewritten_files_drop_their_stale_br(transcripts_dir, tmp_path, monkeypatch):
+    output_dir = tmp_path / "data"
+    build(transcripts_dir, output_dir)
+    monkeypatch.setattr(generate_static_data, "brotli", None)
+
+    build(transcripts_dir, output_dir, force=True)
+    assert not (output_dir / "index.json.br").exists()  # regenerated answers change the timestamp
+    assert (output_dir / "index.json.gz").exists()
+
+
+def test_unchanged_build_reuses_every_answer(transcripts_dir, tmp_path):
+    output_dir = tmp_path / "data"
+    build(transcripts_dir, output_dir)
+    shards = {path.name: path.stat().st_mtime_ns for path in (output_dir / "responses").iterdir()}
+    assert len(manifest_entries(output_dir)) == len(PROBLEMS)
+
+    generator = build(transcripts_dir, output_dir)
+    assert generator.manifest["entries"] == manifest_entries(output_dir)
+    assert {path.name: path.stat().st_mtime_ns for path in (output_dir / "responses").iterdir()} == shards
+
+
+def test_adopt_records_answers_built_in_the_same_mode(transcripts_dir, tmp_path):
+    output_dir = tmp_path / "data"
+    build(transcripts_dir, output_dir)
+    entries = manifest_entries(output_dir)
+    (output_dir / "build-manifest.json").unlink()
+
+    build(transcripts_dir, output_dir, adopt=True)
+    assert manifest_entries(output_dir) == entries
+
+
+def test_adopt_skips_demo_answers_in_a_real_build(transcripts_dir, tmp_path):
+    output_dir = tmp_path / "data"
+    build(transcripts_dir, output_dir)
+    index = (output_dir / "index.json").read_bytes()
+    (output_dir / "build-manifest.json").unlink()
+
+    # Demo answers are kept but not recorded, so the next real build regenerates them
+    build(transcripts_dir, output_dir, demo_mode=False, adopt=True)
+    assert manifest_entries(output_dir) == {}
+    assert (output_dir / "index.json").read_bytes() == index
+
+
+def test_adopt_skips_answers_from_other_speakers(transcripts_dir, tmp_path, monkeypatch):
+    output_dir = tmp_path / "data"
+    build(transcripts_dir, output_dir)
+    (output_dir / "build-manifest.json").unlink()
+
+    categories = {category: ["Cy Leadership"] for category in SolutionGenerator.PROBLEM_CATEGORIES}
+    monkeypatch.setattr(SolutionGenerator, "PROBLEM_CATEGORIES", categories)
+    build(transcripts_dir, output_dir, adopt=True)
+    assert manifest_entries(output_dir) == {}
@@ -0,0 +1,102 @@
+"""Tests for the record/replay backend and the local stub server"""
+
+import asyncio
+import json
+
+import pytest
+
+from llm_backend import LLMBackend, RecordReplayBackend, ReplayedError, create_backend
+from llm_scheduler import LLMScheduler
+from llm_stub_server import StubConfig, start_stub_server
+from solution_generator import SolutionGenerator
+
+
+class EchoBackend(LLMBackend):
+    """Echoes prompts; prompts starting with "fail" raise"""
+
+    name = "echo"
+
+    def __init__(self):
+        super().__init__("test-model")
+        self.calls = 0
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        self.calls += 1
+        if prompt.startswith("fail"):
+            raise RuntimeError("model down")
+        return f"echo:{prompt}:{max_tokens}"
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        return self.complete(prompt, max_tokens)
+
+
+@pytest.fixture
+def stub_url():
+    server = start_stub_server(0, StubConfig(latency_ms=1, latency_sigma=0.0, seed=1))
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_replay_returns_what_was_recorded(tmp_path):
+    inner = EchoBackend()
+    recorder = RecordReplayBackend("test-model", tmp_path, mode="record", inner=inner)
+    assert recorder.complete("hello", 10) == "echo:hello:10"
+    assert asyncio.run(recorder.acomplete("hello", 20)) == "echo:hello:20"  # max_tokens is part of the key
+    with pytest.raises(RuntimeError):
+        recorder.complete("fail please", 10)
+    assert recorder.get_stats()["recorded"] == 3 and len(list(tmp_path.glob("*.json"))) == 3
+
+    replayer = RecordReplayBackend("test-model", tmp_path, mode="replay")
+    assert replayer.complete("hello", 10) == "echo:hello:10"
+    assert asyncio.run(replayer.acomplete("hello", 20)) == "echo:hello:20"
+    with pytest.raises(ReplayedError, match="RuntimeError: model down"):
+        replayer.complete("fail please", 10)
+    with pytest.raises(LookupError):
+        replayer.complete("never recorded", 10)
+    assert inner.calls == 3
+    assert replayer.get_stats()["replayed"] == 3 and replayer.get_stats()["missing"] == 1
+
+    # Another model never matches these recordings
+    with pytest.raises(LookupError):
+        RecordReplayBackend("other-model", tmp_path, mode="replay").complete("hello", 10)
+
+
+def test_invalid_modes_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        RecordReplayBackend("test-model", tmp_path, mode="rewind")
+    with pytest.raises(ValueError):
+        RecordReplayBackend("test-model", tmp_path, mode="record")
+    with pytest.raises(ValueError):
+        create_backend("carrier-pigeon", "test-model")
+
+
+def test_stub_errors_reach_the_client_with_their_status(stub_url):
+    backend = create_backend("stub", "test-model", base_url=stub_url)
+    assert json.loads(backend.complete("no excerpts here", 10)) == {"quote": None}
+
+    overloaded = start_stub_server(0, StubConfig(latency_ms=1, latency_sigma=0.0, overload_rate=1.0))
+    try:
+        backend = create_backend("stub", "test-model", base_url=f"http://127.0.0.1:{overloaded.server_address[1]}")
+        with pytest.raises(Exception) as raised:
+            backend.complete("anything", 10)
+        assert raised.value.status_code == 529
+    finally:
+        overloaded.shutdown()
+        overloaded.server_close()
+
+
+def test_ask_path_replays_a_stub_recording_offline(processor, stub_url, tmp_path, monkeypatch):
+    monkeypatch.setitem(SolutionGenerator.PROBLEM_CATEGORIES, "scaling", ["Ada Growth", "Ben Hiring"])
+    problem = "How do retention and hiring engineers fit together?"
+
+    def generate(backend: LLMBackend) -> dict:
+        generator = SolutionGenerator(processor, llm_scheduler=LLMScheduler(backend, max_retries=0))
+        return generator.generate_solutions(problem, num_solutions=2, category="scaling")
+
+    recorded = generate(create_backend("record", SolutionGenerator.MODEL, base_url=stub_url, recordings_dir=tmp_path))
+    assert [solution["speaker"] for solution in recorded["solutions"]] == ["Ada Growth", "Ben Hiring"]
+    assert all(solution["insight"] for solution in recorded["solutions"])
+
+    replayed = generate(create_backend("replay", SolutionGenerator.MODEL, recordings_dir=tmp_path))
+    assert replayed == recorded
@@ -0,0 +1,162 @@
+"""Tests for LLMScheduler's priority queue and retries, and LLMUnavailableError"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_backend import LLMBackend
+from llm_scheduler import LLMScheduler, LLMUnavailableError
+from solution_generator import SolutionGenerator
+
+
+class StatusError(Exception):
+    """Stand-in for an API error: status_code and optional response headers"""
+
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class ScriptedBackend(LLMBackend):
+    """Raises or returns the scripted outcomes in order, then keeps returning "ok" """
+
+    name = "scripted"
+
+    def __init__(self, outcomes=()):
+        super().__init__("test-model")
+        self.outcomes = list(outcomes)
+        self.prompts = []
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        self.prompts.append(prompt)
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        return self.complete(prompt, max_tokens)
+
+
+class GatedBackend(LLMBackend):
+    """Records call order; the first call blocks until released"""
+
+    name = "gated"
+
+    def __init__(self):
+        super().__init__("test-model")
+        self.order = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        self.order.append(prompt)
+        if len(self.order) == 1:
+            self.started.set()
+            await self.release.wait()
+        return prompt
+
+
+def test_queued_calls_start_in_priority_order():
+    async def run():
+        backend = GatedBackend()
+        scheduler = LLMScheduler(backend, max_concurrency=1)
+        first = asyncio.create_task(scheduler.acomplete("first", 10, "background"))
+        await backend.started.wait()
+
+        # Queued behind the running call, lowest priority first
+        queued = [
+            asyncio.create_task(scheduler.acomplete(prompt, 10, priority))
+            for prompt, priority in [("background", "background"), ("batch", "batch"), ("interactive", "interactive")]
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.get_stats()["queued"] == {"interactive": 1, "batch": 1, "background": 1}
+
+        backend.release.set()
+        await asyncio.gather(first, *queued)
+        return backend.order, scheduler.get_stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["first", "interactive", "batch", "background"]
+    assert stats["completed"] == 4 and stats["queue_depth"] == 0 and stats["in_flight"] == 0
+
+
+def test_unknown_priority_is_rejected():
+    scheduler = LLMScheduler(ScriptedBackend())
+    with pytest.raises(ValueError):
+        scheduler.complete("prompt", 10, priority="urgent")
+
+
+@pytest.mark.parametrize("error", [StatusError(429), StatusError(500), StatusError(529)])
+def test_retryable_errors_are_retried(error):
+    for call in ("complete", "acomplete"):
+        backend = ScriptedBackend([error, "answer"])
+        scheduler = LLMScheduler(backend, base_delay=0.0)
+
+        result = getattr(scheduler, call)("prompt", 10)
+        assert (asyncio.run(result) if call == "acomplete" else result) == "answer"
+        assert len(backend.prompts) == 2 and scheduler.retries == 1 and scheduler.failed == 0
+        assert scheduler.rate_limited == (1 if error.status_code == 429 else 0)
+
+
+def test_client_errors_are_not_retried():
+    backend = ScriptedBackend([StatusError(400)])
+    scheduler = LLMScheduler(backend, base_delay=0.0)
+
+    with pytest.raises(StatusError):
+        scheduler.complete("prompt", 10)
+    assert len(backend.prompts) == 1 and scheduler.retries == 0 and scheduler.failed == 1
+
+
+def test_retries_give_up_after_max_retries():
+    backend = ScriptedBackend([StatusError(503)] * 5)
+    scheduler = LLMScheduler(backend, max_retries=2, base_delay=0.0)
+
+    with pytest.raises(StatusError):
+        asyncio.run(scheduler.acomplete("prompt", 10))
+    assert len(backend.prompts) == 3 and scheduler.retries == 2 and scheduler.failed == 1
+
+
+def test_rate_limit_retry_after_pauses_the_queue():
+    backend = ScriptedBackend([StatusError(429, {"retry-after": "0.2"})])
+    scheduler = LLMScheduler(backend, base_delay=0.0)
+
+    started = time.monotonic()
+    assert scheduler.complete("prompt", 10) == "ok"
+    assert time.monotonic() - started >= 0.2
+    assert scheduler.rate_limited == 1
+    assert LLMScheduler._retry_after(StatusError(429, {"retry-after": "soon"})) is None
+
+
+def make_generator(processor, monkeypatch, backend: LLMBackend) -> SolutionGenerator:
+    # Point a category at the test corpus speakers
+    monkeypatch.setitem(SolutionGenerator.PROBLEM_CATEGORIES, "scaling", ["Ada Growth", "Ben Hiring"])
+    scheduler = LLMScheduler(backend, max_retries=0)
+    return SolutionGenerator(processor, llm_scheduler=scheduler)
+
+
+PROBLEM = "How do retention and hiring engineers fit together?"
+
+
+def test_all_extractions_failing_raises_llm_unavailable(processor, monkeypatch):
+    generator = make_generator(processor, monkeypatch, ScriptedBackend([StatusError(503)] * 4))
+
+    with pytest.raises(LLMUnavailableError):
+        generator.generate_solutions(PROBLEM, num_solutions=2, category="scaling")
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(generator.generate_solutions_async(PROBLEM, num_solutions=2, category="scaling"))
+
+
+def test_partial_failure_still_answers(processor, monkeypatch):
+    insight = '{"quote": "Keep cohorts separate", "framework1": "Cohorts", "framework2": "Retention", "timestamp": "00:01:00"}'
+    generator = make_generator(processor, monkeypatch, ScriptedBackend([StatusError(503), insight]))
+
+    result = generator.generate_solutions(PROBLEM, num_solutions=2, category="scaling")
+    assert [solution["speaker"] for solution in result["solutions"]] == ["Ben Hiring"]
+
+    # No insight found is an answer, not an outage
+    generator = make_generator(processor, monkeypatch, ScriptedBackend(['{"quote": null}'] * 2))
+    assert generator.generate_solutions(PROBLEM, num_solutions=2, category="scaling")["solutions"] == []
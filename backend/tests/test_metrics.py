@@ -0,0 +1,101 @@
+"""Tests for the metrics registry, its text format and the /ask stage spans"""
+
+import asyncio
+import json
+
+import pytest
+
+import main
+from cache_manager import CacheManager
+from llm_backend import LLMBackend
+from llm_scheduler import LLMScheduler
+from metrics import CACHE_LOOKUPS, LLM_CALLS, STAGE_SECONDS, MetricsRegistry
+from request_coalescer import RequestCoalescer
+from solution_generator import SolutionGenerator
+
+
+def test_render_counters_gauges_and_cumulative_buckets():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    requests.inc(route="/ask")
+    requests.inc(2, route="/ask")
+    registry.gauge("queue", "Queued calls", ["priority"]).set_function(lambda: {"batch": 2, "interactive": 1})
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value)
+
+    assert registry.render().split("\n") == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/ask"} 3',
+        "# HELP queue Queued calls",
+        "# TYPE queue gauge",
+        'queue{priority="batch"} 2',
+        'queue{priority="interactive"} 1',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 4.25",
+        "latency_seconds_count 4",
+        ""
+    ]
+
+
+def test_registration_and_labels_are_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls", ["outcome"])
+    assert registry.counter("calls_total", "Calls", ["outcome"]) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "Calls", ["outcome"])
+    with pytest.raises(ValueError):
+        counter.inc(result="ok")
+
+    # A failing gauge function drops its samples instead of failing the scrape
+    registry.gauge("broken", "Broken").set_function(lambda: 1 / 0)
+    assert "# TYPE broken gauge\n" in registry.render()
+
+
+class QuoteBackend(LLMBackend):
+    name = "quote"
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        return json.dumps({"quote": "Ship weekly", "framework1": "A", "framework2": "B"})
+
+
+def test_ask_records_each_stage_and_metrics_reads_live_gauges(processor, tmp_path, monkeypatch):
+    monkeypatch.setitem(SolutionGenerator.PROBLEM_CATEGORIES, "scaling", ["Ada Growth", "Ben Hiring"])
+    scheduler = LLMScheduler(QuoteBackend("test-model"), max_retries=0)
+    monkeypatch.setattr(main, "transcript_processor", processor)
+    monkeypatch.setattr(main, "cache_manager", CacheManager(tmp_path / "cache", compact_interval=None))
+    monkeypatch.setattr(main, "request_coalescer", RequestCoalescer())
+    monkeypatch.setattr(main, "solution_generator", SolutionGenerator(processor, llm_scheduler=scheduler))
+    main._register_gauges()
+
+    stages = ["categorize", "cache_lookup", "retrieval", "llm_queue", "llm_call", "parse", "generate", "cache_store"]
+    before = {stage: STAGE_SECONDS.count(stage=stage) for stage in stages}
+    lookups = {result: CACHE_LOOKUPS.value(result=result) for result in ("exact", "miss")}
+    calls = LLM_CALLS.value(outcome="ok")
+
+    query = main.ProblemQuery(problem="How do we grow retention while hiring engineers?", num_solutions=2)
+    monkeypatch.setattr(main.solution_generator, "categorize_problem", lambda problem: "scaling")
+    asyncio.run(main.ask_lenny(query))
+    asyncio.run(main.ask_lenny(query))  # answered from the cache
+
+    counted = {stage: STAGE_SECONDS.count(stage=stage) - before[stage] for stage in stages}
+    assert counted == {
+        "categorize": 2, "cache_lookup": 2, "retrieval": 1, "llm_queue": 2, "llm_call": 2,
+        "parse": 2, "generate": 1, "cache_store": 1
+    }
+    assert CACHE_LOOKUPS.value(result="exact") - lookups["exact"] == 1
+    assert CACHE_LOOKUPS.value(result="miss") - lookups["miss"] == 1
+    assert LLM_CALLS.value(outcome="ok") - calls == 2
+
+    response = asyncio.run(main.get_metrics())
+    assert response.media_type.startswith("text/plain; version=0.0.4")
+    lines = response.body.decode().split("\n")
+    assert 'wwld_corpus_size{kind="transcripts"} 3' in lines
+    assert 'wwld_cache_size{kind="entries"} 1' in lines
+    assert "wwld_llm_in_flight 0" in lines
+    assert any(line.startswith('wwld_stage_duration_seconds_count{stage="llm_call"}') for line in lines)
@@ -0,0 +1,94 @@
+"""Tests for PassageRetriever scoring"""
+
+import numpy as np
+
+from passage_retriever import EpisodeMatrix, PassageRetriever
+
+PROBLEMS = [
+    "How should I run pricing experiments?",
+    "retention curves and growth",
+    "hiring engineers before product market fit",
+    "nothing matches zebra"
+]
+
+
+def test_batch_scores_match_single_problem_scores(processor):
+    retriever = PassageRetriever(processor)
+    for episode_name in processor.get_transcript_names():
+        batch = retriever.score_passages_batch(PROBLEMS, episode_name)
+        for column, problem in enumerate(PROBLEMS):
+            single = retriever.score_passages(problem, [episode_name])[0]
+            np.testing.assert_allclose(batch[:, column], single, rtol=1e-5, atol=1e-7)
+
+
+def test_episode_ending_with_termless_passages_scores_them_zero(processor):
+    retriever = PassageRetriever(processor)
+    matrix = retriever._episode_matrix("Ada Growth")
+    nnz_per_row = np.diff(matrix.indptr)
+    assert nnz_per_row[-1] == 0 and nnz_per_row[-2] == 0 and nnz_per_row[:-2].all()
+
+    # Query with the last passage that has terms, so losing any of its terms changes its score
+    last_with_terms = processor.get_utterance_text("Ada Growth", int(matrix.rows[-3]))
+    batch = retriever.score_passages_batch([last_with_terms], "Ada Growth")[:, 0]
+    single = retriever.score_passages(last_with_terms, ["Ada Growth"])[0]
+    np.testing.assert_allclose(batch, single, rtol=1e-5, atol=1e-7)
+    assert batch[-2:].tolist() == [0.0, 0.0]
+
+
+def test_batch_scores_with_empty_rows_between_and_after():
+    retriever = PassageRetriever.__new__(PassageRetriever)
+    retriever._idf = np.ones(3, dtype=np.float32)
+    retriever._weights = lambda problem: (np.array([0, 1, 2], dtype=np.int32), np.array([1, 2, 4], dtype=np.float32))
+    # Row 0 has term 0, row 1 terms 1 and 2, row 2 no terms
+    retriever._episode_matrix = lambda episode_name: EpisodeMatrix(
+        rows=np.arange(3), costs=np.ones(3, dtype=np.int64), priors=np.ones(3, dtype=np.float32),
+        indptr=np.array([0, 1, 3, 3]), indices=np.array([0, 1, 2], dtype=np.int32),
+        data=np.ones(3, dtype=np.float32)
+    )
+
+    assert retriever.score_passages_batch(["any"], "episode")[:, 0].tolist() == [1.0, 6.0, 0.0]
+
+
+def test_scores_match_a_dense_cosine(processor):
+    retriever = PassageRetriever(processor)
+    episode_names = processor.get_transcript_names()
+    vocabulary = len(retriever.idf)
+
+    def dense(ids, weights):
+        vector = np.zeros(vocabulary)
+        vector[ids] = weights
+        return vector
+
+    queries = np.stack([dense(*retriever._weights(problem)) for problem in PROBLEMS], axis=1)
+    for episode_name, scores in zip(episode_names, retriever._score_batch(PROBLEMS, episode_names)):
+        matrix = retriever._episode_matrix(episode_name)
+        passages = np.stack([
+            dense(matrix.indices[start:end], matrix.data[start:end])
+            for start, end in zip(matrix.indptr[:-1], matrix.indptr[1:])
+        ])
+        expected = (passages @ queries) * matrix.priors[:, None]
+        np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-7)
+
+    assert retriever.score_passages("anything", []) == []
+
+
+def test_select_passages_fills_the_budget_in_transcript_order(processor):
+    retriever = PassageRetriever(processor)
+    problem = "pricing experiments and retention curves"
+
+    excerpt = retriever.select_passages(problem, ["Ada Growth"])["Ada Growth"]
+    assert excerpt.startswith("Ada Growth (00:00:00):\nRetention is the foundation")
+    assert "Lenny (00:00:30):\nHow do you think about pricing" in excerpt
+    assert excerpt.index("00:00:30") < excerpt.index("00:01:00")
+    assert "?!" not in excerpt
+
+    # A tight budget keeps only the guest's best answer; the host's question is down-weighted
+    best = retriever.select_passages(problem, ["Ada Growth"], char_budget=130)["Ada Growth"]
+    assert best.startswith("Ada Growth (00:01:00):\nPricing experiments should run on new cohorts")
+    assert "Lenny" not in best
+
+
+def test_select_passages_falls_back_to_the_transcript_start(processor):
+    retriever = PassageRetriever(processor)
+    excerpts = retriever.select_passages("nothing matches zebra", ["Ben Hiring"], char_budget=50)
+    assert excerpts == {"Ben Hiring": processor.get_transcript_content("Ben Hiring")[:50]}
@@ -0,0 +1,229 @@
+"""Tests for RequestCoalescer's single-flight run() and run_batch()"""
+
+import asyncio
+
+import pytest
+
+from request_coalescer import RequestCoalescer
+
+
+class Work:
+    """Factory that counts calls and finishes when released"""
+
+    def __init__(self, result="answer", error: Exception = None):
+        self.result = result
+        self.error = error
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, keys=None):
+        self.calls.append(keys)
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return [f"{self.result}:{key}" for key in keys] if keys is not None else self.result
+
+
+def test_concurrent_callers_share_one_call():
+    async def run():
+        coalescer = RequestCoalescer()
+        work = Work()
+        callers = [asyncio.create_task(coalescer.run("key", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert coalescer.get_stats()["in_flight"] == 1
+
+        work.release.set()
+        results = await asyncio.gather(*callers)
+
+        # Finished keys are forgotten, so the next caller starts fresh
+        again = Work("later")
+        again.release.set()
+        return coalescer, work, results, await coalescer.run("key", again)
+
+    coalescer, work, results, later = asyncio.run(run())
+    assert len(work.calls) == 1 and results == ["answer"] * 5 and later == "later"
+    assert coalescer.get_stats() == {
+        "in_flight": 0, "leaders": 2, "coalesced": 4, "failures": 0, "coalesced_ratio": 0.667
+    }
+
+
+def test_failure_reaches_every_waiter():
+    async def run():
+        coalescer = RequestCoalescer()
+        work = Work(error=RuntimeError("model down"))
+        callers = [asyncio.create_task(coalescer.run("key", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return coalescer, work, await asyncio.gather(*callers, return_exceptions=True)
+
+    coalescer, work, results = asyncio.run(run())
+    assert len(work.calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert coalescer.get_stats()["failures"] == 1 and coalescer.get_stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def run():
+        coalescer = RequestCoalescer()
+        work = Work()
+        leader = asyncio.create_task(coalescer.run("key", work))
+        follower = asyncio.create_task(coalescer.run("key", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        work.release.set()
+        return leader, await follower
+
+    leader, result = asyncio.run(run())
+    assert leader.cancelled() and result == "answer"
+
+
+def test_run_batch_joins_in_flight_keys_and_computes_the_rest_once():
+    async def run():
+        coalescer = RequestCoalescer()
+        single = Work("single")
+        batch = Work("batch")
+        pending = asyncio.create_task(coalescer.run("b", single))
+        await asyncio.sleep(0)
+
+        batched = asyncio.create_task(coalescer.run_batch(["a", "b", "c", "a"], batch))
+        await asyncio.sleep(0)
+        # A /ask for a batched key joins the batch instead of starting its own call
+        joined = asyncio.create_task(coalescer.run("c", Work("unused")))
+        await asyncio.sleep(0)
+
+        single.release.set()
+        batch.release.set()
+        return coalescer, batch, await batched, await joined, await pending
+
+    coalescer, batch, results, joined, single_result = asyncio.run(run())
+    assert single_result == "single"
+    assert batch.calls == [["a", "c"]]
+    assert results == ["batch:a", "single", "batch:c", "batch:a"]
+    assert joined == "batch:c"
+    stats = coalescer.get_stats()
+    assert stats["leaders"] == 3 and stats["coalesced"] == 3 and stats["in_flight"] == 0
+
+
+def test_run_batch_failure_fails_every_batched_key():
+    async def run():
+        coalescer = RequestCoalescer()
+        work = Work(error=RuntimeError("model down"))
+        batched = asyncio.create_task(coalescer.run_batch(["a", "b"], work))
+        await asyncio.sleep(0)
+        work.release.set()
+        with pytest.raises(RuntimeError):
+            await batched
+        return coalescer
+
+    coalescer = asyncio.run(run())
+    assert coalescer.get_stats()["failures"] == 2 and coalescer.get_stats()["in_flight"] == 0
+
+
+async def until(condition) -> None:
+    while not condition():
+        await asyncio.sleep(0)
+
+
+async def emit_in_steps(emit, steps: list, items=("a", "b", "c")):
+    """stream() factory: emits each item after waiting for its step event, returns them joined"""
+    for item, step in zip(items, steps):
+        await step.wait()
+        emit(item)
+    return "".join(items)
+
+
+def test_stream_followers_replay_what_they_missed():
+    async def run():
+        coalescer = RequestCoalescer()
+        steps = [asyncio.Event() for _ in range(3)]
+
+        async def collect(received):
+            async for item in coalescer.stream("key", lambda emit: emit_in_steps(emit, steps), replay=list):
+                received.append(item)
+
+        early, late = [], []
+        first = asyncio.create_task(collect(early))
+        steps[0].set()
+        await asyncio.wait_for(until(lambda: early == ["a"]), 5)
+
+        second = asyncio.create_task(collect(late))
+        joined = asyncio.create_task(coalescer.run("key", lambda: None))  # run() gets the result
+        steps[1].set()
+        steps[2].set()
+        await asyncio.gather(first, second)
+        return coalescer, early, late, await joined
+
+    coalescer, early, late, joined = asyncio.run(run())
+    assert early == late == ["a", "b", "c"]
+    assert joined == "abc"
+    assert coalescer.get_stats()["leaders"] == 1 and coalescer.get_stats()["coalesced"] == 2
+
+
+def test_stream_joining_run_replays_its_result():
+    async def run():
+        coalescer = RequestCoalescer()
+        work = Work()
+        pending = asyncio.create_task(coalescer.run("key", work))
+        await asyncio.sleep(0)
+        received = []
+
+        async def collect():
+            async for item in coalescer.stream("key", lambda emit: None, replay=lambda result: result.split(":")):
+                received.append(item)
+
+        following = asyncio.create_task(collect())
+        await asyncio.sleep(0)
+        work.release.set()
+        await asyncio.gather(pending, following)
+        return work, received
+
+    work, received = asyncio.run(run())
+    assert len(work.calls) == 1 and received == ["answer"]
+
+
+def test_stream_failure_reaches_followers_after_the_items():
+    async def run():
+        coalescer = RequestCoalescer()
+
+        async def failing(emit):
+            emit("a")
+            await asyncio.sleep(0)
+            raise RuntimeError("model down")
+
+        async def collect(received):
+            async for item in coalescer.stream("key", failing, replay=list):
+                received.append(item)
+
+        received = [[], []]
+        results = await asyncio.gather(*(collect(items) for items in received), return_exceptions=True)
+        return coalescer, received, results
+
+    coalescer, received, results = asyncio.run(run())
+    assert received == [["a"], ["a"]]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert coalescer.get_stats()["failures"] == 1 and coalescer.get_stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_leaves_the_others_streaming():
+    async def run():
+        coalescer = RequestCoalescer()
+        steps = [asyncio.Event() for _ in range(3)]
+
+        async def collect(received):
+            async for item in coalescer.stream("key", lambda emit: emit_in_steps(emit, steps), replay=list):
+                received.append(item)
+
+        gone, staying = [], []
+        leaver = asyncio.create_task(collect(gone))
+        stayer = asyncio.create_task(collect(staying))
+        await asyncio.sleep(0)
+        leaver.cancel()
+        for step in steps:
+            step.set()
+        await stayer
+        return leaver, staying
+
+    leaver, staying = asyncio.run(run())
+    assert leaver.cancelled() and staying == ["a", "b", "c"]
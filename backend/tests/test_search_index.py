@@ -0,0 +1,121 @@
+"""Tests for the BM25 inverted index"""
+
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from search_index import INDEX_ARRAYS, InvertedIndex, analyze_document, tokenize
+
+DOCUMENTS = {
+    "growth": "Retention drives growth.\nGrowth loops beat funnels.\n\nRetention, retention, retention.",
+    "pricing": "Pricing is a growth lever.\nRaise prices before you think you should.",
+    "hiring": "Hire for slope, not intercept.\nHiring managers own the loop.",
+    "empty-ish": "...\n!!!"
+}
+
+
+def build(documents: dict) -> InvertedIndex:
+    return InvertedIndex.build((name, analyze_document(text)) for name, text in documents.items())
+
+
+def reference_bm25(documents: dict, terms: list) -> dict:
+    """BM25 straight from the formula, for comparison"""
+    tokens = {name: tokenize(text) for name, text in documents.items()}
+    avg_length = max(sum(map(len, tokens.values())) / len(tokens), 1.0)
+    scores = {}
+    for name, doc_tokens in tokens.items():
+        counts = Counter(doc_tokens)
+        score = 0.0
+        for term in set(terms):
+            df = sum(term in other for other in tokens.values())
+            if not counts[term]:
+                continue
+            idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+            norm = 1 - InvertedIndex.B + InvertedIndex.B * len(doc_tokens) / avg_length
+            score += idf * counts[term] * (InvertedIndex.K1 + 1) / (counts[term] + InvertedIndex.K1 * norm)
+        if score:
+            scores[name] = score
+    return scores
+
+
+def assert_same_index(actual: InvertedIndex, expected: InvertedIndex) -> None:
+    assert actual.doc_names == expected.doc_names
+    assert actual.vocab == expected.vocab
+    for name in INDEX_ARRAYS:
+        np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name), err_msg=name)
+
+
+@pytest.mark.parametrize("query", ["retention growth", "pricing", "loop", "hire hiring slope", "zebra"])
+def test_rank_matches_reference_bm25(query):
+    index = build(DOCUMENTS)
+    ranked = {index.doc_names[doc_id]: score for doc_id, score in index.rank(tokenize(query))}
+    expected = reference_bm25(DOCUMENTS, tokenize(query))
+
+    assert ranked.keys() == expected.keys()
+    for name, score in expected.items():
+        assert ranked[name] == pytest.approx(score)
+    scores = [score for _, score in index.rank(tokenize(query))]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_postings_are_csr_by_term_with_tfs_and_lines():
+    index = build(DOCUMENTS)
+    assert index.term_ptr[0] == 0 and index.term_ptr[-1] == len(index.post_docs)
+    assert (np.diff(index.term_ptr) > 0).all()
+
+    for term, term_id in index.term_ids.items():
+        start, end = int(index.term_ptr[term_id]), int(index.term_ptr[term_id + 1])
+        docs = index.post_docs[start:end]
+        assert (np.diff(docs) > 0).all()  # each doc once, in doc order
+        for row, doc_id in zip(range(start, end), docs.tolist()):
+            lines = DOCUMENTS[index.doc_names[doc_id]].split("\n")
+            assert index.post_tfs[row] == sum(tokenize(line).count(term) for line in lines)
+            expected_lines = [no for no, line in enumerate(lines) if term in tokenize(line)]
+            assert index.post_lines[index.post_line_ptr[row]:index.post_line_ptr[row + 1]].tolist() == expected_lines
+
+
+def test_matching_lines_and_line_spans():
+    index = build(DOCUMENTS)
+    doc_id = index.doc_ids["growth"]
+    # Line 0 has both terms, line 3 only retention, line 1 only growth
+    assert index.matching_lines(doc_id, ["retention", "growth"]) == [0, 1, 3]
+
+    text = DOCUMENTS["growth"]
+    lines = text.split("\n")
+    assert index.line_count(doc_id) == len(lines)
+    for first in range(len(lines)):
+        start, end = index.line_span(doc_id, first, first)
+        assert text[start:end] == lines[first]
+
+
+def test_updated_equals_a_fresh_build():
+    index = build(DOCUMENTS)
+    changed = {
+        "pricing": "Pricing pages need a decoy.\nAnchor high.",
+        "new": "Brand new episode about onboarding and activation."
+    }
+    updated = index.updated(removed=["hiring"], added=build(changed))
+
+    # Kept documents keep their order; added ones follow
+    expected = build({
+        "growth": DOCUMENTS["growth"],
+        "empty-ish": DOCUMENTS["empty-ish"],
+        **changed
+    })
+    assert_same_index(updated, expected)
+    assert "slope" not in updated.term_ids  # terms only in removed documents are dropped
+    assert updated.rank(["pricing"]) == expected.rank(["pricing"])
+
+
+def test_updated_with_nothing_added_only_removes():
+    index = build(DOCUMENTS)
+    updated = index.updated(removed=["growth"], added=build({}))
+    assert_same_index(updated, build({name: text for name, text in DOCUMENTS.items() if name != "growth"}))
+
+
+def test_snapshot_round_trip():
+    index = build(DOCUMENTS)
+    meta, arrays = index.to_snapshot()
+    assert_same_index(InvertedIndex.from_snapshot(meta, arrays), index)
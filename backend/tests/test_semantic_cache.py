@@ -0,0 +1,94 @@
+"""Tests for SemanticIndex growth, discards and compaction"""
+
+import threading
+
+from semantic_cache import SemanticIndex
+
+TOPICS = ["retention", "pricing", "hiring", "onboarding", "roadmap", "burnout", "fundraising", "churn"]
+
+
+def problem(i: int) -> str:
+    return f"How do we fix {TOPICS[i % len(TOPICS)]} for team {i}?"
+
+
+def test_nearest_matches_within_the_category():
+    index = SemanticIndex()
+    index.add("a", "How do I improve retention?", "growth")
+    index.add("b", "How do I improve retention?", "hiring")
+    index.add("c", "How should we price the product?", "growth")
+
+    key, cached, score = index.nearest("Improving user retention", "growth")
+    assert (key, cached) == ("a", "How do I improve retention?") and 0 < score < 1
+    assert index.nearest("Improving user retention", "pricing") is None
+
+    index.discard("a")
+    assert index.nearest("Improving user retention", "growth") is None
+    assert index.get_stats()["problems"] == 2 and index.get_stats()["rows"] == 3
+
+
+def test_eviction_churn_compacts_discarded_rows():
+    index = SemanticIndex()
+    live = []
+    for i in range(2000):
+        index.add(f"k{i}", problem(i), "growth")
+        live.append(i)
+        if len(live) > 50:  # an LRU keeping the newest 50
+            index.discard(f"k{live.pop(0)}")
+
+    stats = index.get_stats()
+    assert stats["problems"] == 50 and stats["compactions"] > 0
+    assert stats["rows"] <= 50 + 2 * SemanticIndex.COMPACT_MIN_DEAD
+    assert len(index._row_alive) <= 2 * stats["rows"] + 64
+    assert stats["terms"] < 100  # terms used only by discarded problems are dropped too
+
+    # Same answers as an index built from the survivors alone
+    fresh = SemanticIndex()
+    for i in live:
+        fresh.add(f"k{i}", problem(i), "growth")
+    for query in ["fixing retention for team 1990", "churn for team 1999", "team 1975 pricing"]:
+        assert index.nearest(query, "growth") == fresh.nearest(query, "growth")
+
+
+def test_readding_a_discarded_key_survives_compaction():
+    index = SemanticIndex()
+    for i in range(SemanticIndex.COMPACT_MIN_DEAD + 1):
+        index.add(f"k{i}", problem(i), "growth")
+    index.discard("k0")
+    index.add("k0", "How do I plan a fundraising round?", "growth")
+    for i in range(1, SemanticIndex.COMPACT_MIN_DEAD + 1):
+        index.discard(f"k{i}")
+
+    assert index.get_stats()["compactions"] == 1 and len(index) == 1
+    assert index.nearest("fundraising round", "growth")[0] == "k0"
+
+
+def test_index_stays_consistent_under_concurrent_access():
+    index = SemanticIndex()
+    errors = []
+
+    def churn(worker: int):
+        try:
+            for i in range(1500):
+                key = f"k{(worker * 11 + i) % 120}"
+                if i % 3 == 0:
+                    index.discard(key)
+                elif i % 3 == 1:
+                    index.add(key, problem(i), "growth")
+                else:
+                    match = index.nearest(f"fix {TOPICS[i % len(TOPICS)]} for team {i}", "growth")
+                    assert match is None or 0 < match[2] <= 1
+        except Exception as error:  # surfaced below; a thread's exception would otherwise be lost
+            errors.append(error)
+
+    threads = [threading.Thread(target=churn, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    stats = index.get_stats()
+    assert stats["compactions"] > 0
+    assert index._entry_rows[:index._entry_count].max() < stats["rows"]
+    assert index._entry_terms[:index._entry_count].max() < stats["terms"]
+    assert all(index._keys[row] == key for key, row in index._rows_by_key.items())
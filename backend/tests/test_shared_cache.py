@@ -0,0 +1,93 @@
+"""Tests for shared-mode CacheManagers in separate processes over one cache_dir"""
+
+import multiprocessing
+
+import pytest
+
+from cache_manager import CacheManager
+
+BACKENDS = ["file", "sqlite"]
+
+
+def make_cache(cache_dir, backend: str) -> CacheManager:
+    return CacheManager(cache_dir, backend=backend, compact_interval=None, shared=True)
+
+
+def write_entries(cache_dir, backend: str, start: int, count: int, version: int = 1, compact_every: int = 0) -> None:
+    """Worker: set problems start..start+count-1, optionally compacting as it goes"""
+    cache = make_cache(cache_dir, backend)
+    for i in range(start, start + count):
+        cache.set(f"problem {i}", "growth", {"i": i, "version": version})
+        if compact_every and (i + 1) % compact_every == 0:
+            cache.compact()
+
+
+def clear_cache(cache_dir, backend: str) -> None:
+    make_cache(cache_dir, backend).clear()
+
+
+def run_in_processes(*calls) -> None:
+    """Run each (target, args) in its own process and wait for all of them"""
+    processes = [multiprocessing.Process(target=target, args=args) for target, args in calls]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_writes_from_another_process_are_visible(tmp_path, backend):
+    cache = make_cache(tmp_path, backend)
+    assert cache.get("problem 0", "growth") is None
+
+    run_in_processes((write_entries, (tmp_path, backend, 0, 20)))
+
+    assert cache.get("problem 7", "growth") == {"i": 7, "version": 1}
+    stats = cache.get_stats()
+    assert stats["cached_solutions"] == 20
+    assert stats["shared"]["synced_updates"] == 20
+    assert cache.list_entries(limit=100)["total"] == 20
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_overwrite_elsewhere_invalidates_the_memory_tier(tmp_path, backend):
+    cache = make_cache(tmp_path, backend)
+    cache.set("problem 0", "growth", {"i": 0, "version": 1})
+    assert cache.get("problem 0", "growth") == {"i": 0, "version": 1}  # now in memory
+
+    run_in_processes((write_entries, (tmp_path, backend, 0, 1, 2)))
+
+    assert cache.get("problem 0", "growth") == {"i": 0, "version": 2}
+    assert cache.get_stats()["cached_solutions"] == 1
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_clear_elsewhere_removes_entries(tmp_path, backend):
+    cache = make_cache(tmp_path, backend)
+    for i in range(5):
+        cache.set(f"problem {i}", "growth", {"i": i})
+    assert cache.get("problem 3", "growth") is not None
+
+    run_in_processes((clear_cache, (tmp_path, backend)))
+
+    assert cache.get("problem 3", "growth") is None
+    stats = cache.get_stats()
+    assert stats["cached_solutions"] == 0 and stats["budget"]["bytes"] == 0
+    assert stats["shared"]["synced_removals"] == 5
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_concurrent_writers_and_compactions_keep_every_entry(tmp_path, backend):
+    workers, per_worker = 4, 100
+    run_in_processes(*[
+        (write_entries, (tmp_path, backend, worker * per_worker, per_worker, 1, 25))
+        for worker in range(workers)
+    ])
+
+    reopened = make_cache(tmp_path, backend)
+    assert len(reopened.index) == workers * per_worker
+    assert all(
+        reopened.get(f"problem {i}", "growth") == {"i": i, "version": 1}
+        for i in range(workers * per_worker)
+    )
@@ -0,0 +1,110 @@
+"""Tests for SolutionGenerator's concurrent async extraction path"""
+
+import asyncio
+import json
+
+from llm_backend import LLMBackend
+from llm_scheduler import LLMScheduler
+from solution_generator import SolutionGenerator
+
+PROBLEM = "How do retention, hiring and feedback fit together?"
+SPEAKERS = ["Ada Growth", "Ben Hiring", "Cy Leadership"]
+
+
+class SlowBackend(LLMBackend):
+    """Answers after a per-speaker delay, tracking how many calls overlap"""
+
+    name = "slow"
+
+    def __init__(self, delays: dict):
+        super().__init__("test-model")
+        self.delays = delays
+        self.in_flight = 0
+        self.peak = 0
+
+    def _speaker(self, prompt: str) -> str:
+        return next(name for name in self.delays if f"EXCERPTS FROM {name}:" in prompt)
+
+    def _answer(self, speaker: str) -> str:
+        return json.dumps({"quote": f"{speaker} says ship", "framework1": "A", "framework2": "B"})
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        return self._answer(self._speaker(prompt))
+
+    async def acomplete(self, prompt: str, max_tokens: int) -> str:
+        speaker = self._speaker(prompt)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays[speaker])
+        finally:
+            self.in_flight -= 1
+        return self._answer(speaker)
+
+
+def make_generator(processor, monkeypatch, backend: LLMBackend, max_concurrency: int = 4) -> SolutionGenerator:
+    monkeypatch.setitem(SolutionGenerator.PROBLEM_CATEGORIES, "scaling", SPEAKERS)
+    scheduler = LLMScheduler(backend, max_concurrency=max_concurrency, max_retries=0)
+    return SolutionGenerator(processor, llm_scheduler=scheduler)
+
+
+def test_extractions_overlap_and_keep_speaker_order(processor, monkeypatch):
+    # The first speaker is the slowest, so completion order is the reverse of speaker order
+    backend = SlowBackend({"Ada Growth": 0.15, "Ben Hiring": 0.1, "Cy Leadership": 0.05})
+    generator = make_generator(processor, monkeypatch, backend)
+
+    result = asyncio.run(generator.generate_solutions_async(PROBLEM, num_solutions=3, category="scaling"))
+    assert backend.peak == 3
+    assert [solution["speaker"] for solution in result["solutions"]] == SPEAKERS
+    assert result == generator.generate_solutions(PROBLEM, num_solutions=3, category="scaling")
+
+
+def test_iter_solutions_yields_as_each_extraction_finishes(processor, monkeypatch):
+    backend = SlowBackend({"Ada Growth": 0.15, "Ben Hiring": 0.1, "Cy Leadership": 0.05})
+    generator = make_generator(processor, monkeypatch, backend)
+
+    async def run():
+        return [(position, solution["speaker"])
+                async for position, solution in generator.iter_solutions(PROBLEM, 3, "scaling")]
+
+    assert asyncio.run(run()) == [(2, "Cy Leadership"), (1, "Ben Hiring"), (0, "Ada Growth")]
+
+
+def test_max_concurrency_bounds_calls_in_flight(processor, monkeypatch):
+    backend = SlowBackend({speaker: 0.02 for speaker in SPEAKERS})
+    generator = make_generator(processor, monkeypatch, backend, max_concurrency=2)
+
+    result = asyncio.run(generator.generate_solutions_async(PROBLEM, num_solutions=3, category="scaling"))
+    assert backend.peak == 2 and len(result["solutions"]) == 3
+
+
+class PartialBackend(SlowBackend):
+    """Answers for Ben Hiring without the framework fields"""
+
+    def _answer(self, speaker: str) -> str:
+        if speaker == "Ben Hiring":
+            return json.dumps({"quote": f"{speaker} says ship"})
+        return super()._answer(speaker)
+
+
+def test_batch_skips_replies_missing_fields(processor, monkeypatch):
+    backend = PartialBackend({speaker: 0 for speaker in SPEAKERS})
+    generator = make_generator(processor, monkeypatch, backend)
+
+    [result] = asyncio.run(generator.generate_solutions_batch_async([PROBLEM], num_solutions=3, categories=["scaling"]))
+    assert [solution["speaker"] for solution in result["solutions"]] == ["Ada Growth", "Cy Leadership"]
+    assert generator._parse_insight_text(json.dumps({"quote": "q", "framework1": "A"})) is None
+
+
+def test_unshapeable_replies_are_empty_results_not_outages(processor, monkeypatch):
+    generator = make_generator(processor, monkeypatch, SlowBackend({speaker: 0 for speaker in SPEAKERS}))
+
+    def malformed(*args):
+        raise TypeError("quote is not a string")
+
+    monkeypatch.setattr(generator, "_build_solution", malformed)
+
+    assert generator.generate_solutions(PROBLEM, num_solutions=3, category="scaling")["solutions"] == []
+    assert asyncio.run(generator.generate_solutions_async(PROBLEM, 3, "scaling"))["solutions"] == []
+    [result] = asyncio.run(generator.generate_solutions_batch_async([PROBLEM], 3, ["scaling"]))
+    assert result["solutions"] == []
@@ -0,0 +1,140 @@
+"""Tests for SpeakerIndex ranking and its rebuild when the corpus or keywords change"""
+
+import os
+
+import pytest
+
+import speaker_index
+from conftest import TRANSCRIPTS, write_transcripts
+from solution_generator import SolutionGenerator
+from speaker_index import (
+    SPEAKER_INDEX_FILENAME, SpeakerIndex, guest_count, host_speakers, is_guest_episode, person_name
+)
+from transcript_processor import TranscriptProcessor
+
+KEYWORDS = {
+    "growth": ["retention", "pricing"],
+    "hiring": ["hiring", "engineer"],  # "engineer" also matches "engineers"
+    "leadership": ["feedback"],
+    "unheard-of": ["blockchain"]
+}
+
+
+@pytest.fixture(autouse=True)
+def rank_short_episodes(monkeypatch):
+    monkeypatch.setattr(speaker_index, "MIN_EPISODE_TOKENS", 0)
+
+
+def test_person_name_drops_repeat_episode_suffixes():
+    assert person_name("April Dunford 2.0") == "April Dunford"
+    assert person_name("Andy Raskin_") == "Andy Raskin"
+    assert person_name("Web 3.0 Founder") == "Web 3.0 Founder"
+
+
+def test_guest_count_reads_the_episode_title():
+    assert guest_count("Ada Growth 2.0") == 1
+    assert guest_count("Jake Knapp + John Zeratsky") == 2 and guest_count("Sriram and Aarthi") == 2
+
+
+def test_compilation_and_host_only_episodes_are_not_ranked(tmp_path):
+    compilation = "".join(
+        f"{guest} (00:0{i}:00):\nMy best retention and pricing lesson, from episode {i}.\n\n"
+        f"Lenny (00:0{i}:30):\nThanks. Next up on retention.\n\n"
+        for i, guest in enumerate(["Ada Growth", "Ben Hiring", "Cy Leadership", "Dee Churn"])
+    )
+    transcripts = dict(TRANSCRIPTS, **{
+        "EOY Review": compilation * 3,
+        "Host Solo": "Lenny (00:00:00):\nA solo episode on retention, retention and pricing.\n",
+        "Sriram and Aarthi": (
+            "Sriram Krishnan (00:00:00):\nRetention first.\n\n"
+            "Aarthi Ramamurthy (00:00:10):\nThen pricing.\n\n"
+            "Lenny (00:00:20):\nGreat.\n"
+        )
+    })
+    processor = TranscriptProcessor(write_transcripts(tmp_path, transcripts), use_snapshot=False)
+
+    hosts = host_speakers(processor.utterances)
+    assert hosts == {"Lenny"}
+    assert not is_guest_episode(processor.utterances, "EOY Review", hosts)
+    assert not is_guest_episode(processor.utterances, "Host Solo", hosts)
+    assert is_guest_episode(processor.utterances, "Sriram and Aarthi", hosts)
+    assert is_guest_episode(processor.utterances, "Ada Growth", hosts)
+
+    ranked = SpeakerIndex.build(processor, KEYWORDS).top_speakers("growth", 10)
+    assert "EOY Review" not in ranked and "Host Solo" not in ranked
+    assert "Ada Growth" in ranked and "Sriram and Aarthi" in ranked
+
+
+def test_hosts_are_the_speakers_of_many_episodes(tmp_path):
+    transcripts = dict(TRANSCRIPTS, **{
+        f"{guest} Churn": f"{guest} Churn (00:00:00):\nChurn is a lagging metric.\n\n{host} (00:00:10):\nWhy?\n"
+        for guest, host in [("Dee", "Lenny Rachitsky"), ("Eve", "Lenny Rachitsky"), ("Fay", "Lenny Rachitsky")]
+    })
+    processor = TranscriptProcessor(write_transcripts(tmp_path, transcripts), use_snapshot=False)
+    assert host_speakers(processor.utterances) == {"Lenny", "Lenny Rachitsky"}  # the host under both labels
+
+    single = tmp_path / "single"
+    single.mkdir()
+    write_transcripts(single, {"Ben Hiring": TRANSCRIPTS["Ben Hiring"]})
+    assert host_speakers(TranscriptProcessor(single, use_snapshot=False).utterances) == set()
+
+
+def test_build_ranks_speakers_per_category(processor):
+    index = SpeakerIndex.build(processor, KEYWORDS)
+    assert index.top_speakers("growth", 1) == ["Ada Growth"]
+    assert index.top_speakers("hiring", 1) == ["Ben Hiring"]
+    assert index.top_speakers("leadership", 1) == ["Cy Leadership"]
+    assert "unheard-of" not in index and index.top_speakers("missing", 3) == []
+    assert all(entry["score"] > 0 for ranked in index.categories.values() for entry in ranked)
+
+
+def test_repeat_episodes_rank_once_per_person(tmp_path):
+    transcripts = dict(TRANSCRIPTS, **{"Ada Growth 2.0": TRANSCRIPTS["Ada Growth"] + "More on retention and retention.\n"})
+    processor = TranscriptProcessor(write_transcripts(tmp_path, transcripts), use_snapshot=False)
+
+    ranked = SpeakerIndex.build(processor, KEYWORDS).top_speakers("growth", 5)
+    assert ranked[0] == "Ada Growth 2.0" and "Ada Growth" not in ranked
+
+
+def test_load_or_build_rebuilds_when_the_corpus_or_keywords_change(transcripts_dir):
+    processor = TranscriptProcessor(transcripts_dir, use_snapshot=False)
+    built = SpeakerIndex.load_or_build(processor, KEYWORDS)
+    path = transcripts_dir / SPEAKER_INDEX_FILENAME
+    assert path.exists() and built.corpus_fingerprint == processor.corpus_version
+
+    loaded = SpeakerIndex.load_or_build(processor, KEYWORDS)
+    assert loaded.built_at == built.built_at and loaded.categories == built.categories
+    assert loaded.hosts == built.hosts == {"Lenny"}
+
+    # Ben now talks about pricing, which changes corpus_version
+    ben = transcripts_dir / "Ben Hiring.txt"
+    ben.write_text(TRANSCRIPTS["Ben Hiring"] + "Pricing, pricing and more pricing for retention.\n", encoding="utf-8")
+    os.utime(ben, ns=(ben.stat().st_atime_ns, ben.stat().st_mtime_ns + 10**9))
+    changed = TranscriptProcessor(transcripts_dir, use_snapshot=False)
+    assert changed.corpus_version != processor.corpus_version
+
+    rebuilt = SpeakerIndex.load_or_build(changed, KEYWORDS)
+    assert rebuilt.corpus_fingerprint == changed.corpus_version
+    assert rebuilt.top_speakers("growth", 2) != built.top_speakers("growth", 2)
+    assert SpeakerIndex.load(path).corpus_fingerprint == changed.corpus_version
+
+    fewer = {category: keywords for category, keywords in KEYWORDS.items() if category != "leadership"}
+    assert "leadership" not in SpeakerIndex.load_or_build(changed, fewer).categories
+
+
+def test_unreadable_or_old_format_files_are_ignored(tmp_path):
+    path = tmp_path / SPEAKER_INDEX_FILENAME
+    assert SpeakerIndex.load(path) is None
+    path.write_text("{not json")
+    assert SpeakerIndex.load(path) is None
+    path.write_text('{"version": 0}')
+    assert SpeakerIndex.load(path) is None
+
+
+def test_generator_prefers_the_index_and_falls_back_to_the_table(processor):
+    index = SpeakerIndex.build(processor, KEYWORDS)
+    generator = SolutionGenerator(processor, demo_mode=True, speaker_index=index)
+    assert generator.speakers_for_category("growth", 2) == index.top_speakers("growth", 2)
+
+    category = next(iter(SolutionGenerator.PROBLEM_CATEGORIES))
+    assert generator.speakers_for_category(category, 2) == SolutionGenerator.PROBLEM_CATEGORIES[category][:2]
@@ -0,0 +1,70 @@
+"""Tests for MmapTranscriptStore"""
+
+import threading
+
+from transcript_processor import TranscriptProcessor
+from transcript_store import MmapTranscriptStore
+
+MIXED_NEWLINES = (
+    b"Ada (00:00:01):\r\nWindows line one\r\n"
+    b"Mac line two\rMac line three\r"
+    b"Unix line four\n\n"
+    b"Trailing line without a break"
+)
+
+
+def test_lines_split_like_decoded_text(tmp_path):
+    path = tmp_path / "Ada.txt"
+    path.write_bytes(MIXED_NEWLINES)
+    store = MmapTranscriptStore()
+    store.add("Ada", path)
+
+    # The index splits the decoded (universal newline) text on \n
+    lines = store["Ada"].split("\n")
+    assert store["Ada"] == path.read_text(encoding="utf-8")
+    assert len(store.line_offsets("Ada")) == len(lines) + 1
+    for first in range(len(lines)):
+        for last in range(first, len(lines)):
+            assert store.read_lines("Ada", first, last) == "\n".join(lines[first:last + 1])
+
+
+def test_mmap_mode_reads_match_memory_mode(tmp_path):
+    (tmp_path / "Ada.txt").write_bytes(MIXED_NEWLINES.replace(b"line", b"retention line"))
+    memory = TranscriptProcessor(tmp_path, use_snapshot=False)
+    mapped = TranscriptProcessor(tmp_path, use_snapshot=False, storage="mmap")
+
+    assert mapped.search_transcripts("retention", limit=10) == memory.search_transcripts("retention", limit=10)
+    line_count = memory.search_index.line_count(memory.search_index.doc_ids["Ada"])
+    for line in range(line_count):
+        assert mapped._read_lines("Ada", line, line) == memory._read_lines("Ada", line, line)
+
+
+def test_concurrent_reads_with_eviction(tmp_path):
+    store = MmapTranscriptStore(max_open_files=1)
+    expected = {}
+    for i in range(8):
+        name = f"Guest {i}"
+        text = "".join(f"{name} says line {line}\n" for line in range(200))
+        (tmp_path / f"{name}.txt").write_text(text)
+        store.add(name, tmp_path / f"{name}.txt")
+        expected[name] = text.split("\n")
+
+    errors = []
+
+    def read(offset):
+        try:
+            for step in range(300):
+                name = f"Guest {(offset + step) % 8}"
+                line = step % 200
+                assert store.read_lines(name, line, line) == expected[name][line]
+        except Exception as e:  # surfaced in the main thread below
+            errors.append(e)
+
+    threads = [threading.Thread(target=read, args=(offset,)) for offset in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(store.resident_files()) == 1
@@ -0,0 +1,111 @@
+"""Tests for parse_utterances, UtteranceTable and the segment lookups built on them"""
+
+import numpy as np
+
+from conftest import write_transcripts
+from transcript_processor import TranscriptProcessor
+from utterance_store import (
+    HEADER_LINE, INLINE_HEADER, NO_HEADER, NO_SPEAKER, NO_TIMESTAMP, UtteranceTable, format_timestamp,
+    parse_timestamp, parse_utterances, strip_header
+)
+
+MIXED_FORMATS = (
+    "Intro paragraph without a speaker.\n"
+    "\n"
+    "Ada (00:01:05):\n"
+    "First turn.\n"
+    "Still the first turn.\n"
+    "\n"
+    "(01:10):\n"
+    "Bare timestamp continues Ada.\n"
+    "[00:02:00] Ben: Inline turn text\n"
+    "Host:\n"
+    "Plain header turn.\n"
+)
+
+
+def test_timestamps_round_trip():
+    assert parse_timestamp("01:02:03") == 3723 and parse_timestamp("02:03") == 123
+    assert format_timestamp(3723) == "01:02:03" and format_timestamp(NO_TIMESTAMP) is None
+
+
+def test_parse_utterances_handles_every_header_format():
+    parsed = parse_utterances(MIXED_FORMATS)
+    assert parsed.speakers == [None, "Ada", "Ada", "Ben", "Host"]
+    assert parsed.start_seconds.tolist() == [NO_TIMESTAMP, 65, 70, 120, NO_TIMESTAMP]
+    assert parsed.first_lines.tolist() == [0, 2, 6, 8, 9]
+    assert parsed.line_counts.tolist() == [1, 3, 2, 1, 2]
+    assert parsed.header_kinds.tolist() == [NO_HEADER, HEADER_LINE, HEADER_LINE, INLINE_HEADER, HEADER_LINE]
+
+    lines = MIXED_FORMATS.split("\n")
+    assert strip_header("\n".join(lines[2:5]), HEADER_LINE) == "First turn.\nStill the first turn."
+    assert strip_header(lines[8], INLINE_HEADER).strip() == "Inline turn text"
+
+
+def test_table_interns_speakers_and_maps_lines_to_rows():
+    table = UtteranceTable.build([
+        ("one", parse_utterances(MIXED_FORMATS)),
+        ("two", parse_utterances("Ben (00:00:10):\nHello.\n\nAda (00:00:20):\nHi.\n"))
+    ])
+    assert table.speaker_names == ["Ada", "Ben", "Host"]
+    assert table.speaker_ids.tolist() == [NO_SPEAKER, 0, 0, 1, 2, 1, 0]
+    assert table.episode_ptr.tolist() == [0, 5, 7]
+
+    # Line 5 is the blank gap after Ada's first turn; line 99 is past every turn
+    assert table.rows_for_lines("one", np.array([3, 4, 5, 7, 99])).tolist() == [1, 2]
+    assert table.rows_for_lines("missing", np.array([0])).tolist() == []
+    assert table.speaker_rows("Ada").tolist() == [1, 2, 6]
+    assert table.speaker_rows("Ada", "two").tolist() == [6]
+    assert table.row_at_time("one", 100) == 2 and table.row_at_time("one", 0) == 1
+    assert table.speaker_of(0) is None and table.speaker_of(3) == "Ben"
+
+
+def test_processor_segments_come_from_the_table(processor):
+    segments = processor.get_relevant_segments("retention", "Ada Growth")
+    assert [(segment["speaker"], segment["timestamp"]) for segment in segments] == [
+        ("Ada Growth", "00:00:00"), ("Lenny", "00:00:30"), ("Ada Growth", "00:01:00")
+    ]
+    assert segments[0]["text"].startswith("Retention is the foundation")
+
+    only_lenny = processor.get_relevant_segments("retention", "Ada Growth", speaker="Lenny")
+    assert [segment["timestamp"] for segment in only_lenny] == ["00:00:30"]
+
+    assert [(segment["episode"], segment["timestamp"]) for segment in processor.get_speaker_segments("Lenny")] == [
+        ("Ada Growth", "00:00:30"), ("Ada Growth", "00:02:30"), ("Ben Hiring", "00:00:40"), ("Cy Leadership", "00:00:20")
+    ]
+    assert processor.get_segment_at("Ben Hiring", "00:01:00")["speaker"] == "Lenny"
+
+
+def test_relevant_segments_match_topics_past_the_truncated_text(tmp_path):
+    filler = "We spent the first year talking about acquisition channels and onboarding. " * 8
+    write_transcripts(tmp_path, {"Dee Churn": f"Dee Churn (00:00:00):\n{filler}Then retention became the only metric.\n"})
+    processor = TranscriptProcessor(tmp_path, use_snapshot=False)
+
+    segments = processor.get_relevant_segments("retention", "Dee Churn")
+    assert len(segments) == 1 and len(segments[0]["text"]) == 500
+    assert "retention" not in segments[0]["text"]
+
+
+def test_relevant_segments_keep_substring_matching(tmp_path):
+    write_transcripts(tmp_path, {"Eve Ames": (
+        "Eve Ames (00:00:00):\n"
+        "We kept fitting the product to whoever shouted loudest in the sales channel.\n"
+        "\n"
+        "Lenny (00:00:30):\n"
+        "What about the benefits of saying no to those loud enterprise customers?\n"
+        "\n"
+        "Eve Ames (00:01:00):\n"
+        "Saying no is the whole benefit, and it is how you find out what about you is unique.\n"
+    )})
+    processor = TranscriptProcessor(tmp_path, use_snapshot=False)
+
+    def timestamps(topic):
+        return [segment["timestamp"] for segment in processor.get_relevant_segments(topic, "Eve Ames")]
+
+    # Same turns as a substring search over every turn
+    assert timestamps("fit") == ["00:00:00", "00:00:30", "00:01:00"]
+    assert timestamps("enefit") == ["00:00:30", "00:01:00"]
+    assert timestamps("what about") == ["00:00:30", "00:01:00"]
+    assert timestamps("no to tho") == ["00:00:30"]
+    assert timestamps("?") == ["00:00:30"]
+    assert timestamps("blockchain") == []
@@ -3,53 +3,290 @@ TranscriptProcessor - Load and parse Lenny's podcast transcripts
 """
 
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional, Set, Tuple
+import hashlib
+import json
+import os
 import re
+import time
+import numpy as np
 from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from corpus_stats import CorpusStats
+from corpus_snapshot import SNAPSHOT_FILENAME, SNAPSHOT_VERSION, read_snapshot, write_snapshot
+from search_index import DocumentAnalysis, InvertedIndex, analyze_document, tokenize
+from transcript_store import MmapTranscriptStore
+from utterance_store import (
+    EpisodeUtterances, UtteranceTable, format_timestamp, parse_timestamp, parse_utterances, strip_header
+)
+
+ROLE_PATTERNS = [
+    re.compile(r"(?:CEO|President|Founder|VP|Head|Director|Chief|Co-founder|Partner)", re.IGNORECASE),
+    re.compile(r"(?:Manager|Leader|Expert|Strategist|Engineer|Designer)", re.IGNORECASE),
+    re.compile(r"(?:at|of)\s+([A-Za-z\s&]+?)(?:\.|,|;)", re.IGNORECASE),
+]
+
+
+def extract_role_from_content(content: str) -> str:
+    """
+    Try to extract speaker's role from transcript intro
+
+    Pattern: Usually appears in first 1000 chars with titles like:
+    "CEO of X", "VP of Y", "Founder of Z", "Growth Expert", etc.
+    """
+    # Look for common patterns in first 2000 characters
+    intro = content[:2000]
+
+    for pattern in ROLE_PATTERNS:
+        match = pattern.search(intro)
+        if match:
+            return match.group(0)
+
+    # Default fallback
+    return "Podcast Guest & Expert"
+
+
+class ParsedTranscript(NamedTuple):
+    """Everything derived from one transcript's text at load time"""
+    role: str
+    analysis: DocumentAnalysis
+    utterances: EpisodeUtterances
+
+
+def parse_transcript(content: str) -> ParsedTranscript:
+    """Role, index postings and speaker turns for one transcript (module-level so worker processes can run it)"""
+    return ParsedTranscript(
+        role=extract_role_from_content(content),
+        analysis=analyze_document(content),
+        utterances=parse_utterances(content)
+    )
+
+
+def read_transcript_file(file_path: Path) -> Tuple[Optional[str], Optional[str]]:
+    """Read one transcript, returning (content, error message)"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read(), None
+    except Exception as e:
+        return None, str(e)
+
 
 class TranscriptProcessor:
     """Load and index all transcripts for efficient searching"""
 
-    def __init__(self, transcripts_dir: Path):
+    STORAGE_MODES = ("memory", "mmap")
+
+    def __init__(
+        self,
+        transcripts_dir: Path,
+        use_snapshot: bool = True,
+        storage: str = "memory",
+        workers: int = 1
+    ):
+        if storage not in self.STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode: {storage}")
+
         self.transcripts_dir = Path(transcripts_dir)
-        self.transcripts = {}  # {filename: content}
+        self.storage = storage
+        self.workers = max(1, workers)  # >1 reads on a thread pool and parses on a process pool
+        self.load_timings = {}  # {stage: seconds} for the last load
+        # {filename: content}; in mmap mode a lazily decoded MmapTranscriptStore
+        self.transcripts = MmapTranscriptStore() if storage == "mmap" else {}
         self.speakers = {}  # {speaker_name: [episodes]}
         self.episodes = {}  # {episode_name: {speaker, content, etc}}
         self.speaker_roles = {}  # {speaker_name: role description}
+        self.search_index = None  # InvertedIndex over transcript lines
+        self.utterances = None  # UtteranceTable of speaker turns
+        self.file_stats = {}  # {episode_name: [size, mtime_ns]}
+        self.corpus_version = ""  # hash of file_stats; changes whenever any transcript does
+        self.corpus_stats = CorpusStats()  # totals and size distribution, kept current per episode
+
+        self.use_snapshot = use_snapshot
+        self.snapshot_path = self.transcripts_dir / SNAPSHOT_FILENAME
+
+        load_started = time.perf_counter()
+        snapshot = self._load_snapshot() if use_snapshot else None
+
+        with self._timed("read"):
+            self._load_all_transcripts(snapshot)
+        stale = self._find_stale_episodes(snapshot)
+
+        with self._timed("parse"):
+            parsed = self._parse_episodes(stale)
+
+        self._extract_speakers(snapshot, parsed)
+        with self._timed("index"):
+            self._build_search_index(snapshot, parsed)
+            self._build_utterance_table(snapshot, parsed)
+        self._update_corpus_stats(snapshot, stale)
+
+        if use_snapshot and (snapshot is None or stale or self._removed_episodes(snapshot)):
+            self._save_snapshot()
+
+        self.corpus_version = self._corpus_version()
+        self.load_timings["total"] = time.perf_counter() - load_started
+
+    def _corpus_version(self) -> str:
+        """Hash of every transcript's name, size and modification time"""
+        stats = sorted((name, list(stat)) for name, stat in self.file_stats.items())
+        return hashlib.sha256(json.dumps(stats).encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _timed(self, stage: str):
+        """Record a load stage's wall time in load_timings"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.load_timings[stage] = time.perf_counter() - started
+
+    def _map(self, executor_class, fn, items: list) -> list:
+        """Apply fn to items in order, on an executor pool when workers > 1"""
+        if self.workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+
+        chunksize = max(1, len(items) // (self.workers * 4))
+        with executor_class(max_workers=self.workers) as pool:
+            return list(pool.map(fn, items, chunksize=chunksize))
+
+    def _load_all_transcripts(self, snapshot: Optional[dict] = None):
+        """
+        Load all .txt transcript files
 
-        self._load_all_transcripts()
-        self._extract_speakers()
-
-    def _load_all_transcripts(self):
-        """Load all .txt transcript files"""
+        In mmap mode, files unchanged since the snapshot are only registered with
+        the store; their metadata comes from the snapshot and nothing is read.
+        """
         print("📖 Loading transcripts...")
 
-        txt_files = list(self.transcripts_dir.glob("*.txt"))
+        # Sorted so that serial and parallel loads produce identical structures
+        txt_files = sorted(self.transcripts_dir.glob("*.txt"))
         print(f"   Found {len(txt_files)} transcript files")
 
+        file_stats = {}
+        to_read = []
         for file_path in txt_files:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if content.strip():
-                        episode_name = file_path.stem
+                stat = file_path.stat()
+            except OSError as e:
+                print(f"   ⚠️  Failed to load {file_path.name}: {str(e)}")
+                continue
+
+            file_stats[file_path] = [stat.st_size, stat.st_mtime_ns]
+            if not (self.storage == "mmap" and snapshot
+                    and snapshot["files"].get(file_path.stem) == [str(file_path), *file_stats[file_path]]):
+                to_read.append(file_path)
+
+        contents = dict(zip(to_read, self._map(ThreadPoolExecutor, read_transcript_file, to_read)))
+
+        for file_path, file_stat in file_stats.items():
+            episode_name = file_path.stem
+            try:
+                if file_path not in contents:
+                    # mmap mode, unchanged since the snapshot: register without reading
+                    self.transcripts.add(episode_name, file_path)
+                    self.episodes[episode_name] = dict(snapshot["episodes"][episode_name])
+                    self.file_stats[episode_name] = file_stat
+                    continue
+
+                content, error = contents[file_path]
+                if error:
+                    raise IOError(error)
+
+                if content.strip():
+                    self.episodes[episode_name] = {
+                        "name": episode_name,
+                        "file_path": str(file_path),
+                        "size_kb": len(content) / 1024,
+                        "characters": len(content)
+                    }
+                    if self.storage == "mmap":
+                        self.transcripts.add(episode_name, file_path)
+                    else:
                         self.transcripts[episode_name] = content
-                        self.episodes[episode_name] = {
-                            "name": episode_name,
-                            "file_path": str(file_path),
-                            "content": content,
-                            "size_kb": len(content) / 1024
-                        }
+                        self.episodes[episode_name]["content"] = content
+                    self.file_stats[episode_name] = file_stat
             except Exception as e:
                 print(f"   ⚠️  Failed to load {file_path.name}: {str(e)}")
 
         print(f"   ✅ Loaded {len(self.transcripts)} transcripts successfully")
 
-    def _extract_speakers(self):
-        """Extract speaker names and roles from transcripts"""
+    def _load_snapshot(self) -> Optional[dict]:
+        """Load the parsed-state snapshot, or None if there is no usable one"""
+        loaded = read_snapshot(self.snapshot_path)
+        if loaded is None:
+            return None
+
+        header, arrays = loaded
+        header["index"] = InvertedIndex.from_snapshot(header["index"], arrays)
+        header["utterances"] = UtteranceTable.from_snapshot(header["utterances"], arrays)
+        print(f"💾 Loaded snapshot with {len(header['files'])} parsed transcripts")
+        return header
+
+    def _find_stale_episodes(self, snapshot: Optional[dict]) -> Set[str]:
+        """Episodes whose file path, size or mtime differ from the snapshot"""
+        if snapshot is None:
+            return set(self.transcripts)
+
+        return {
+            episode_name for episode_name, stat in self.file_stats.items()
+            if snapshot["files"].get(episode_name) != [self.episodes[episode_name]["file_path"], *stat]
+        }
+
+    def _removed_episodes(self, snapshot: dict) -> Set[str]:
+        """Episodes in the snapshot that are no longer on disk"""
+        return set(snapshot["files"]) - set(self.transcripts)
+
+    def _save_snapshot(self):
+        """Persist speakers, roles, episode metadata and the search index"""
+        index_meta, arrays = self.search_index.to_snapshot()
+        utterance_meta, utterance_arrays = self.utterances.to_snapshot()
+        arrays.update(utterance_arrays)
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "files": {
+                episode_name: [self.episodes[episode_name]["file_path"], *stat]
+                for episode_name, stat in self.file_stats.items()
+            },
+            "speakers": self.speakers,
+            "speaker_roles": self.speaker_roles,
+            "episodes": {
+                episode_name: {key: value for key, value in info.items() if key != "content"}
+                for episode_name, info in self.episodes.items()
+            },
+            "corpus_stats": self.corpus_stats.to_figures(),
+            "index": index_meta,
+            "utterances": utterance_meta
+        }
+
+        try:
+            write_snapshot(self.snapshot_path, header, arrays)
+            print(f"💾 Saved snapshot to {self.snapshot_path}")
+        except OSError as e:
+            print(f"⚠️  Snapshot write error: {str(e)}")
+
+    def _parse_episodes(self, episode_names: Set[str]) -> Dict[str, ParsedTranscript]:
+        """
+        Extract roles, index postings and speaker turns for the given episodes
+
+        Parsing is CPU-bound, so with workers > 1 it runs on a process pool;
+        results come back in transcript order and are merged deterministically.
+        """
+        names = [episode_name for episode_name in self.transcripts if episode_name in episode_names]
+        if not names:
+            return {}
+
+        print(f"🧩 Parsing {len(names)} transcripts with {min(self.workers, len(names))} worker(s)...")
+        contents = [self.transcripts[episode_name] for episode_name in names]
+        return dict(zip(names, self._map(ProcessPoolExecutor, parse_transcript, contents)))
+
+    def _extract_speakers(self, snapshot: Optional[dict], parsed: Dict[str, ParsedTranscript]):
+        """Extract speaker names and roles from transcripts (reusing snapshot roles when fresh)"""
         print("🎤 Extracting speakers...")
 
-        for episode_name, content in self.transcripts.items():
+        cached_roles = snapshot["speaker_roles"] if snapshot else {}
+
+        for episode_name in self.transcripts:
             # Extract speaker name from filename (usually "Speaker Name.txt")
             speaker_name = episode_name
 
@@ -58,36 +295,81 @@ class TranscriptProcessor:
 
             self.speakers[speaker_name].append(episode_name)
 
-            # Try to extract role from content
+            # Role was extracted from content while parsing, unless the episode is unchanged
             if speaker_name not in self.speaker_roles:
-                role = self._extract_role_from_content(content, speaker_name)
+                if episode_name in parsed:
+                    role = parsed[episode_name].role
+                else:
+                    role = cached_roles.get(speaker_name) or self._extract_role_from_content(
+                        self.transcripts[episode_name], speaker_name
+                    )
                 self.speaker_roles[speaker_name] = role
 
         print(f"   ✅ Found {len(self.speakers)} unique speakers")
 
-    def _extract_role_from_content(self, content: str, speaker_name: str) -> str:
-        """
-        Try to extract speaker's role from transcript intro
-
-        Pattern: Usually appears in first 1000 chars with titles like:
-        "CEO of X", "VP of Y", "Founder of Z", "Growth Expert", etc.
-        """
-        # Look for common patterns in first 2000 characters
-        intro = content[:2000]
-
-        patterns = [
-            r"(?:CEO|President|Founder|VP|Head|Director|Chief|Co-founder|Partner)",
-            r"(?:Manager|Leader|Expert|Strategist|Engineer|Designer)",
-            r"(?:at|of)\s+([A-Za-z\s&]+?)(?:\.|,|;)",
-        ]
+    def _build_search_index(self, snapshot: Optional[dict], parsed: Dict[str, ParsedTranscript]):
+        """Build the BM25 inverted index used by search_transcripts"""
+        added = InvertedIndex.build(
+            (episode_name, parsed_transcript.analysis) for episode_name, parsed_transcript in parsed.items()
+        )
+
+        if snapshot is None:
+            print("🔎 Building search index...")
+            self.search_index = added
+        elif parsed or self._removed_episodes(snapshot):
+            print(f"🔎 Re-indexing {len(parsed)} changed transcripts...")
+            self.search_index = snapshot["index"].updated(
+                removed=self._removed_episodes(snapshot),
+                added=added
+            )
+        else:
+            self.search_index = snapshot["index"]
+
+        print(f"   ✅ Indexed {self.search_index.term_count} terms across {self.search_index.doc_count} transcripts")
+
+    def _build_utterance_table(self, snapshot: Optional[dict], parsed: Dict[str, ParsedTranscript]):
+        """Build the columnar table of speaker turns used by the segment APIs"""
+        added = UtteranceTable.build(
+            (episode_name, parsed_transcript.utterances) for episode_name, parsed_transcript in parsed.items()
+        )
+
+        if snapshot is None:
+            self.utterances = added
+        elif parsed or self._removed_episodes(snapshot):
+            self.utterances = snapshot["utterances"].updated(
+                removed=self._removed_episodes(snapshot),
+                added=added
+            )
+        else:
+            self.utterances = snapshot["utterances"]
+
+        print(f"   ✅ Parsed {len(self.utterances)} utterances from {len(self.utterances.speaker_names)} speakers")
+
+    def _update_corpus_stats(self, snapshot: Optional[dict], stale: Set[str]) -> None:
+        """Start from the snapshot's figures, then count only added, changed and removed episodes"""
+        if snapshot is None:
+            self.corpus_stats = CorpusStats.from_figures(
+                {episode_name: self._episode_figures(episode_name) for episode_name in self.episodes}
+            )
+            return
+
+        self.corpus_stats = CorpusStats.from_figures(snapshot["corpus_stats"])
+        for episode_name in self._removed_episodes(snapshot):
+            self.corpus_stats.remove(episode_name)
+        for episode_name in stale:
+            # add() replaces the snapshot's figures for a changed episode
+            self.corpus_stats.add(episode_name, *self._episode_figures(episode_name))
+
+    def _episode_figures(self, episode_name: str) -> list:
+        """[characters, tokens, speaker_name] for corpus_stats; tokens are the search index length"""
+        doc_id = self.search_index.doc_ids.get(episode_name)
+        tokens = int(self.search_index.doc_lengths[doc_id]) if doc_id is not None else 0
+        # Episodes are named after their guest (see _extract_speakers)
+        return [self.episodes[episode_name]["characters"], tokens, episode_name]
 
-        for pattern in patterns:
-            match = re.search(pattern, intro, re.IGNORECASE)
-            if match:
-                return match.group(0)
-
-        # Default fallback
-        return "Podcast Guest & Expert"
+    def _extract_role_from_content(self, content: str, speaker_name: str) -> str:
+        """Try to extract speaker's role from transcript intro"""
+        return extract_role_from_content(content)
 
     @property
     def transcript_count(self) -> int:
@@ -118,93 +400,180 @@ class TranscriptProcessor:
         """Get episode metadata"""
         return self.episodes.get(episode_name, {})
 
+    def _read_lines(self, episode_name: str, first_line: int, last_line: int) -> str:
+        """Text of lines first_line..last_line (inclusive), decoding only that range"""
+        if self.storage == "mmap":
+            return self.transcripts.read_lines(episode_name, first_line, last_line)
+
+        doc_id = self.search_index.doc_ids[episode_name]
+        start, end = self.search_index.line_span(doc_id, first_line, last_line)
+        return self.transcripts[episode_name][start:end]
+
     def search_transcripts(self, keyword: str, limit: int = 5) -> List[Dict]:
         """
         Search transcripts for keyword matches
 
+        Episodes are ranked with BM25 over the inverted index; within an episode,
+        lines matching the most query terms come first.
         Returns list of matching segments with context
         """
+        terms = tokenize(keyword)
+        if not terms or limit <= 0:
+            return []
+
+        index = self.search_index
         results = []
-        keyword_lower = keyword.lower()
-
-        for episode_name, content in self.transcripts.items():
-            if keyword_lower in content.lower():
-                # Find all occurrences
-                lines = content.split('\n')
-                for i, line in enumerate(lines):
-                    if keyword_lower in line.lower():
-                        # Get context (previous and next line)
-                        context_start = max(0, i - 1)
-                        context_end = min(len(lines), i + 2)
-                        context = ' '.join(lines[context_start:context_end])
-
-                        results.append({
-                            "episode": episode_name,
-                            "speaker": episode_name,
-                            "match": line.strip(),
-                            "context": context.strip(),
-                            "relevance": 0.8  # Placeholder
-                        })
+
+        for doc_id, score in index.rank(terms):
+            episode_name = index.doc_names[doc_id]
+            last_line = index.line_count(doc_id) - 1
+
+            for line_no in index.matching_lines(doc_id, terms):
+                # Get context (previous and next line)
+                context = self._read_lines(episode_name, max(0, line_no - 1), min(last_line, line_no + 1))
+
+                results.append({
+                    "episode": episode_name,
+                    "speaker": episode_name,
+                    "match": self._read_lines(episode_name, line_no, line_no).strip(),
+                    "context": context.replace('\n', ' ').strip(),
+                    "relevance": round(score, 4)
+                })
 
                 if len(results) >= limit:
-                    return results[:limit]
+                    return results
 
         return results
 
-    def get_relevant_segments(self, topic: str, episode_name: str, max_segments: int = 5) -> List[Dict]:
+    def get_utterance_text(self, episode_name: str, row: int) -> str:
+        """Full text of one utterance row, without its speaker header"""
+        table = self.utterances
+        first_line = int(table.first_lines[row])
+        text = self._read_lines(episode_name, first_line, first_line + int(table.line_counts[row]) - 1)
+        return strip_header(text, int(table.header_kinds[row])).strip()
+
+    def _utterance_segment(
+        self,
+        episode_name: str,
+        row: int,
+        relevance: float = 0.85,
+        text: Optional[str] = None
+    ) -> Dict:
+        """Decode one utterance row into a segment dict (pass text if it was already read)"""
+        table = self.utterances
+        if text is None:
+            text = self.get_utterance_text(episode_name, row)
+
+        return {
+            "speaker": table.speaker_of(row) or episode_name,
+            "timestamp": format_timestamp(int(table.start_seconds[row])),
+            "text": text[:500],  # First 500 chars
+            "relevance": relevance
+        }
+
+    def get_relevant_segments(
+        self,
+        topic: str,
+        episode_name: str,
+        max_segments: int = 5,
+        speaker: Optional[str] = None
+    ) -> List[Dict]:
         """
         Get relevant segments from an episode based on topic
 
-        Uses keyword matching and heuristics to find relevant quotes
+        A turn matches if it contains topic as a substring. Candidate lines
+        come from the search index and are mapped to speaker turns through the
+        utterance table; only those turns are read from storage. A one-word
+        topic may sit inside any token ("enefit" in "benefits"); in a longer
+        topic the last word starts a token, so those terms find every match.
+        Topics without any word characters scan the whole episode.
         """
-        content = self.get_transcript_content(episode_name)
-        if not content:
+        if episode_name not in self.transcripts:
             return []
 
-        # Split by speaker (heuristic: lines starting with names/timestamps)
-        segments = re.split(r'\n(?=[A-Z][a-z\s]+\s*\()', content)
-
+        index = self.search_index
+        words = tokenize(topic)
+        if not words:
+            rows = np.arange(*self.utterances.episode_rows(episode_name))
+        else:
+            terms = index.terms_containing(words[0]) if len(words) == 1 else index.terms_with_prefix(words[-1])
+            lines = np.unique(np.array(index.matching_lines(index.doc_ids[episode_name], terms), dtype=np.int64))
+            rows = self.utterances.rows_for_lines(episode_name, lines)
+        if speaker:
+            rows = np.intersect1d(rows, self.utterances.speaker_rows(speaker, episode_name))
+
+        return self._matching_segments(topic, episode_name, rows, max_segments)
+
+    def _matching_segments(self, topic: str, episode_name: str, rows: np.ndarray, max_segments: int) -> List[Dict]:
+        """Segments of the rows whose full text contains topic, up to max_segments"""
         relevant = []
         topic_lower = topic.lower()
 
-        for segment in segments:
-            # Check if segment is relevant to topic
-            if topic_lower in segment.lower():
-                # Extract speaker name
-                speaker_match = re.match(r'([^(]+)\s*\(', segment)
-                speaker = speaker_match.group(1).strip() if speaker_match else episode_name
-
-                # Extract timestamp
-                time_match = re.search(r'\((\d{2}:\d{2}:\d{2})\)', segment)
-                timestamp = time_match.group(1) if time_match else None
-
-                # Clean up segment text
-                clean_text = re.sub(r'\([^)]*\)', '', segment).strip()
-                if len(clean_text) > 50:  # Only include substantial segments
-                    relevant.append({
-                        "speaker": speaker,
-                        "timestamp": timestamp,
-                        "text": clean_text[:500],  # First 500 chars
-                        "relevance": 0.85
-                    })
+        for row in rows:
+            text = self.get_utterance_text(episode_name, int(row))
+
+            # Check the full turn is relevant to topic; only include substantial segments
+            if topic_lower in text.lower() and len(text) > 50:
+                relevant.append(self._utterance_segment(episode_name, int(row), text=text))
 
             if len(relevant) >= max_segments:
                 break
 
         return relevant
 
-    def get_transcript_stats(self) -> dict:
-        """Get statistics about all transcripts"""
-        total_chars = sum(len(content) for content in self.transcripts.values())
-        avg_chars = total_chars / len(self.transcripts) if self.transcripts else 0
+    def get_speaker_segments(self, speaker_name: str, episode_name: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Get a speaker's turns, across the corpus or within one episode"""
+        table = self.utterances
+        segments = []
+
+        for row in table.speaker_rows(speaker_name, episode_name)[:limit]:
+            episode = table.episode_names[int(np.searchsorted(table.episode_ptr, row, side='right')) - 1]
+            segments.append(dict(self._utterance_segment(episode, int(row)), episode=episode))
+
+        return segments
+
+    def get_segment_at(self, episode_name: str, timestamp: str) -> Optional[Dict]:
+        """Get the turn being spoken at a "HH:MM:SS" / "MM:SS" timestamp"""
+        row = self.utterances.row_at_time(episode_name, parse_timestamp(timestamp))
+        return None if row is None else self._utterance_segment(episode_name, row)
 
+    def get_transcript_stats(self) -> dict:
+        """Get statistics about all transcripts (read from corpus_stats, not recomputed)"""
         return {
-            "total_transcripts": len(self.transcripts),
-            "total_speakers": len(self.speakers),
-            "total_characters": total_chars,
-            "average_transcript_length": avg_chars,
-            "largest_episode": max(
-                self.episodes.items(),
-                key=lambda x: len(x[1]["content"])
-            )[0] if self.episodes else None
+            **self.corpus_stats.summary(),
+            "total_speakers": len(self.speakers)
         }
+
+
+def compare_ingestion(transcripts_dir: Path, workers: Optional[int] = None) -> Dict:
+    """
+    Time a full serial load against a parallel one on the same corpus
+
+    Snapshots are bypassed so both runs read and parse every transcript.
+    Returns {"serial": timings, "parallel": timings, "speedup": float}
+    """
+    workers = workers or os.cpu_count() or 1
+    report = {}
+
+    for label, worker_count in (("serial", 1), ("parallel", workers)):
+        processor = TranscriptProcessor(transcripts_dir, use_snapshot=False, workers=worker_count)
+        report[label] = dict(processor.load_timings, workers=worker_count)
+
+    report["speedup"] = report["serial"]["total"] / max(report["parallel"]["total"], 1e-9)
+
+    print("\n⏱️  Ingestion timing report")
+    print(f"   {'mode':<10}{'workers':>8}{'read':>9}{'parse':>9}{'index':>9}{'total':>9}")
+    for label in ("serial", "parallel"):
+        t = report[label]
+        print(f"   {label:<10}{t['workers']:>8}{t['read']:>8.2f}s{t['parse']:>8.2f}s{t['index']:>8.2f}s{t['total']:>8.2f}s")
+    print(f"   Speedup: {report['speedup']:.2f}x")
+
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    transcripts_dir = Path(os.getenv('TRANSCRIPTS_DIR', Path(__file__).parent.parent))
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    compare_ingestion(transcripts_dir, workers)
@@ -0,0 +1,106 @@
+"""
+MmapTranscriptStore - Keep transcripts on disk and decode only the ranges we touch
+"""
+
+import mmap
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator
+
+import numpy as np
+
+
+def _decode(raw: bytes) -> str:
+    """Decode transcript bytes the way open(..., 'r') would (universal newlines)"""
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+class MmapTranscriptStore(Mapping):
+    """
+    Read-only {episode_name: content} mapping backed by memory-mapped files
+
+    Nothing is decoded up front: indexing an episode decodes the whole file,
+    while read_lines() decodes just the requested line range. Only a bounded
+    number of maps is kept open so file descriptors stay flat as the corpus grows.
+    Lines end at \n, \r\n or a lone \r, as in the decoded text the index is
+    built from. Worker threads share the store; reads hold _lock until their
+    bytes are copied out, so eviction never closes a map in use.
+    """
+
+    def __init__(self, max_open_files: int = 128):
+        self.max_open_files = max_open_files
+        self._paths = {}  # {episode_name: Path}
+        self._maps = OrderedDict()  # {episode_name: mmap}, least recently used first
+        self._line_offsets = {}  # {episode_name: byte offset of each line start + sentinel}
+        self._lock = threading.RLock()
+
+    def add(self, episode_name: str, file_path: Path) -> None:
+        """Register a transcript file without reading it"""
+        with self._lock:
+            self._paths[episode_name] = Path(file_path)
+            self._line_offsets.pop(episode_name, None)
+
+    def __getitem__(self, episode_name: str) -> str:
+        with self._lock:
+            raw = self._map(episode_name)[:]
+        return _decode(raw)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __contains__(self, episode_name) -> bool:
+        return episode_name in self._paths
+
+    def _map(self, episode_name: str) -> mmap.mmap:
+        """Open (or reuse) the mmap for an episode (caller holds _lock)"""
+        mapped = self._maps.get(episode_name)
+        if mapped is not None:
+            self._maps.move_to_end(episode_name)
+            return mapped
+
+        with open(self._paths[episode_name], 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._maps[episode_name] = mapped
+        while len(self._maps) > self.max_open_files:
+            _, evicted = self._maps.popitem(last=False)
+            evicted.close()
+
+        return mapped
+
+    def line_offsets(self, episode_name: str) -> np.ndarray:
+        """Byte offsets of every line start plus a final sentinel (computed once)"""
+        with self._lock:
+            offsets = self._line_offsets.get(episode_name)
+            if offsets is None:
+                mapped = self._map(episode_name)
+                view = np.frombuffer(mapped, dtype=np.uint8)
+                is_lf = view == 0x0A
+                # A line ends at \n or at a \r not followed by \n (\r\n ends once, at its \n)
+                line_ends = view == 0x0D
+                line_ends[:-1] &= ~is_lf[1:]
+                line_ends |= is_lf
+                del view  # release the buffer export so the map can be closed later
+                offsets = np.concatenate([[0], np.flatnonzero(line_ends) + 1, [len(mapped) + 1]]).astype(np.int64)
+                self._line_offsets[episode_name] = offsets
+            return offsets
+
+    def read_lines(self, episode_name: str, first_line: int, last_line: int) -> str:
+        """Decode lines first_line..last_line inclusive (joined with '\\n')"""
+        with self._lock:
+            offsets = self.line_offsets(episode_name)
+            start = int(offsets[first_line])
+            end = int(offsets[last_line + 1]) - 1
+            raw = self._map(episode_name)[start:end]
+        # end drops the final line break's last byte; a \r\n leaves its \r behind
+        return _decode(raw.replace(b'\r\n', b'\n').rstrip(b'\r'))
+
+    def resident_files(self) -> Dict[str, int]:
+        """Currently open maps and their sizes (for diagnostics)"""
+        with self._lock:
+            return {episode_name: len(mapped) for episode_name, mapped in self._maps.items()}
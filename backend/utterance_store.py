@@ -0,0 +1,279 @@
+"""
+UtteranceTable - Speaker turns and timestamps parsed once at load, stored column-wise
+"""
+
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Array attributes persisted by to_snapshot/from_snapshot
+UTTERANCE_ARRAYS = ("episode_ptr", "speaker_ids", "start_seconds", "first_lines", "line_counts", "header_kinds")
+
+# "Name (HH:MM:SS):" on its own line, text on the following lines; a bare
+# "(HH:MM:SS):" continues the previous speaker
+TIMESTAMPED_HEADER = re.compile(r'^([^()\n]*?)\s*\((\d{1,2}:\d{2}(?::\d{2})?)\):?\s*$')
+# "[HH:MM:SS] Name: text" on a single line
+INLINE_TURN = re.compile(r'^\[(\d{1,2}:\d{2}(?::\d{2})?)\]\s*([^:\[\]]{1,80}?):\s*(.*)$')
+# "Name:" on its own line
+PLAIN_HEADER = re.compile(r'^([A-Z][^:()\[\]\n]{0,80}):\s*$')
+
+NO_SPEAKER = -1
+NO_TIMESTAMP = -1
+
+# Where an utterance's text starts relative to its first line
+NO_HEADER = 0  # text starts on the first line
+HEADER_LINE = 1  # first line is the speaker header, text starts on the next line
+INLINE_HEADER = 2  # text follows "[HH:MM:SS] Name:" on the first line
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """Convert "HH:MM:SS" or "MM:SS" to seconds"""
+    seconds = 0
+    for part in timestamp.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def format_timestamp(seconds: int) -> Optional[str]:
+    """Convert seconds back to "HH:MM:SS" (None if unknown)"""
+    if seconds < 0:
+        return None
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class EpisodeUtterances(NamedTuple):
+    """Speaker turns of one transcript, in line order"""
+    speakers: List[Optional[str]]  # None when the turn has no speaker label
+    start_seconds: np.ndarray
+    first_lines: np.ndarray
+    line_counts: np.ndarray
+    header_kinds: np.ndarray
+
+
+def strip_header(text: str, header_kind: int) -> str:
+    """Remove the speaker header from an utterance's text"""
+    if header_kind == HEADER_LINE:
+        return text.split('\n', 1)[1] if '\n' in text else ""
+    if header_kind == INLINE_HEADER:
+        return text[text.index(':', text.index(']')) + 1:]
+    return text
+
+
+def parse_utterances(content: str) -> EpisodeUtterances:
+    """
+    Split a transcript into speaker turns
+
+    A turn starts at a speaker header (timestamped, inline or plain) and runs to
+    its last non-blank line before the next header. Text outside any header is
+    split into blank-line separated paragraphs without a speaker.
+    """
+    turns = []  # [speaker, seconds, first_line, last_line, header_kind]
+    current = None
+
+    for line_no, line in enumerate(content.split('\n')):
+        stripped = line.strip()
+        header = TIMESTAMPED_HEADER.match(stripped) if stripped else None
+        inline = None if header or not stripped else INLINE_TURN.match(stripped)
+        plain = None if header or inline or not stripped else PLAIN_HEADER.match(stripped)
+
+        if header:
+            speaker = header.group(1).strip() or (current[0] if current else None)
+            current = [speaker, parse_timestamp(header.group(2)), line_no, line_no, HEADER_LINE]
+            turns.append(current)
+        elif inline:
+            current = [inline.group(2).strip(), parse_timestamp(inline.group(1)), line_no, line_no, INLINE_HEADER]
+            turns.append(current)
+        elif plain:
+            current = [plain.group(1).strip(), NO_TIMESTAMP, line_no, line_no, HEADER_LINE]
+            turns.append(current)
+        elif stripped:
+            if current is None:
+                current = [None, NO_TIMESTAMP, line_no, line_no, NO_HEADER]
+                turns.append(current)
+            current[3] = line_no
+        elif current is not None and current[0] is None:
+            # Blank line closes an unlabelled paragraph
+            current = None
+
+    return EpisodeUtterances(
+        speakers=[turn[0] for turn in turns],
+        start_seconds=np.array([turn[1] for turn in turns], dtype=np.int32),
+        first_lines=np.array([turn[2] for turn in turns], dtype=np.int32),
+        line_counts=np.array([turn[3] - turn[2] + 1 for turn in turns], dtype=np.int32),
+        header_kinds=np.array([turn[4] for turn in turns], dtype=np.int8)
+    )
+
+
+class UtteranceTable:
+    """
+    Columnar table of every speaker turn in the corpus
+
+    Rows are grouped by episode (episode_ptr is a CSR pointer) and ordered by
+    line within an episode. Speaker names are interned: speaker_ids index into
+    speaker_names, with NO_SPEAKER for unlabelled text.
+    """
+
+    def __init__(
+        self,
+        episode_names: List[str],
+        speaker_names: List[str],
+        episode_ptr: np.ndarray,
+        speaker_ids: np.ndarray,
+        start_seconds: np.ndarray,
+        first_lines: np.ndarray,
+        line_counts: np.ndarray,
+        header_kinds: np.ndarray
+    ):
+        self.episode_names = episode_names
+        self.episode_idx = {name: i for i, name in enumerate(episode_names)}
+        self.speaker_names = speaker_names
+        self.speaker_idx = {name: i for i, name in enumerate(speaker_names)}
+
+        self.episode_ptr = episode_ptr
+        self.speaker_ids = speaker_ids
+        self.start_seconds = start_seconds
+        self.first_lines = first_lines
+        self.line_counts = line_counts
+        self.header_kinds = header_kinds
+
+    @classmethod
+    def build(cls, episodes: Iterable[Tuple[str, EpisodeUtterances]]) -> "UtteranceTable":
+        """Build a table from (episode name, parse_utterances(...)) pairs"""
+        speaker_names = []
+        speaker_idx = {}
+        episode_names = []
+        episode_ptr = [0]
+        columns = {"speaker_ids": [], "start_seconds": [], "first_lines": [], "line_counts": [], "header_kinds": []}
+
+        for episode_name, utterances in episodes:
+            ids = []
+            for speaker in utterances.speakers:
+                if speaker is None:
+                    ids.append(NO_SPEAKER)
+                    continue
+                if speaker not in speaker_idx:
+                    speaker_idx[speaker] = len(speaker_names)
+                    speaker_names.append(speaker)
+                ids.append(speaker_idx[speaker])
+
+            episode_names.append(episode_name)
+            episode_ptr.append(episode_ptr[-1] + len(ids))
+            columns["speaker_ids"].append(np.array(ids, dtype=np.int32))
+            columns["start_seconds"].append(utterances.start_seconds)
+            columns["first_lines"].append(utterances.first_lines)
+            columns["line_counts"].append(utterances.line_counts)
+            columns["header_kinds"].append(utterances.header_kinds)
+
+        dtypes = {"header_kinds": np.int8}
+        return cls(
+            episode_names=episode_names,
+            speaker_names=speaker_names,
+            episode_ptr=np.array(episode_ptr, dtype=np.int64),
+            **{
+                name: (np.concatenate(arrays) if arrays else np.empty(0)).astype(dtypes.get(name, np.int32))
+                for name, arrays in columns.items()
+            }
+        )
+
+    @classmethod
+    def from_snapshot(cls, meta: dict, arrays: dict) -> "UtteranceTable":
+        """Rebuild a table from to_snapshot() output (arrays may be mmap-backed)"""
+        return cls(
+            episode_names=meta["episode_names"],
+            speaker_names=meta["speaker_names"],
+            **{name: arrays[f"utterances.{name}"] for name in UTTERANCE_ARRAYS}
+        )
+
+    def to_snapshot(self) -> Tuple[dict, dict]:
+        """Split the table into JSON-able metadata and named arrays"""
+        meta = {"episode_names": self.episode_names, "speaker_names": self.speaker_names}
+        arrays = {f"utterances.{name}": getattr(self, name) for name in UTTERANCE_ARRAYS}
+        return meta, arrays
+
+    def updated(self, removed: Iterable[str], added: "UtteranceTable") -> "UtteranceTable":
+        """Return a new table without the removed episodes plus every episode of added"""
+        removed = set(removed) | set(added.episode_names)
+        kept = [i for i, name in enumerate(self.episode_names) if name not in removed]
+        rows = np.concatenate(
+            [np.arange(self.episode_ptr[i], self.episode_ptr[i + 1]) for i in kept]
+        ).astype(np.int64) if kept else np.empty(0, dtype=np.int64)
+        kept_counts = np.diff(self.episode_ptr)[kept] if kept else np.empty(0, dtype=np.int64)
+
+        # Intern added speakers after the existing ones
+        speaker_names = list(self.speaker_names)
+        speaker_idx = dict(self.speaker_idx)
+        remap = np.empty(len(added.speaker_names) + 1, dtype=np.int32)
+        remap[-1] = NO_SPEAKER  # NO_SPEAKER (-1) indexes the last slot
+        for i, name in enumerate(added.speaker_names):
+            if name not in speaker_idx:
+                speaker_idx[name] = len(speaker_names)
+                speaker_names.append(name)
+            remap[i] = speaker_idx[name]
+
+        episode_ptr = np.zeros(len(kept) + added.episode_count + 1, dtype=np.int64)
+        np.cumsum(np.concatenate([kept_counts, np.diff(added.episode_ptr)]), out=episode_ptr[1:])
+
+        return UtteranceTable(
+            episode_names=[self.episode_names[i] for i in kept] + added.episode_names,
+            speaker_names=speaker_names,
+            episode_ptr=episode_ptr,
+            speaker_ids=np.concatenate([self.speaker_ids[rows], remap[added.speaker_ids]]).astype(np.int32),
+            start_seconds=np.concatenate([self.start_seconds[rows], added.start_seconds]).astype(np.int32),
+            first_lines=np.concatenate([self.first_lines[rows], added.first_lines]).astype(np.int32),
+            line_counts=np.concatenate([self.line_counts[rows], added.line_counts]).astype(np.int32),
+            header_kinds=np.concatenate([self.header_kinds[rows], added.header_kinds]).astype(np.int8)
+        )
+
+    @property
+    def episode_count(self) -> int:
+        """Number of episodes in the table"""
+        return len(self.episode_names)
+
+    def __len__(self) -> int:
+        return len(self.speaker_ids)
+
+    def episode_rows(self, episode_name: str) -> Tuple[int, int]:
+        """Start/end rows of an episode's utterances (empty if unknown)"""
+        episode_id = self.episode_idx.get(episode_name)
+        if episode_id is None:
+            return 0, 0
+        return int(self.episode_ptr[episode_id]), int(self.episode_ptr[episode_id + 1])
+
+    def rows_for_lines(self, episode_name: str, line_numbers: np.ndarray) -> np.ndarray:
+        """Rows of the utterances containing the given lines (unique, in line order)"""
+        start, end = self.episode_rows(episode_name)
+        if start == end or not len(line_numbers):
+            return np.empty(0, dtype=np.int64)
+
+        first_lines = self.first_lines[start:end]
+        positions = np.searchsorted(first_lines, line_numbers, side='right') - 1
+        valid = positions >= 0
+        positions = positions[valid]
+        # Drop lines that fall in the blank gap after an utterance ends
+        inside = line_numbers[valid] < first_lines[positions] + self.line_counts[start:end][positions]
+        return start + np.unique(positions[inside])
+
+    def speaker_rows(self, speaker_name: str, episode_name: Optional[str] = None) -> np.ndarray:
+        """Rows spoken by a speaker, optionally within one episode"""
+        speaker_id = self.speaker_idx.get(speaker_name)
+        if speaker_id is None:
+            return np.empty(0, dtype=np.int64)
+
+        start, end = self.episode_rows(episode_name) if episode_name else (0, len(self))
+        return start + np.flatnonzero(self.speaker_ids[start:end] == speaker_id)
+
+    def row_at_time(self, episode_name: str, seconds: int) -> Optional[int]:
+        """Row of the last timestamped utterance starting at or before seconds"""
+        start, end = self.episode_rows(episode_name)
+        timed = start + np.flatnonzero(self.start_seconds[start:end] >= 0)
+        if not len(timed):
+            return None
+
+        position = int(np.searchsorted(self.start_seconds[timed], seconds, side='right')) - 1
+        return int(timed[max(position, 0)])
+
+    def speaker_of(self, row: int) -> Optional[str]:
+        """Speaker name of a row (None if unlabelled)"""
+        speaker_id = int(self.speaker_ids[row])
+        return None if speaker_id == NO_SPEAKER else self.speaker_names[speaker_id]